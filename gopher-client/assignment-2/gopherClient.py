@@ -3,6 +3,11 @@ import sys
 import time
 import datetime
 import traceback
+import hashlib
+import json
+import functools
+import builtins
+import cProfile
 from collections import deque
 
 # --- Configuration ---
@@ -161,6 +166,70 @@ def connect_and_request(host, port, selector):
         print(f"Error: Unexpected error during request to {host}:{port} for '{selector}': {e}", file=sys.stderr)
         return None
 
+# --- Profiling ---
+
+class PhaseTracer:
+    """
+    Records timed spans for the crawler's phases (network, decode, parse,
+    bookkeeping, print) and writes them in the Chrome Trace Event format,
+    which chrome://tracing, Perfetto and speedscope can load as a flame graph.
+    Nested spans are tracked so each phase's *exclusive* time can be reported.
+    """
+    def __init__(self):
+        self.events = []
+        self.stack = [] # [phase, start_ns, child_ns] for currently open spans
+        self.exclusive_ns = {}
+        self.calls = {}
+        self.origin_ns = time.perf_counter_ns()
+
+    def wrap(self, phase, func):
+        """Returns func wrapped so every call is recorded as a span of the given phase."""
+        @functools.wraps(func)
+        def traced(*args, **kwargs):
+            self.stack.append([phase, time.perf_counter_ns(), 0])
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _, start_ns, child_ns = self.stack.pop()
+                duration_ns = time.perf_counter_ns() - start_ns
+                if self.stack: self.stack[-1][2] += duration_ns
+                self.exclusive_ns[phase] = self.exclusive_ns.get(phase, 0) + duration_ns - child_ns
+                self.calls[phase] = self.calls.get(phase, 0) + 1
+                self.events.append({'name': func.__name__, 'cat': phase, 'ph': 'X', 'pid': 1, 'tid': 1,
+                                    'ts': (start_ns - self.origin_ns) / 1000, 'dur': duration_ns / 1000})
+        return traced
+
+    def write_trace(self, path):
+        """Writes the recorded spans as a Chrome Trace Event JSON file."""
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, f)
+
+    def print_phase_summary(self):
+        """Prints exclusive time per phase, largest first."""
+        total_ns = sum(self.exclusive_ns.values())
+        builtins.print("\n--- Per-Phase Timings (exclusive) ---", file=sys.stderr)
+        for phase, phase_ns in sorted(self.exclusive_ns.items(), key=lambda kv: -kv[1]):
+            share = (phase_ns / total_ns * 100) if total_ns else 0
+            builtins.print(f" {phase:<12} {phase_ns / 1e6:10.1f} ms  {share:5.1f}%  ({self.calls[phase]} calls)", file=sys.stderr)
+
+def enable_profiling():
+    """
+    Rebinds the crawler's hot functions to traced versions and returns the tracer.
+    Module-level names are looked up at call time, so existing call sites
+    (including every print() in this module) pick up the wrappers without changes.
+    """
+    global connect_and_request, parse_gopher_line, print
+    tracer = PhaseTracer()
+    connect_and_request = tracer.wrap('network', connect_and_request)
+    parse_gopher_line = tracer.wrap('parse', parse_gopher_line)
+    print = tracer.wrap('print', builtins.print)
+    GopherCrawler._decode = tracer.wrap('decode', GopherCrawler._decode)
+    GopherCrawler._listing_fingerprint = tracer.wrap('bookkeeping', GopherCrawler._listing_fingerprint)
+    GopherCrawler._record_mirrored_files = tracer.wrap('bookkeeping', GopherCrawler._record_mirrored_files)
+    GopherCrawler.process_item = tracer.wrap('bookkeeping', GopherCrawler.process_item)
+    GopherCrawler.crawl = tracer.wrap('bookkeeping', GopherCrawler.crawl)
+    return tracer
+
 # --- Main Crawler Class ---
 
 class GopherCrawler:
@@ -170,12 +239,15 @@ class GopherCrawler:
         self.directories_to_visit = deque(['']) # Start with root selector ""
         self.visited_selectors = set(['']) # Keep track of visited selectors ON THIS SERVER
         self.external_servers = {} # Dict: (host, port) -> status ("up", "down/error")
+        self.listing_fingerprints = {} # Dict: listing fingerprint -> first selector crawled with it
 
         # Statistics - Initialize directly
         self.stats = {
             'dir_count': 1, # Start with root
             'text_files': [], 'binary_files': [],
             'invalid_references': [], 'request_errors': [],
+            'mirrored_directories': [], # (selector, selector it mirrors)
+            'mirrored_files': [], # (selector, item type) of files listed in skipped mirrors
             'smallest_text': {'size': float('inf'), 'selector': None, 'content': None},
             'largest_text': {'size': 0, 'selector': None},
             'smallest_binary': {'size': float('inf'), 'selector': None},
@@ -204,6 +276,42 @@ class GopherCrawler:
             print(f"Warning: Decoding failed for UTF-8, using latin-1.", file=sys.stderr)
             return data_bytes.decode('latin-1', errors='replace')
 
+    def _listing_fingerprint(self, selector, response_text):
+        """
+        Hashes a normalized directory listing so aliased/mirrored directories
+        can be recognised even when they are reached through different selectors.
+        Lines are stripped, and selectors on this server are made relative to the
+        directory's own selector, so '/a/x' under '/a' and '/b/x' under '/b' match
+        (only at a '/' boundary: '/ab/x' under '/a' stays as it is). Every item
+        keeps its type and display string, so a listing only matches one whose
+        items have the same types and names; listings carry no sizes, so files
+        the crawl skips this way are still listed and counted in the summary.
+        """
+        digest = hashlib.sha1()
+        prefix = selector.rstrip('/')
+        for line in response_text.splitlines():
+            line = line.strip()
+            if not line or line == '.': continue
+            parts = line.split('\t')
+            if len(parts) >= 4 and parts[2].strip() == self.start_host and parts[3].strip() == str(self.start_port):
+                item_selector = parts[1].strip()
+                if prefix and (item_selector == prefix or item_selector.startswith(prefix + '/')):
+                    item_selector = item_selector[len(prefix):]
+                parts[1] = item_selector
+            digest.update('\t'.join(p.strip() for p in parts).encode('utf-8', errors='replace'))
+            digest.update(b'\n')
+        return digest.hexdigest()
+
+    def _record_mirrored_files(self, response_text):
+        """Records the text/binary files on this server listed by a skipped mirror, without fetching them."""
+        for line in response_text.splitlines():
+            line = line.strip()
+            if not line or line == '.': continue
+            item = parse_gopher_line(line)
+            if (item and (item['type'] == TEXT or item['type'] in BINARY_TYPES)
+                    and item['host'] == self.start_host and item['port'] == self.start_port):
+                self.stats['mirrored_files'].append((item['selector'], item['type']))
+
     def _process_file(self, item, is_binary):
         """Helper to download a file and update stats."""
         selector = item['selector']
@@ -306,6 +414,16 @@ class GopherCrawler:
             # else decode fetched content
             response_text = self._decode(response_bytes)
 
+            # skip subtrees whose listing was already crawled under another selector
+            fingerprint = self._listing_fingerprint(current_selector, response_text)
+            if fingerprint in self.listing_fingerprints:
+                original_selector = self.listing_fingerprints[fingerprint]
+                print(f"  -> Listing identical to '{original_selector or '(root)'}'. Skipping mirrored subtree.")
+                self.stats['mirrored_directories'].append((current_selector, original_selector))
+                self._record_mirrored_files(response_text)
+                continue
+            self.listing_fingerprints[fingerprint] = current_selector
+
             # Process directory listing line by line
             for line in response_text.splitlines():
                 line = line.strip()
@@ -396,6 +514,20 @@ class GopherCrawler:
             for error_item in sorted(list(set(req_errors))): # Unique items
                 print(f" - '{error_item}'")
 
+        # Mirrored Directories
+        mirrored = self.stats['mirrored_directories']
+        print(f"\n11. Mirrored directories skipped (identical listings): {len(mirrored)}")
+        if mirrored:
+            print(" List of mirrored selectors (selector -> first crawled as):")
+            for selector, original_selector in sorted(mirrored):
+                print(f" - '{selector}' -> '{original_selector or '(root)'}'")
+        mirrored_files = self.stats['mirrored_files']
+        text_count = sum(1 for _, item_type in mirrored_files if item_type == TEXT)
+        print(f" Files listed in skipped mirrors (not fetched, so not in the file lists above): {len(mirrored_files)} "
+              f"({text_count} text, {len(mirrored_files) - text_count} binary)")
+        for selector, item_type in sorted(mirrored_files):
+            print(f" - '{selector}' ({'text' if item_type == TEXT else 'binary'})")
+
         print("\n--- End of Report ---")
 
 # --- Main Execution ---
@@ -403,6 +535,21 @@ if __name__ == "__main__":
     target_host = "comp3310.ddns.net"
     target_port = DEFAULT_GOPHER_PORT
 
+    # Opt-in profiling, one mode per run so neither skews the other's timings:
+    #   --profile[=output_prefix]  per-phase spans, writes <prefix>.trace.json
+    #   --cprofile[=output_prefix] function-level cProfile, writes <prefix>.prof
+    profile_prefix = cprofile_prefix = None
+    for arg in sys.argv[1:]:
+        if arg == '--profile' or arg.startswith('--profile='):
+            profile_prefix = arg.partition('=')[2] or 'gopher_crawl'
+            sys.argv.remove(arg)
+        elif arg == '--cprofile' or arg.startswith('--cprofile='):
+            cprofile_prefix = arg.partition('=')[2] or 'gopher_crawl'
+            sys.argv.remove(arg)
+    if profile_prefix and cprofile_prefix:
+        print("Error: --profile and --cprofile can't be combined (cProfile overhead would skew the trace spans).", file=sys.stderr)
+        sys.exit(2)
+
     if len(sys.argv) > 1: target_host = sys.argv[1]
     if len(sys.argv) > 2:
         try: target_port = int(sys.argv[2])
@@ -426,9 +573,15 @@ if __name__ == "__main__":
     print("\n--- Initial request complete. Proceeding with full crawl... ---")
     time.sleep(2)
 
+    tracer = enable_profiling() if profile_prefix else None
+    profiler = cProfile.Profile() if cprofile_prefix else None
+
     crawler = GopherCrawler(target_host, target_port)
     try:
-        crawler.crawl()
+        if profiler:
+            profiler.runcall(crawler.crawl)
+        else:
+            crawler.crawl()
     except KeyboardInterrupt:
         print("\n--- Crawl interrupted by user ---")
     except Exception as e:
@@ -437,3 +590,10 @@ if __name__ == "__main__":
     finally:
         print("--- Printing Summary ---")
         crawler.print_summary()
+        if tracer:
+            tracer.write_trace(f"{profile_prefix}.trace.json")
+            tracer.print_phase_summary()
+            builtins.print(f"Profile written to {profile_prefix}.trace.json (Chrome trace)", file=sys.stderr)
+        if profiler:
+            profiler.dump_stats(f"{cprofile_prefix}.prof")
+            builtins.print(f"Profile written to {cprofile_prefix}.prof (cProfile)", file=sys.stderr)
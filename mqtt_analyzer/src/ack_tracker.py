@@ -0,0 +1,115 @@
+import time
+
+############################# Configurations ##################################
+
+ACK_LATENCY_QUANTILES = (0.5, 0.99)
+ACK_DRAIN_POLL_SECONDS = 0.01
+
+###############################################################################
+
+class PublishAckTracker:
+    """
+    Tracks completion of a publisher's QoS 1/2 messages: PUBACK (QoS 1) or PUBCOMP
+    (QoS 2), as reported by paho's on_publish callback. The burst loop records each
+    message's mid and send time in `sent_ns`; on_publish() pops it and keeps the
+    publish-to-ack latency. `sent_ns` therefore holds exactly the messages paho has
+    accepted but the broker hasn't completed yet (in flight + queued), and the burst
+    loop samples its length as the outgoing queue depth.
+
+    on_publish() runs on the network thread and may see an ack before the burst thread
+    has stored the mid (the broker can answer before publish() returns); such acks are
+    kept in `early_acks` and matched up in finish(). Only plain dict operations are
+    shared between the two threads, which the GIL keeps atomic. Mids are reused once
+    paho has released them, so an early ack is only matched to a send that preceded it.
+    """
+    def __init__(self):
+        self.active = False
+        self.sent_ns = {} # mid -> time_ns() the message was published
+        self.early_acks = {} # mid -> time_ns() of an ack that arrived before its mid was stored
+        self.ack_latencies_ns = []
+        self.rejected = 0 # publish() refused the message (max_queued_messages reached)
+        self.max_queue_depth = 0
+        self.queue_depth_total = 0
+        self.queue_depth_samples = 0
+
+    def start(self):
+        """Resets the tracker for a new QoS 1/2 burst and starts accepting acks."""
+        self.__init__()
+        self.active = True
+
+    def on_publish(self, client, userdata, mid, reason_code=None, properties=None):
+        """paho on_publish callback (CallbackAPIVersion.VERSION2 signature)."""
+        if not self.active:
+            return
+        acked_ns = time.time_ns()
+        sent_ns = self.sent_ns.pop(mid, None)
+        if sent_ns is None:
+            self.early_acks[mid] = acked_ns
+        else:
+            self.ack_latencies_ns.append(acked_ns - sent_ns)
+
+    def sample_queue_depth(self):
+        """Records the current number of unacknowledged messages."""
+        depth = len(self.sent_ns)
+        self.queue_depth_total += depth
+        self.queue_depth_samples += 1
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+    def wait_for_drain(self, timeout_seconds):
+        """
+        Waits until every tracked message has been acknowledged, or the timeout.
+
+        Returns:
+            int: Messages still unacknowledged.
+        """
+        deadline = time.time() + timeout_seconds
+        self._match_early_acks()
+        while self.sent_ns and time.time() < deadline:
+            time.sleep(ACK_DRAIN_POLL_SECONDS)
+            self._match_early_acks()
+        return len(self.sent_ns)
+
+    def _match_early_acks(self):
+        for mid, acked_ns in list(self.early_acks.items()):
+            sent_ns = self.sent_ns.get(mid)
+            if sent_ns is not None and acked_ns >= sent_ns:
+                del self.sent_ns[mid]
+                del self.early_acks[mid]
+                self.ack_latencies_ns.append(acked_ns - sent_ns)
+
+    def finish(self):
+        """
+        Stops tracking and matches acks that overtook their mid being stored.
+
+        Returns:
+            dict: Ack latency quantiles and max in ms ('ack_p50_ms', 'ack_p99_ms',
+                  'ack_max_ms'; None without acks), 'acked', 'unacked' (still
+                  outstanding), 'rejected', 'max_queue_depth' and 'mean_queue_depth'.
+        """
+        self.active = False
+        self._match_early_acks()
+
+        latencies = sorted(self.ack_latencies_ns)
+        summary = {}
+        for quantile in ACK_LATENCY_QUANTILES:
+            key = f"ack_p{int(quantile * 100)}_ms"
+            summary[key] = round(latencies[min(int(quantile * len(latencies)), len(latencies) - 1)] / 1e6, 3) if latencies else None
+        summary["ack_max_ms"] = round(latencies[-1] / 1e6, 3) if latencies else None
+        summary.update({
+            "acked": len(latencies),
+            "unacked": len(self.sent_ns),
+            "rejected": self.rejected,
+            "max_queue_depth": self.max_queue_depth,
+            "mean_queue_depth": self.queue_depth_total / self.queue_depth_samples if self.queue_depth_samples else 0.0,
+        })
+        return summary
+
+def format_ack_detail(summary):
+    """
+    The ack fields appended to a publisher's 'done' status:
+    '<ack p50 ms>:<ack p99 ms>:<max queue depth>' (empty latency fields without acks).
+    """
+    def ms(value):
+        return f"{value:.3f}" if value is not None else ""
+    return f"{ms(summary['ack_p50_ms'])}:{ms(summary['ack_p99_ms'])}:{summary['max_queue_depth']}"
@@ -0,0 +1,92 @@
+import math
+import statistics
+
+############################# Configurations ##################################
+
+ADAPTIVE_MIN_SECONDS = 5
+ADAPTIVE_MAX_SECONDS = 30
+ADAPTIVE_SAMPLE_INTERVAL_SECONDS = 1
+ADAPTIVE_WARMUP_SAMPLES = 1 # first interval(s) include publisher start-up, so are ignored
+ADAPTIVE_MIN_SAMPLES = 3
+ADAPTIVE_Z = 1.96 # ~95% confidence
+ADAPTIVE_RATE_REL_TOLERANCE = 0.05 # CI half-width / mean rate
+ADAPTIVE_LOSS_ABS_TOLERANCE_PCT = 0.5 # CI half-width in percentage points (loss is often ~0)
+ADAPTIVE_GAP_REL_TOLERANCE = 0.05 # CI half-width / mean inter-message gap
+
+###############################################################################
+
+class ConvergenceTracker:
+    """
+    Decides when a test run has collected enough data, using per-interval samples of
+    total rate, loss and mean inter-message gap taken from an OnlineStats instance.
+
+    Each interval's deltas form one sample (batch means), and a normal-approximation
+    confidence interval is computed over the samples. The run has converged once every
+    metric's CI half-width is within its tolerance. Metrics with no data in a run
+    (e.g. gaps when every publisher sends one message) don't block convergence.
+    """
+    def __init__(self, online_stats):
+        self.online_stats = online_stats
+        self.previous_totals = None
+        self.samples_seen = 0
+        self.rate_samples = []
+        self.loss_samples = []
+        self.gap_samples = []
+
+    def _totals(self):
+        received = expected = unique = gap_count = 0
+        gap_sum = 0.0
+        for accumulator in list(self.online_stats.publishers.values()):
+            received += accumulator.received
+            expected += accumulator.max_ctr + 1
+            unique += accumulator.received - accumulator.duplicates
+            gap_count += accumulator.gap_count
+            gap_sum += accumulator.gap_mean * accumulator.gap_count
+        return received, expected, unique, gap_count, gap_sum
+
+    def sample(self, interval_seconds=ADAPTIVE_SAMPLE_INTERVAL_SECONDS):
+        """Takes one interval sample. Call once per interval_seconds during collection."""
+        totals = self._totals()
+        previous_totals = self.previous_totals
+        self.previous_totals = totals
+        self.samples_seen += 1
+        if previous_totals is None or self.samples_seen <= ADAPTIVE_WARMUP_SAMPLES:
+            return
+
+        received, expected, unique, gap_count, gap_sum = (now - before for now, before in zip(totals, previous_totals))
+        self.rate_samples.append(received / interval_seconds)
+        if expected > 0:
+            self.loss_samples.append((expected - unique) / expected * 100)
+        if gap_count > 0:
+            self.gap_samples.append(gap_sum / gap_count)
+
+    @staticmethod
+    def _half_width(samples):
+        if len(samples) < ADAPTIVE_MIN_SAMPLES:
+            return math.inf
+        return ADAPTIVE_Z * statistics.stdev(samples) / math.sqrt(len(samples))
+
+    def confidence(self):
+        """
+        Returns the current CI half-widths.
+
+        Returns:
+            dict: rate_rel, loss_abs_pct, gap_rel (inf until enough samples; None if the
+                  metric had no data) and samples.
+        """
+        rate_half_width = self._half_width(self.rate_samples)
+        rate_mean = statistics.fmean(self.rate_samples) if self.rate_samples else 0
+        gap_mean = statistics.fmean(self.gap_samples) if self.gap_samples else 0
+        return {
+            "rate_rel": rate_half_width / rate_mean if rate_mean else (0.0 if len(self.rate_samples) >= ADAPTIVE_MIN_SAMPLES else math.inf),
+            "loss_abs_pct": self._half_width(self.loss_samples) if self.loss_samples else None,
+            "gap_rel": self._half_width(self.gap_samples) / abs(gap_mean) if gap_mean else None,
+            "samples": len(self.rate_samples),
+        }
+
+    def converged(self):
+        """True once rate, loss and gap CIs are all within tolerance."""
+        confidence = self.confidence()
+        return (confidence["rate_rel"] <= ADAPTIVE_RATE_REL_TOLERANCE
+                and (confidence["loss_abs_pct"] is None or confidence["loss_abs_pct"] <= ADAPTIVE_LOSS_ABS_TOLERANCE_PCT)
+                and (confidence["gap_rel"] is None or confidence["gap_rel"] <= ADAPTIVE_GAP_REL_TOLERANCE))
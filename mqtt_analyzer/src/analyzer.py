@@ -4,7 +4,22 @@ import datetime
 import sys 
 import threading 
 import csv 
+import argparse 
+import struct 
 from collections import defaultdict 
+import results_store 
+from capture_buffer import CaptureBuffer, COL_INSTANCE_ID, COL_CTR, COL_SENT_TS, COL_RECEIVED_TS 
+import stats_engine 
+from online_stats import OnlineStats 
+from live_monitor import LiveMonitor 
+import adaptive_duration 
+from adaptive_duration import ConvergenceTracker 
+import sweep_config 
+import payload_format 
+from run_ledger import RunLedger, sweep_id_for 
+from ingest_ring import IngestWorker 
+from capture_workers import CaptureWorkerPool 
+from raw_subscriber import RawSubscriber 
 
 ############################# Configurations ##################################
 
@@ -15,7 +30,14 @@ REQUEST_TOPIC_DELAY = "request/delay"
 REQUEST_TOPIC_MESSAGESIZE = "request/messagesize"
 REQUEST_TOPIC_INSTANCECOUNT = "request/instancecount"
 REQUEST_TOPIC_GO = "request/go"
+REQUEST_TOPIC_PAYLOADRANDOM = "request/payloadrandom"
+REQUEST_TOPIC_PAYLOADBINARY = "request/payloadbinary"
+REQUEST_TOPIC_SYNC = "request/sync"
+REQUEST_TOPIC_CLOCKSYNC = "request/clocksync"
+REQUEST_TOPIC_MAXINFLIGHT = "request/maxinflight"
+REQUEST_TOPIC_MAXQUEUED = "request/maxqueued"
 DATA_TOPIC_WILDCARD = "counter/#"
+STATUS_TOPIC_WILDCARD = "status/#" # publisher 'ready'/'done' acks (see publisher.publish_status)
 SYS_TOPICS_TO_MONITOR = [
     "$SYS/broker/load/messages/received/1min",
     "$SYS/broker/load/messages/sent/1min",
@@ -24,14 +46,77 @@ SYS_TOPICS_TO_MONITOR = [
     "$SYS/broker/subscriptions/count"
 ]
 TEST_DURATION_SECONDS = 30
+PUBLISHER_BURST_SECONDS = 30 # fixed burst length in publisher.py 
 OUTPUT_CSV_FILE = "mqtt_test_results.csv"
+# True: update per-publisher accumulators as messages arrive (bounded memory, O(1) stats 
+# at window close). False: keep every message in RECEIVED_PUBLISHER_MSGS and compute after.
+ONLINE_STATS = False 
+# True: print per-second per-publisher metrics during each test and serve them as JSON 
+# (see live_monitor.py). With ONLINE_STATS off this adds a RECEIVED_PUBLISHER_STATS.update() 
+# to every captured message (~2.8 us/msg on top of the ~1.1 us capture append, 1 CPU VM).
+LIVE_MONITOR = False 
+# True: end each test once rate/loss/gap confidence intervals are within tolerance, between 
+# adaptive_duration.ADAPTIVE_MIN_SECONDS and ADAPTIVE_MAX_SECONDS. Also updates RECEIVED_PUBLISHER_STATS.
+ADAPTIVE_DURATION = False 
+# Finished combinations are always recorded in run_ledger.RUN_LEDGER_FILE. True: skip the 
+# ones already recorded for this sweep, so a crashed sweep resumes where it stopped 
+# (--resume / --fresh on the command line). Off by default so a rerun measures everything again.
+RESUME_SWEEPS = False 
+# True: wait for publisher ready/done acks and broker SUBACK/UNSUBACKs (with the timeouts 
+# below) instead of fixed sleeps. Set False for publishers that don't send status acks.
+SYNC_WITH_ACKS = True 
+PUBLISHER_READY_TIMEOUT_SECONDS = 5 
+PUBLISHER_DONE_TIMEOUT_SECONDS = 10 
+PUBLISHER_SYNC_RETRY_SECONDS = 1 # resend config + sync to publishers that haven't acked yet 
+SUBSCRIBE_ACK_TIMEOUT_SECONDS = 5 
+# Publisher clock offsets are estimated NTP-style at startup (see calibrate_publisher_clocks): 
+# the round trip with the smallest RTT bounds the offset error by RTT/2. 
+CLOCK_SYNC_ROUNDS = 10 
+CLOCK_SYNC_ROUND_SECONDS = 0.05 
+CLOCK_SYNC_SETTLE_SECONDS = 0.5 
+LEGACY_MS_TIMESTAMP_LIMIT = 10**14 # sent timestamps below this are from ms-stamping publishers 
+LATENCY_QUANTILES = (0.5, 0.95, 0.99)
+# True: the paho callback only enqueues (topic, payload, receive ns) into a ring buffer and 
+# parsing runs on a separate ingest worker thread (see ingest_ring.py). False: parse inline. 
+INGEST_THREAD = True 
+# publisher QoS 1/2 windows for tests that don't set pub_max_inflight / pub_max_queued 
+# (paho's defaults: 20 in flight, unbounded queue) 
+DEFAULT_PUB_MAX_INFLIGHT = 20 
+DEFAULT_PUB_MAX_QUEUED = 0 
+# > 1: receive publisher data in this many subscriber processes, each subscribed to a 
+# disjoint subset of the data topics (see capture_workers.py), and merge their captures 
+# before calculate_stats. The analyzer client then only takes status and $SYS messages. 
+# Stats come from the merged rows, so ONLINE_STATS, LIVE_MONITOR and ADAPTIVE_DURATION 
+# (which need every message in this process) can't be combined with it. 
+ANALYZER_CAPTURE_PROCESSES = 0 
+# True: receive the publisher data topics on a second, minimal MQTT 3.1.1 connection 
+# (raw_subscriber.py) that parses PUBLISH frames straight out of a recv_into() buffer 
+# instead of through paho; the paho client keeps the status and $SYS topics. 
+RAW_SOCKET_SUBSCRIBER = False 
 
 ############################ Global Variables #################################
 
-RECEIVED_PUBLISHER_MSGS = []
+RECEIVED_PUBLISHER_MSGS = CaptureBuffer() # rows of (instance id, ctr, sent ts ns, received ts ns)
+RECEIVED_PUBLISHER_STATS = OnlineStats() # used instead of the buffer when ONLINE_STATS 
 RECEIVED_SYS_MSGS = []
 TEST_START_TIME = 0
+TEST_ELAPSED_SECONDS = 0 # actual length of the last collection window 
+# time_ns() the current collection window closed (None while it is open); publisher messages 
+# received later, e.g. while waiting for the 'done' acks, are not counted 
+COLLECTION_END_NS = None 
+LAST_CONVERGENCE = None # adaptive_duration confidence for the last window, if ADAPTIVE_DURATION 
 DATA_COLLECTION_STOP_EVENT = threading.Event()
+PUBLISHER_ACKS = {} # instance id -> (state, token, detail) of its latest status ack 
+PUBLISHER_ACHIEVED_RATES = {} # instance id -> (token, achieved msg/s) from its latest 'done' ack 
+PUBLISHER_ACK_STATS = {} # instance id -> (token, ack p50 ms, ack p99 ms, max queue depth) after QoS 1/2 bursts 
+ACKED_SUBSCRIBE_MIDS = set() # mids of (un)subscribe requests the broker has acknowledged 
+ACK_CONDITION = threading.Condition() # guards PUBLISHER_ACKS and ACKED_SUBSCRIBE_MIDS 
+CLOCK_SYNC_SENT_NS = {} # clock sync round -> analyzer time_ns when it was sent 
+CLOCK_SAMPLES = defaultdict(list) # instance id -> [(t0 sent, t1 publisher, t2 received) ns] 
+CLOCK_OFFSETS_NS = {} # instance id -> publisher clock minus analyzer clock, ns 
+INGEST_WORKER = None # IngestWorker while main_analyzer runs with INGEST_THREAD 
+CAPTURE_WORKERS = None # CaptureWorkerPool while main_analyzer runs with ANALYZER_CAPTURE_PROCESSES > 1 
+RAW_SUBSCRIBER = None # RawSubscriber for the data topics while main_analyzer runs with RAW_SOCKET_SUBSCRIBER 
 
 ###############################################################################
 
@@ -53,71 +138,185 @@ def on_connect_analyzer(client, userdata, flags, rc, properties=None):
         print(f"Analyzer: Failed to connect, return code {rc}")
         sys.exit(f"Analyzer could not connect to broker. Exiting. RC: {rc}")
 
+def on_subscribe_analyzer(client, userdata, mid, reason_code_list, properties=None):
+    """
+    Callback invoked when the broker acknowledges a SUBSCRIBE (SUBACK).
+
+    Args:
+        client: The MQTT client instance 
+        userdata: User-defined data 
+        mid: Message id of the acknowledged SUBSCRIBE.
+        reason_code_list: Granted QoS / failure code per topic.
+        properties: MQTTv5 properties
+    """
+    for reason_code in reason_code_list:
+        if reason_code.is_failure:
+            print(f"Analyzer: Subscription (mid {mid}) failed: {reason_code}")
+    with ACK_CONDITION:
+        ACKED_SUBSCRIBE_MIDS.add(mid)
+        ACK_CONDITION.notify_all()
+
+def on_unsubscribe_analyzer(client, userdata, mid, reason_code_list, properties=None):
+    """
+    Callback invoked when the broker acknowledges an UNSUBSCRIBE (UNSUBACK).
+
+    Args:
+        client: The MQTT client instance 
+        userdata: User-defined data 
+        mid: Message id of the acknowledged UNSUBSCRIBE.
+        reason_code_list: Result code per topic (empty for MQTT 3.x).
+        properties: MQTTv5 properties
+    """
+    with ACK_CONDITION:
+        ACKED_SUBSCRIBE_MIDS.add(mid)
+        ACK_CONDITION.notify_all()
+
+def record_publisher_message(instance_id, ctr, sent_ns, received_ns, received_ms):
+    """Stores one parsed publisher message in the capture buffer and/or online stats, if it arrived inside the window."""
+    if COLLECTION_END_NS is not None and received_ns > COLLECTION_END_NS:
+        return 
+    if sent_ns < LEGACY_MS_TIMESTAMP_LIMIT:
+        sent_ns *= 1_000_000 
+    # the live monitor and adaptive duration read these accumulators, so they pay for 
+    # the per-message update even when the capture buffer is kept as well 
+    if ONLINE_STATS or LIVE_MONITOR or ADAPTIVE_DURATION:
+        RECEIVED_PUBLISHER_STATS.update(instance_id, ctr, received_ms, received_ns - sent_ns + CLOCK_OFFSETS_NS.get(instance_id, 0))
+    if not ONLINE_STATS:
+        RECEIVED_PUBLISHER_MSGS.append(instance_id, ctr, sent_ns, received_ns)
+
 def on_message_analyzer(client, userdata, msg):
     """
-    Callback invoked when the analyzer client receives a message from the broker.
-    It parses messages from publisher data topics ('ctr/#') and specified $SYS topics,
-    storing them in global lists for later analysis.
+    Callback invoked when the analyzer client receives a message from the broker. 
+    With INGEST_THREAD it only timestamps the message and enqueues (topic bytes, payload 
+    bytes, receive ns) into INGEST_WORKER's ring, so the paho network thread goes straight 
+    back to reading the socket; the parsing in handle_analyzer_message() runs on the 
+    ingest worker. Without INGEST_THREAD the message is handled inline, as before.
+    With RAW_SOCKET_SUBSCRIBER the raw subscriber's reader thread is the ring's only 
+    producer (IngestRing.put is single-producer), so this client's remaining traffic 
+    (status acks and $SYS, a few messages per second) is handled inline as well.
 
     Args:
         client: The MQTT client instance.
         userdata: User-defined data 
         msg: An MQTTMessage object containing topic, payload, QoS, etc. 
     """
-    global RECEIVED_PUBLISHER_MSGS, RECEIVED_SYS_MSGS 
-    current_time_ms = int(time.time() * 1000)
+    # paho keeps the raw topic in _topic; the .topic property decodes it on every access 
+    if INGEST_WORKER is not None and RAW_SUBSCRIBER is None:
+        INGEST_WORKER.ring.put(msg._topic, msg.payload, time.time_ns())
+    else:
+        handle_analyzer_message(msg._topic, msg.payload, time.time_ns())
+
+def handle_analyzer_message(topic_bytes, payload, received_ns):
+    """
+    Parses one received message: publisher data topics ('counter/#'), publisher status 
+    acks ('status/#') and the monitored $SYS topics.
+    Publisher messages are packed into the preallocated RECEIVED_PUBLISHER_MSGS buffer 
+    (no per-message dict), or folded into RECEIVED_PUBLISHER_STATS if ONLINE_STATS is set.
+    Timestamps are kept in ns; sent timestamps from ms-stamping publishers are scaled up.
+    Binary-framed publisher payloads (see payload_format.py) are parsed with 
+    struct.unpack_from, without decoding the payload.
+    $SYS messages are kept in a list for later analysis.
+
+    Args:
+        topic_bytes (bytes): The message topic, undecoded.
+        payload (bytes): The message payload.
+        received_ns (int): time_ns() when the message was read from the socket.
+    """
+    global RECEIVED_PUBLISHER_MSGS, RECEIVED_PUBLISHER_STATS, RECEIVED_SYS_MSGS 
+    current_time_ms = received_ns // 1_000_000 
+    topic = topic_bytes.decode()
     
     # ---->> DEBUGGING <<---- 
     #decoded_payload = 'N/A (Error decoding)'
     #try:
-    #    decoded_payload = msg.payload.decode()
+    #    decoded_payload = payload.decode()
     #except Exception as e:
     #    decoded_payload = f"DECODE_ERROR: {e}"
 
-    #print(f"DEBUG Analyzer on_message: Topic='{msg.topic}', QoS={msg.qos}, Retain={msg.retain}, Payload='{decoded_payload}'")
+    #print(f"DEBUG Analyzer on_message: Topic='{topic}', Payload='{decoded_payload}'")
     # ---->> End DEBUGGING <<---- 
 
+    if payload_format.is_binary(payload) and topic.startswith("counter/"):
+        try:
+            instance_id, ctr, sent_ns = payload_format.unpack_header(payload)
+            record_publisher_message(instance_id, ctr, sent_ns, received_ns, current_time_ms)
+        except (ValueError, struct.error) as e:
+            print(f"Analyzer: Received malformed binary publisher message on {topic}: {e}")
+        return 
+
     try:
-        payload_str = msg.payload.decode()
+        payload_str = payload.decode()
     except UnicodeDecodeError:
         payload_str = "Error decoding payload (binary?)"
-        print(f"Analyzer: Warning - UnicodeDecodeError for payload on topic {msg.topic}")
+        print(f"Analyzer: Warning - UnicodeDecodeError for payload on topic {topic}")
 
-    if msg.topic.startswith("counter/"):
-        #print(f"DEBUG Analyser on_message: Matched 'counter/' topic: '{msg.topic}'. Processing...")
-        parts = msg.topic.split('/')
+    if topic.startswith("counter/"):
+        #print(f"DEBUG Analyser on_message: Matched 'counter/' topic: '{topic}'. Processing...")
+        parts = topic.split('/')
         payload_parts = payload_str.split(':', 2)
 
         if len(parts) == 5 and len(payload_parts) >= 2:
             try:
-                message_data = {
-                    "topic": msg.topic,
-                    "publisher_instance_id": parts[1],
-                    "original_qos": int(parts[2]),
-                    "original_delay": int(parts[3]),
-                    "original_message_size": int(parts[4]),
-                    "payload_ctr": int(payload_parts[0]),
-                    "payload_timestamp_sent": int(payload_parts[1]),
-                    "payload_content_sample": payload_parts[2][:20] if len(payload_parts) > 2 else "",
-                    "analyzer_timestamp_received": current_time_ms,
-                    "analyzer_qos_subscribed": userdata.get("current_analyzer_qos", -1)
-                }
-                RECEIVED_PUBLISHER_MSGS.append(message_data)
+                ctr = int(payload_parts[0])
+                payload_format.check_ctr(ctr)
+                record_publisher_message(int(parts[1]), ctr, int(payload_parts[1]), received_ns, current_time_ms)
             except ValueError:
-                print(f"Analyzer: Error parsing publisher message data: Topic={msg.topic}, Payload={payload_str}")
+                print(f"Analyzer: Error parsing publisher message data: Topic={topic}, Payload={payload_str}")
         
         else:
-            print(f"Analyzer: Received malformed publisher message: Topic={msg.topic}, Payload={payload_str}")
+            print(f"Analyzer: Received malformed publisher message: Topic={topic}, Payload={payload_str}")
 
-    elif msg.topic in SYS_TOPICS_TO_MONITOR:
+    elif topic.startswith("status/"):
+        # publisher ack: status/<instance_id> 'ready:<token>:<active>' or 
+        # 'done:<token>:<sent>[:<achieved msg/s>[:<ack p50 ms>:<ack p99 ms>:<max queue depth>]]' 
+        try:
+            state, token, detail = payload_str.split(':', 2)
+            detail_fields = detail.split(':')
+            if state == "clock": # clock sync reply: token is the round, detail the publisher's time_ns 
+                if int(token) in CLOCK_SYNC_SENT_NS:
+                    CLOCK_SAMPLES[int(topic.split('/')[1])].append((CLOCK_SYNC_SENT_NS[int(token)], int(detail), received_ns))
+                return 
+            instance_id = int(topic.split('/')[1])
+            with ACK_CONDITION:
+                if state == "done":
+                    achieved_rate, ack_stats = parse_done_detail(detail_fields)
+                    if achieved_rate is not None:
+                        PUBLISHER_ACHIEVED_RATES[instance_id] = (token, achieved_rate)
+                    if ack_stats is not None:
+                        PUBLISHER_ACK_STATS[instance_id] = (token, *ack_stats)
+                PUBLISHER_ACKS[instance_id] = (state, token, int(detail_fields[0]))
+                ACK_CONDITION.notify_all()
+        except (ValueError, IndexError):
+            print(f"Analyzer: Received malformed publisher status: Topic={topic}, Payload={payload_str}")
+
+    elif topic in SYS_TOPICS_TO_MONITOR:
         sys_data = {
-            "topic": msg.topic,
+            "topic": topic,
             "payload": payload_str,
             "analyzer_timestamp_received": current_time_ms 
         }
         RECEIVED_SYS_MSGS.append(sys_data)
 
-def publish_control_messages(client, pub_qos, pub_delay, pub_msg_size, pub_instance_count):
+def parse_done_detail(detail_fields):
+    """
+    Parses the optional fields of a publisher's 'done' ack.
+
+    Args:
+        detail_fields (list): The ack's detail split on ':' ('<sent>[:<achieved msg/s>[:<ack p50 ms>:<ack p99 ms>:<max queue depth>]]').
+    Returns:
+        tuple: (achieved msg/s or None, (ack p50 ms, ack p99 ms, max queue depth) or None).
+    Raises:
+        ValueError: If a field isn't a number.
+    """
+    achieved_rate = float(detail_fields[1]) if len(detail_fields) > 1 else None 
+    ack_stats = None 
+    if len(detail_fields) > 4:
+        ack_stats = (float(detail_fields[2]) if detail_fields[2] else None,
+                     float(detail_fields[3]) if detail_fields[3] else None, int(detail_fields[4]))
+    return achieved_rate, ack_stats 
+
+def publish_control_messages(client, pub_qos, pub_delay, pub_msg_size, pub_instance_count, pub_payload_random=0, pub_payload_binary=0,
+                             pub_max_inflight=DEFAULT_PUB_MAX_INFLIGHT, pub_max_queued=DEFAULT_PUB_MAX_QUEUED):
     """
     Publishes control parameters to the respective 'request/*' topics for publishers.
     These messages instruct publishers on how to behave for the upcoming test. All control messages 
@@ -129,13 +328,135 @@ def publish_control_messages(client, pub_qos, pub_delay, pub_msg_size, pub_insta
         pub_delay (int): The delay between messages for publishers (in ms).
         pub_msg_size (int): The message payload size for publishers (in bytes)
         pub_instance_count (int): The number of publisher instances that should be active.
+        pub_payload_random (int): 1 for random alphanumeric payloads, 0 for 'x' padding.
+        pub_payload_binary (int): 1 for the binary header framing, 0 for 'ctr:ts:payload' text.
+        pub_max_inflight (int): Publishers' QoS 1/2 in-flight window (see publisher.set_window_limits).
+        pub_max_queued (int): Publishers' outgoing queue limit beyond the window (0 = unbounded).
     """
-    print(f"Analyzer: Publishing control: PubQoS={pub_qos}, Delay={pub_delay}, Size={pub_msg_size}, Instances={pub_instance_count}")
+    print(f"Analyzer: Publishing control: PubQoS={pub_qos}, Delay={pub_delay}, Size={pub_msg_size}, Instances={pub_instance_count}, RandomPayload={pub_payload_random}, BinaryPayload={pub_payload_binary}, "
+          f"MaxInflight={pub_max_inflight}, MaxQueued={pub_max_queued}")
     client.publish(REQUEST_TOPIC_QOS, str(pub_qos), qos=1)
     client.publish(REQUEST_TOPIC_DELAY, str(pub_delay), qos=1)
     client.publish(REQUEST_TOPIC_MESSAGESIZE, str(pub_msg_size), qos=1)
     client.publish(REQUEST_TOPIC_INSTANCECOUNT, str(pub_instance_count), qos=1)
-    time.sleep(0.5)
+    client.publish(REQUEST_TOPIC_PAYLOADRANDOM, str(pub_payload_random), qos=1)
+    client.publish(REQUEST_TOPIC_PAYLOADBINARY, str(pub_payload_binary), qos=1)
+    client.publish(REQUEST_TOPIC_MAXINFLIGHT, str(pub_max_inflight), qos=1)
+    client.publish(REQUEST_TOPIC_MAXQUEUED, str(pub_max_queued), qos=1)
+    if not SYNC_WITH_ACKS:
+        time.sleep(0.5)
+
+def wait_for_publisher_acks(state, token, instance_ids, timeout_seconds, on_retry=None):
+    """
+    Blocks until every publisher in instance_ids has sent a status ack with the given 
+    state and sync token, or until the timeout.
+
+    Args:
+        state (str): 'ready' or 'done'.
+        token (str): The sync token of the current test.
+        instance_ids (iterable): Publisher instance numbers to wait for.
+        timeout_seconds (float): Give up after this long.
+        on_retry (callable): Called with the missing ids every PUBLISHER_SYNC_RETRY_SECONDS 
+                             while some acks are still missing (e.g. to resend the config).
+    Returns:
+        set: Instance ids that did not ack in time (empty on success).
+    """
+    deadline = time.time() + timeout_seconds 
+    while True:
+        wake_time = min(deadline, time.time() + PUBLISHER_SYNC_RETRY_SECONDS) if on_retry else deadline 
+        with ACK_CONDITION:
+            while True:
+                missing = {instance_id for instance_id in instance_ids
+                           if PUBLISHER_ACKS.get(instance_id, (None, None))[:2] != (state, token)}
+                if not missing or time.time() >= wake_time:
+                    break 
+                ACK_CONDITION.wait(wake_time - time.time())
+        if not missing or time.time() >= deadline:
+            return missing 
+        on_retry(missing) # outside the lock: publishing must not block the network thread's callbacks 
+
+def sync_publishers(client, test_params, token):
+    """
+    Sends the test's control messages followed by a sync token, then waits until every 
+    publisher expected to be active acknowledges the token with 'ready'. Publishers that 
+    haven't acked are re-sent the config every PUBLISHER_SYNC_RETRY_SECONDS (covers 
+    publishers that connected late).
+
+    Args:
+        client: The MQTT client instance.
+        test_params (dict): The test's params dict.
+        token (str): Unique sync token for this test.
+    Returns:
+        set: Expected publisher ids that never became ready.
+    """
+    def send_config(missing=None):
+        publish_control_messages(client, test_params["pub_qos"], test_params["pub_delay"], test_params["pub_msg_size"],
+                                 test_params["pub_instance_count"], test_params.get("pub_payload_random", 0),
+                                 test_params.get("pub_payload_binary", 0),
+                                 test_params.get("pub_max_inflight", DEFAULT_PUB_MAX_INFLIGHT),
+                                 test_params.get("pub_max_queued", DEFAULT_PUB_MAX_QUEUED))
+        client.publish(REQUEST_TOPIC_SYNC, token, qos=1)
+
+    send_config()
+    if not SYNC_WITH_ACKS:
+        return set()
+    missing = wait_for_publisher_acks("ready", token, range(1, test_params["pub_instance_count"] + 1),
+                                      PUBLISHER_READY_TIMEOUT_SECONDS, on_retry=send_config)
+    if missing:
+        print(f"Analyzer: Warning - no 'ready' ack within {PUBLISHER_READY_TIMEOUT_SECONDS}s from publishers {sorted(missing)}; starting anyway")
+    else:
+        print(f"Analyzer: All {test_params['pub_instance_count']} publishers ready")
+    return missing 
+
+def calibrate_publisher_clocks(client):
+    """
+    Estimates each connected publisher's clock offset from the analyzer clock with an 
+    NTP-style handshake: the analyzer sends a round number at t0 on request/clocksync, the 
+    publisher replies with its time_ns t1, and the reply arrives at t2. Assuming symmetric 
+    paths, offset = t1 - (t0 + t2) / 2; the round with the smallest RTT (t2 - t0) is kept. 
+    On a single host the offsets should be near 0 and mostly absorb path asymmetry. 
+    Results go to CLOCK_OFFSETS_NS and are applied to every one-way latency.
+
+    Args:
+        client: The MQTT client instance (already subscribed to STATUS_TOPIC_WILDCARD).
+    """
+    CLOCK_SYNC_SENT_NS.clear()
+    CLOCK_SAMPLES.clear()
+    for sync_round in range(CLOCK_SYNC_ROUNDS):
+        CLOCK_SYNC_SENT_NS[sync_round] = time.time_ns()
+        client.publish(REQUEST_TOPIC_CLOCKSYNC, str(sync_round), qos=0)
+        time.sleep(CLOCK_SYNC_ROUND_SECONDS)
+    time.sleep(CLOCK_SYNC_SETTLE_SECONDS)
+    if INGEST_WORKER:
+        INGEST_WORKER.wait_until_drained()
+
+    CLOCK_OFFSETS_NS.clear()
+    for instance_id, samples in sorted(CLOCK_SAMPLES.items()):
+        t0, t1, t2 = min(samples, key=lambda sample: sample[2] - sample[0])
+        CLOCK_OFFSETS_NS[instance_id] = t1 - (t0 + t2) // 2 
+        print(f"Analyzer: Clock offset for publisher {instance_id}: {CLOCK_OFFSETS_NS[instance_id] / 1e3:.1f} us "
+              f"(best RTT {(t2 - t0) / 1e3:.1f} us over {len(samples)} rounds)")
+    if not CLOCK_OFFSETS_NS:
+        print("Analyzer: No clock sync replies; latencies assume publishers share the analyzer clock")
+
+def wait_for_subscription_acks(mids):
+    """
+    Waits until the broker has acknowledged the given (un)subscribe message ids, or 
+    SUBSCRIBE_ACK_TIMEOUT_SECONDS has passed. Falls back to a 1 s sleep without SYNC_WITH_ACKS.
+
+    Args:
+        mids (list): Message ids returned by client.subscribe()/unsubscribe().
+    """
+    if not SYNC_WITH_ACKS:
+        time.sleep(1)
+        return 
+    deadline = time.time() + SUBSCRIBE_ACK_TIMEOUT_SECONDS 
+    with ACK_CONDITION:
+        while not set(mids) <= ACKED_SUBSCRIBE_MIDS and time.time() < deadline:
+            ACK_CONDITION.wait(deadline - time.time())
+        if not set(mids) <= ACKED_SUBSCRIBE_MIDS:
+            print(f"Analyzer: Warning - broker did not acknowledge (un)subscribe within {SUBSCRIBE_ACK_TIMEOUT_SECONDS}s")
+        ACKED_SUBSCRIBE_MIDS.difference_update(mids)
 
 def trigger_publishers(client):
     """
@@ -169,47 +490,101 @@ def data_collection_thread_func(duration_seconds):
     Args:
         duration_seconds (int): The number of seconds to wait before signaling.
     """
-    global DATA_COLLECTION_STOP_EVENT 
+    global DATA_COLLECTION_STOP_EVENT, TEST_ELAPSED_SECONDS, COLLECTION_END_NS 
     DATA_COLLECTION_STOP_EVENT.clear()
     time.sleep(duration_seconds)
+    COLLECTION_END_NS = time.time_ns()
     DATA_COLLECTION_STOP_EVENT.set()
+    TEST_ELAPSED_SECONDS = duration_seconds 
     print(f"Analyzer: {duration_seconds}s data collection period ended")
 
-def calculate_stats(test_params):
+def adaptive_collection_thread_func(tracker):
+    """
+    Adaptive replacement for data_collection_thread_func(): samples the online stats every 
+    ADAPTIVE_SAMPLE_INTERVAL_SECONDS and signals the end of collection as soon as the 
+    tracker reports convergence (but not before ADAPTIVE_MIN_SECONDS), or at ADAPTIVE_MAX_SECONDS.
+
+    Args:
+        tracker (ConvergenceTracker): Tracker reading RECEIVED_PUBLISHER_STATS.
+    """
+    global DATA_COLLECTION_STOP_EVENT, TEST_ELAPSED_SECONDS, LAST_CONVERGENCE, COLLECTION_END_NS 
+    DATA_COLLECTION_STOP_EVENT.clear()
+    start_time = time.time()
+    next_sample_time = start_time 
+    converged = False 
+    while True:
+        next_sample_time += adaptive_duration.ADAPTIVE_SAMPLE_INTERVAL_SECONDS
+        time.sleep(max(0, next_sample_time - time.time()))
+        tracker.sample()
+        elapsed = time.time() - start_time 
+        converged = elapsed >= adaptive_duration.ADAPTIVE_MIN_SECONDS and tracker.converged()
+        if converged or elapsed >= adaptive_duration.ADAPTIVE_MAX_SECONDS:
+            break 
+    COLLECTION_END_NS = time.time_ns()
+    DATA_COLLECTION_STOP_EVENT.set()
+    TEST_ELAPSED_SECONDS = elapsed 
+    LAST_CONVERGENCE = dict(tracker.confidence(), converged=converged)
+    print(f"Analyzer: Adaptive data collection ended after {elapsed:.1f}s ({'converged' if converged else 'max duration reached'}): {LAST_CONVERGENCE}")
+
+def calculate_stats(test_params, publisher_rates=None, publisher_ack_stats=None):
     """
-    Processes the globally collected 'RECEIVED_PUBLISHER_MSGS' and 'RECEIVED_SYS_MSGS'
+    Processes the globally collected 'RECEIVED_PUBLISHER_MSGS' (or, with ONLINE_STATS, 
+    the already accumulated 'RECEIVED_PUBLISHER_STATS') and 'RECEIVED_SYS_MSGS'
     for the just-completed test run to calculate various performance metrics.
 
     Args:
         test_params (dict): A dictionary containing the parameters of the current test 
                             (e.g., analyzer_qos, pub_qos, pub_delay, etc.).
+        publisher_rates (list): Achieved msg/s reported by each active publisher in its 
+                                'done' ack (empty or None if none reported).
+        publisher_ack_stats (list): (ack p50 ms, ack p99 ms, max queue depth) per active 
+                                    publisher after a QoS 1/2 burst (empty or None at QoS 0).
     Returns:
         dict: A dictionary where keys are metric names and values are the calculated 
               statistics for the current test run.
     """
-    global RECEIVED_PUBLISHER_MSGS, RECEIVED_SYS_MSGS
+    global RECEIVED_PUBLISHER_MSGS, RECEIVED_PUBLISHER_STATS, RECEIVED_SYS_MSGS
 
     # ------------------------------------------------ 
     print(f"\n---- calculate_statistics for Test Params: {test_params} ----")
-    print(f"Raw RECEIVED_PUBLISHER_MSGS (first 5 or all if short):")
-    if len(RECEIVED_PUBLISHER_MSGS) > 5:
-        for i in range(5): 
-            print(RECEIVED_PUBLISHER_MSGS[i])
-        print(f" ... and {len(RECEIVED_PUBLISHER_MSGS) - 5} more messages")
-    else:
-        for msg_data in RECEIVED_PUBLISHER_MSGS:
-            print(msg_data)
-    print(f"Total publisher messages received for this test: {len(RECEIVED_PUBLISHER_MSGS)}")
+    captured_rows = RECEIVED_PUBLISHER_MSGS.rows()
+    print(f"Raw RECEIVED_PUBLISHER_MSGS (instance id, ctr, sent ts ns, received ts ns; first 5 or all if short):")
+    for row in captured_rows[:5].tolist():
+        print(row)
+    if len(captured_rows) > 5:
+        print(f" ... and {len(captured_rows) - 5} more messages")
+    print(f"Total publisher messages received for this test: {len(RECEIVED_PUBLISHER_STATS) if ONLINE_STATS else len(captured_rows)}")
     print(f"Raw RECEIVED_SYS_MSGS: {RECEIVED_SYS_MSGS}")
     print("----------------------------------------------------------------")
     # ------------------------------------------------
 
-    total_msgs_received_by_analyzer = len(RECEIVED_PUBLISHER_MSGS)
-    mean_total_rate_mps = total_msgs_received_by_analyzer / TEST_DURATION_SECONDS if TEST_DURATION_SECONDS > 0 else 0 
+    return compute_stats(test_params, captured_rows, RECEIVED_SYS_MSGS, TEST_ELAPSED_SECONDS if ADAPTIVE_DURATION else TEST_DURATION_SECONDS,
+                         CLOCK_OFFSETS_NS, publisher_rates, publisher_ack_stats,
+                         online_stats=RECEIVED_PUBLISHER_STATS if ONLINE_STATS else None,
+                         convergence=LAST_CONVERGENCE if ADAPTIVE_DURATION else None)
 
-    publisher_data_grouped = defaultdict(list)
-    for msg in RECEIVED_PUBLISHER_MSGS:
-        publisher_data_grouped[msg["publisher_instance_id"]].append(msg)
+def compute_stats(test_params, captured_rows, sys_msgs, collection_seconds, clock_offsets_ns, publisher_rates=None,
+                  publisher_ack_stats=None, online_stats=None, convergence=None):
+    """
+    The metric calculation behind calculate_stats(), on explicitly passed data instead of 
+    the module globals (so callers with their own capture state, like async_controller.py, 
+    can share it).
+
+    Args:
+        test_params (dict): The test's params dict.
+        captured_rows (np.ndarray): (n, 4) rows as from CaptureBuffer.rows(); unused with online_stats.
+        sys_msgs (list): $SYS message dicts received during the test.
+        collection_seconds (float): Length of the collection window.
+        clock_offsets_ns (dict): Instance id -> publisher clock offset, ns.
+        publisher_rates (list): See calculate_stats().
+        publisher_ack_stats (list): See calculate_stats().
+        online_stats (OnlineStats): Accumulated stats to use instead of captured_rows (ONLINE_STATS).
+        convergence (dict): adaptive_duration confidence of the window, if it was adaptive.
+    Returns:
+        dict: The results row (see calculate_stats()).
+    """
+    total_msgs_received_by_analyzer = len(online_stats) if online_stats is not None else len(captured_rows)
+    mean_total_rate_mps = total_msgs_received_by_analyzer / collection_seconds if collection_seconds > 0 else 0 
 
     num_active_publishers_expected = test_params["pub_instance_count"]
     sum_loss_pct = 0 
@@ -219,102 +594,27 @@ def calculate_stats(test_params):
     sum_stddev_inter_msg_gap_ms = 0 
     publishers_reported_data_count = 0 
 
-    for pub_id_str, pub_msgs in publisher_data_grouped.items():
+    # loss, out-of-order, duplicates and inter-message gaps per publisher (see stats_engine)
+    if online_stats is not None:
+        per_publisher_metrics = online_stats.all_metrics()
+    else:
+        # gap statistics stay in (floored) ms, as before the capture moved to ns 
+        publisher_groups = stats_engine.split_by_publisher(captured_rows[:, COL_INSTANCE_ID], captured_rows[:, COL_CTR],
+                                                           captured_rows[:, COL_RECEIVED_TS] // 1_000_000)
+        per_publisher_metrics = [(pub_id, stats_engine.publisher_metrics(pub_ctrs, pub_received_ts))
+                                 for pub_id, pub_ctrs, pub_received_ts in publisher_groups]
+
+    for pub_id, pub_metrics in per_publisher_metrics:
         # only consider pubs that were supposed to be active for this test 
-        try:
-            if int(pub_id_str) > num_active_publishers_expected:
-                continue 
-        except ValueError:
-            print(f"Analyzer: Warning - Non-integer publisher ID '{pub_id_str}' found in data.")
+        if pub_id > num_active_publishers_expected:
             continue 
 
         publishers_reported_data_count += 1 
-        # sort messages by their original payload ctr 
-        sorted_pub_msgs_by_ctr = sorted(pub_msgs, key=lambda x: x["payload_ctr"])
-
-        actual_msgs_from_pub = len(sorted_pub_msgs_by_ctr)
-        if actual_msgs_from_pub == 0:
-            # if pub was expected to send but sent nothing, assume 100% loss 
-            # for 0ms delay, if nothing is received, it could be 100% loss or pub issue 
-            # if delay is fixed, expected number can be estimated 
-            if test_params["pub_delay"] > 0:
-                expected_at_delay = int(TEST_DURATION_SECONDS / (test_params["pub_delay"] / 1000.0))
-                if expected_at_delay > 0: 
-                    sum_loss_pct += 100 
-            # else, if 0ms and 0 received, loss contribution will be based on 
-            # max_ctr_seen below 
-            continue 
-
-        # Message loss
-        # Based on unique ctrs received vs max ctr seen from this publisher 
-        unique_ctrs_from_pub = sorted(list(set(m["payload_ctr"] for m in sorted_pub_msgs_by_ctr)))
-        if not unique_ctrs_from_pub:
-            loss_pct_this_pub = 100.0 if test_params["pub_delay"] > 0 else 0.0
-        else:
-            max_ctr_seen_this_pub = unique_ctrs_from_pub[-1]
-            expected_based_on_max_ctr = max_ctr_seen_this_pub + 1 # assuming ctr start at 0 
-            num_unique_received = len(unique_ctrs_from_pub)
-            loss_count_for_this_pub = expected_based_on_max_ctr - num_unique_received 
-            loss_pct_this_pub = (loss_count_for_this_pub / expected_based_on_max_ctr) * 100 if expected_based_on_max_ctr > 0 else 0 
-        
-        sum_loss_pct += loss_pct_this_pub 
-
-        # Out of order messages 
-        # sort by analyzer's reception time to see the order they arrived in 
-        sorted_pub_msgs_by_arrival = sorted(pub_msgs, key=lambda x: x["analyzer_timestamp_received"])
-        outoforder_count_this_pub = 0 
-        if len(sorted_pub_msgs_by_arrival) > 1:
-            # check if a message with a numerically smaller ctr arrived after one with bigger ctr 
-            max_payload_ctr_seen_in_arrival_stream = -1
-            for msg_in_arrival_order in sorted_pub_msgs_by_arrival:
-                if msg_in_arrival_order["payload_ctr"] < max_payload_ctr_seen_in_arrival_stream:
-                    outoforder_count_this_pub += 1 
-                if msg_in_arrival_order["payload_ctr"] > max_payload_ctr_seen_in_arrival_stream:
-                    max_payload_ctr_seen_in_arrival_stream = msg_in_arrival_order["payload_ctr"]
-        
-        outoforder_pct_this_pub = (outoforder_count_this_pub / actual_msgs_from_pub) * 100 if actual_msgs_from_pub > 0 else 0 
-        sum_outoforder_pct += outoforder_pct_this_pub 
-
-        # Duplicate messages 
-        ctr_occurrences = defaultdict(int)
-        for msg in sorted_pub_msgs_by_ctr:
-            ctr_occurrences[msg["payload_ctr"]] += 1 
-        duplicate_count_this_pub = 0 
-
-        for count_val in ctr_occurrences.values():
-            if count_val > 1:
-                duplicate_count_this_pub += (count_val - 1)
-
-        duplicate_pct_this_pub = (duplicate_count_this_pub / actual_msgs_from_pub) * 100 if actual_msgs_from_pub > 0 else 0 
-        sum_duplicate_pct += duplicate_pct_this_pub 
-
-        # Inter-Message Gap (Timestamp diff b/w consecutive msgs)
-        inter_message_gaps_this_pub = [] 
-        # store first arrival time for each unique ctr 
-        arrival_times_for_unique_ctrs = {}
-        for msg in sorted_pub_msgs_by_arrival:
-            if msg["payload_ctr"] not in arrival_times_for_unique_ctrs:
-                arrival_times_for_unique_ctrs[msg["payload_ctr"]] = msg["analyzer_timestamp_received"]
-
-        # iterate through the unique ctrs in their numerical order 
-        for i in range(len(unique_ctrs_from_pub) - 1):
-            current_ctr = unique_ctrs_from_pub[i]
-            next_ctr = unique_ctrs_from_pub[i+1]
-            if next_ctr == current_ctr + 1: # check if consecutive 
-                # ensure both counters were received and have timestamps 
-                if current_ctr in arrival_times_for_unique_ctrs and next_ctr in arrival_times_for_unique_ctrs:
-                    gap = arrival_times_for_unique_ctrs[next_ctr] - arrival_times_for_unique_ctrs[current_ctr]
-                    inter_message_gaps_this_pub.append(gap)
-
-        avg_gap_ms_this_pub = 0 
-        stddev_gap_ms_this_pub = 0 
-        if inter_message_gaps_this_pub:
-            avg_gap_ms_this_pub = sum(inter_message_gaps_this_pub) / len(inter_message_gaps_this_pub)
-            if len(inter_message_gaps_this_pub) > 1:
-                variance = sum([(g - avg_gap_ms_this_pub) ** 2 for g in inter_message_gaps_this_pub]) / len(inter_message_gaps_this_pub)
-                stddev_gap_ms_this_pub = variance ** 0.5 
-        sum_avg_inter_msg_gap_ms += avg_gap_ms_this_pub 
-        sum_stddev_inter_msg_gap_ms += stddev_gap_ms_this_pub 
+        sum_loss_pct += pub_metrics["loss_pct"]
+        sum_outoforder_pct += pub_metrics["outoforder_pct"]
+        sum_duplicate_pct += pub_metrics["dup_pct"]
+        sum_avg_inter_msg_gap_ms += pub_metrics["avg_gap"]
+        sum_stddev_inter_msg_gap_ms += pub_metrics["stddev_gap"]
 
     # Averaging per-publisher statistics -------------------------------------- 
 
@@ -324,18 +624,55 @@ def calculate_stats(test_params):
     avg_inter_msg_gap_ms_overall = sum_avg_inter_msg_gap_ms / publishers_reported_data_count if publishers_reported_data_count > 0 else 0 
     avg_stddev_inter_msg_gap_ms_overall = sum_stddev_inter_msg_gap_ms / publishers_reported_data_count if publishers_reported_data_count > 0 else 0 
 
+    # One-way latency ----------------------------------------------------------
+
+    if online_stats is not None:
+        latency = online_stats.latency_summary(LATENCY_QUANTILES)
+    else:
+        latency = stats_engine.latency_summary(
+            stats_engine.one_way_latency_ns(captured_rows[:, COL_INSTANCE_ID], captured_rows[:, COL_SENT_TS],
+                                            captured_rows[:, COL_RECEIVED_TS], clock_offsets_ns),
+            LATENCY_QUANTILES)
+    latency_metrics = {f"Latency_{name}_ms": "N/A" if value is None else round(value, 3) for name, value in latency.items()}
+
     # Process $SYS topics -----------------------------------------------------
 
     # store last seen val for each monitored $SYS topic during the test period
     processed_sys_metrics = {}
     sys_data_by_topic = defaultdict(list)
-    for sys_msg in RECEIVED_SYS_MSGS:
+    for sys_msg in sys_msgs:
         sys_data_by_topic[sys_msg["topic"]].append(sys_msg["payload"])
 
     for topic_key in SYS_TOPICS_TO_MONITOR:
         clean_key = topic_key.replace("$SYS/broker/", "").replace("/", "_")
         processed_sys_metrics[f"SYS_{clean_key}_last"] = sys_data_by_topic[topic_key][-1] if sys_data_by_topic[topic_key] else "N/A"
 
+    # Achieved confidence (adaptive duration only) ------------------------------
+
+    def _format_confidence(value):
+        return "N/A" if value is None or value == float("inf") else round(value, 4)
+
+    convergence = convergence or {}
+    convergence_metrics = {
+        "Collection_duration_s": round(collection_seconds, 3),
+        "CI_rate_rel_halfwidth": _format_confidence(convergence.get("rate_rel")),
+        "CI_loss_abs_halfwidth_pct": _format_confidence(convergence.get("loss_abs_pct")),
+        "CI_gap_rel_halfwidth": _format_confidence(convergence.get("gap_rel")),
+        "Converged_early": convergence.get("converged", "N/A"),
+    }
+
+    # Publisher QoS 1/2 completion (from the 'done' acks) -------------------------
+
+    ack_p50s = [p50 for p50, _, _ in publisher_ack_stats or [] if p50 is not None]
+    ack_p99s = [p99 for _, p99, _ in publisher_ack_stats or [] if p99 is not None]
+    ack_metrics = {
+        "Publisher_max_inflight": test_params.get("pub_max_inflight", DEFAULT_PUB_MAX_INFLIGHT),
+        "Publisher_max_queued": test_params.get("pub_max_queued", DEFAULT_PUB_MAX_QUEUED),
+        "Publisher_ack_p50_ms": round(sum(ack_p50s) / len(ack_p50s), 3) if ack_p50s else "N/A", # mean over publishers 
+        "Publisher_ack_p99_ms": round(max(ack_p99s), 3) if ack_p99s else "N/A", # worst publisher 
+        "Publisher_max_queue_depth": max(depth for _, _, depth in publisher_ack_stats) if publisher_ack_stats else "N/A",
+    }
+
     results = {
         "Test_Run_Timestamp": datetime.datetime.now().isoformat(),
         "Analyzer_sub_QoS": test_params["analyzer_qos"],
@@ -350,74 +687,217 @@ def calculate_stats(test_params):
         "Avg_dup_pct_per_active_pub": round(avg_dup_pct_overall, 3),
         "Avg_inter_msg_gap_ms_per_active_pub": round(avg_inter_msg_gap_ms_overall, 3),
         "Avg_stddev_inter_msg_gap_ms_per_active_pub": round(avg_stddev_inter_msg_gap_ms_overall, 3),
-        **processed_sys_metrics 
+        **processed_sys_metrics,
+        **convergence_metrics,
+        "Publisher_payload_random": test_params.get("pub_payload_random", 0),
+        **latency_metrics,
+        "Publisher_payload_binary": test_params.get("pub_payload_binary", 0),
+        # what the publishers were asked for vs what their pacers actually delivered 
+        "Publisher_target_rate_mps": round(1000 / test_params["pub_delay"], 3) if test_params["pub_delay"] > 0 else "N/A",
+        "Publisher_achieved_rate_mps": round(sum(publisher_rates) / len(publisher_rates), 3) if publisher_rates else "N/A",
+        **ack_metrics,
     }
     return results 
 
-def write_results_to_csv(results_dict, is_first_write):
+def append_rows_to_csv(rows, fieldnames):
     """
-    Appends a dict of results (one row) to the specified CSV file.
-    If it's the first write op to a new/empty file, it writes the header row. 
+    Appends result rows to OUTPUT_CSV_FILE. A new/empty file gets fieldnames as its header; 
+    if the file already has a header with different columns, rows are written in the file's 
+    columns (missing values as 'N/A', extra keys dropped) so every row stays aligned with 
+    its header.
+
+    Args:
+        rows (list): Result dicts to append.
+        fieldnames (list): Columns to use for a new file.
+    Raises:
+        IOError: If the file can't be read or written.
+    """
+    # a+ reads from the start but always writes at the end, so one open covers both 
+    with open(OUTPUT_CSV_FILE, mode='a+', newline='') as csvfile:
+        csvfile.seek(0)
+        existing_header = next(csv.reader([csvfile.readline()]), None)
+        if existing_header and existing_header != list(fieldnames):
+            print(f"Analyzer: Warning - '{OUTPUT_CSV_FILE}' has different columns; writing its columns only "
+                  f"(full results are in {results_store.OUTPUT_NPZ_DIR}/)")
+            fieldnames = existing_header 
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, restval="N/A", extrasaction='ignore')
+        if not existing_header:
+            writer.writeheader()
+        writer.writerows(rows)
+
+def write_results_to_csv(results_dict):
+    """
+    Appends a dict of results (one row) to the specified CSV file, and writes the same 
+    row to the columnar results store (results_store.OUTPUT_NPZ_DIR).
+    A new/empty file gets a header row first. If the file already has a header with 
+    different columns, rows are written in the file's columns.
 
     Args:
         results_dict (dict): The dictionary containing data for one test run 
-        is_first_write (bool): True if this is the first time writing to the CSV 
+    Returns:
+        bool: True if the row was written.
     """
     try:
-        fieldnames = results_dict.keys()
-        file_exists = False 
-        try:
-            with open(OUTPUT_CSV_FILE, mode='r') as f:
-                if f.read(1): file_exists = True 
-        except FileNotFoundError:
-            file_exists = False 
-
-        with open(OUTPUT_CSV_FILE, mode='a', newline='') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            if not file_exists or is_first_write and csvfile.tell() == 0:
-                writer.writeheader()
-            writer.writerow(results_dict)
+        append_rows_to_csv([results_dict], list(results_dict.keys()))
+        results_store.write_run_npz(results_dict)
+        return True 
     except IOError as e:
         print(f"Analyzer: Error writing to CSV file '{OUTPUT_CSV_FILE}': {e}")
     except Exception as e:
         print(f"Analyzer: Unexpected error occured during CSV writing: {e}")
+    return False 
+
+def build_test_combinations(sweep_spec_path=None):
+    """
+    Builds the test combinations, in the order the tests are run. Without a spec this is 
+    the full 162-test grid (sweep_config.DEFAULT_SWEEP_AXES) with analyzer QoS as the 
+    outermost loop, so subscriptions only change 3 times per sweep.
 
-def main_analyzer():
+    Args:
+        sweep_spec_path (str): Optional .json/.toml sweep spec (see sweep_config.load_sweep_spec).
+                               A spec's "duration_seconds" overrides TEST_DURATION_SECONDS.
+    Returns:
+        list: One test params dict per combination (analyzer_qos, pub_qos, pub_delay, 
+              pub_msg_size, pub_instance_count, and any optional axes).
+    """
+    global TEST_DURATION_SECONDS 
+    if sweep_spec_path is None:
+        return sweep_config.full_factorial(sweep_config.DEFAULT_SWEEP_AXES)
+
+    spec = sweep_config.load_sweep_spec(sweep_spec_path)
+    if "duration_seconds" in spec:
+        TEST_DURATION_SECONDS = int(spec["duration_seconds"])
+    test_combinations = sweep_config.build_combinations_from_spec(spec)
+    print(f"Analyzer: Sweep spec '{sweep_spec_path}' ({spec.get('design', 'full_factorial')}) -> {len(test_combinations)} tests")
+    return test_combinations
+
+def subscribe_with_analyzer_qos(client, analyzer_qos_level):
+    """
+    (Re)subscribes to the publisher data and $SYS topics with the given analyzer QoS.
+    With capture workers or the raw-socket subscriber, the data topics are subscribed 
+    on those instead.
+
+    Args:
+        client: The MQTT client instance.
+        analyzer_qos_level (int): The subscription QoS to use.
+    """
+    client.user_data_set({"current_analyzer_qos": analyzer_qos_level})
+    print(f"\nAnalyzer: Setting up subscriptions for Analyzer QoS = {analyzer_qos_level}")
+    topics = SYS_TOPICS_TO_MONITOR if CAPTURE_WORKERS or RAW_SUBSCRIBER else [DATA_TOPIC_WILDCARD] + SYS_TOPICS_TO_MONITOR 
+    # Unsub from all relevant topics first to ensure QoS change takes effect 
+    _, mid = client.unsubscribe(topics)
+    wait_for_subscription_acks([mid])
+
+    # Subscribe with the new Analyzer QoS 
+    _, mid = client.subscribe([(topic, analyzer_qos_level) for topic in topics])
+    wait_for_subscription_acks([mid])
+    if CAPTURE_WORKERS and not CAPTURE_WORKERS.subscribe(analyzer_qos_level):
+        print(f"Analyzer: Warning - not every capture worker confirmed its QoS {analyzer_qos_level} subscription")
+    if RAW_SUBSCRIBER:
+        RAW_SUBSCRIBER.unsubscribe([DATA_TOPIC_WILDCARD])
+        granted = RAW_SUBSCRIBER.subscribe([(DATA_TOPIC_WILDCARD, analyzer_qos_level)])
+        if granted is None or granted[0] & 0x80:
+            print(f"Analyzer: Warning - raw-socket data subscription with QoS {analyzer_qos_level} failed: {granted}")
+
+def resume_pending(ledger, test_combinations, name="Analyzer"):
+    """
+    The combinations to run: with RESUME_SWEEPS, the ones the ledger doesn't record for 
+    its sweep yet, otherwise all of them. Says which it is whenever the ledger already 
+    has some, so neither skipping nor re-measuring happens silently.
+
+    Args:
+        ledger (RunLedger): Ledger of the sweep being run.
+        test_combinations (list): Test params dicts of the sweep (or shard), in order.
+        name (str): Prefix for the printed note.
+    Returns:
+        list: Test params dicts to run, in their original order.
+    """
+    pending_combinations = ledger.pending(test_combinations)
+    already_done = len(test_combinations) - len(pending_combinations)
+    if not already_done:
+        return test_combinations 
+    if RESUME_SWEEPS:
+        print(f"{name}: Resuming sweep {ledger.sweep_id}: {already_done} of {len(test_combinations)} tests "
+              f"already complete (ledger '{ledger.path}')")
+        return pending_combinations 
+    print(f"{name}: {already_done} of {len(test_combinations)} tests of sweep {ledger.sweep_id} are already in "
+          f"ledger '{ledger.path}'; measuring them again (--resume skips them)")
+    return test_combinations 
+
+def add_resume_arguments(parser):
+    """Adds the --resume / --fresh / --sweep-id options shared by the sweep command lines."""
+    resume_group = parser.add_mutually_exclusive_group()
+    resume_group.add_argument("--resume", action="store_true", help="Skip tests the run ledger already records for this sweep")
+    resume_group.add_argument("--fresh", action="store_true", help="Run every test, even ones the run ledger records (default)")
+    parser.add_argument("--sweep-id", help="Run ledger sweep ID; defaults to one derived from the combinations and window length")
+
+def apply_resume_arguments(args):
+    """Sets RESUME_SWEEPS from parsed add_resume_arguments() options and returns the sweep ID (or None)."""
+    global RESUME_SWEEPS 
+    if args.resume or args.fresh:
+        RESUME_SWEEPS = args.resume 
+    return args.sweep_id 
+
+def main_analyzer(test_combinations=None, sweep_id=None):
     """
     The main function for the analyzer.
-    1. Defines the parameter space for all test combinations
+    1. Defines the parameter space for all test combinations (unless given)
     2. Connects to the MQTT broker 
     3. Iterates through each test combination:
         a. Sets up subscriptions with the correct Analyzer QoS.
         b. Resets data collectors 
-        c. Publishes control messages to configure the publishers.
+        c. Publishes control messages to configure the publishers and waits for their 'ready' acks.
         d. Starts a data collection timer thread. 
         e. Triggers the publishers to start sending data.
-        f. Waits for the data collection period to end. 
+        f. Waits for the data collection period to end (messages received after it are not 
+           counted, and bursts still running are stopped), then for the publishers' 'done' acks. 
         g. Calculates performance statistics from the collected data.
-        h. Writes the statistics to a CSV file 
+        h. Writes the statistics to a CSV file and marks the combination done in the run ledger 
+           (with RESUME_SWEEPS, step 3 skips combinations the ledger already records) 
     4. Disconnects from the broker after all tests are complete.
-    """
-    global RECEIVED_PUBLISHER_MSGS, RECEIVED_SYS_MSGS, TEST_START_TIME, DATA_COLLECTION_STOP_EVENT 
 
-    pub_qos_levels = [0, 1, 2]
-    pub_delay_ms = [0, 100]
-    pub_msg_sizes_bytes = [0, 1000, 4000]
-    pub_instance_counts = [1, 5, 10]
-    analyzer_subscription_qos_levels = [0, 1, 2]
+    Args:
+        test_combinations (list): Test params dicts to run, in order. Defaults to the 
+                                  full grid from build_test_combinations().
+        sweep_id (str): Run ledger sweep ID. Defaults to one derived from test_combinations 
+                        and TEST_DURATION_SECONDS (see run_ledger.sweep_id_for).
+    Returns:
+        int: Number of tests whose results were written (0 if it exits early, e.g. can't connect).
+    """
+    global RECEIVED_PUBLISHER_MSGS, RECEIVED_PUBLISHER_STATS, RECEIVED_SYS_MSGS, TEST_START_TIME, DATA_COLLECTION_STOP_EVENT, INGEST_WORKER, CAPTURE_WORKERS, RAW_SUBSCRIBER, COLLECTION_END_NS 
+
+    if test_combinations is None:
+        test_combinations = build_test_combinations()
+    total_tests = len(test_combinations)
+
+    if ANALYZER_CAPTURE_PROCESSES > 1 and (ONLINE_STATS or LIVE_MONITOR or ADAPTIVE_DURATION):
+        print("Analyzer: ANALYZER_CAPTURE_PROCESSES can't be combined with ONLINE_STATS, LIVE_MONITOR or "
+              "ADAPTIVE_DURATION (they need every message in this process). Exiting")
+        return 0 
+    if ANALYZER_CAPTURE_PROCESSES > 1 and RAW_SOCKET_SUBSCRIBER:
+        print("Analyzer: Set either ANALYZER_CAPTURE_PROCESSES or RAW_SOCKET_SUBSCRIBER, not both. Exiting")
+        return 0 
+
+    ledger = RunLedger(sweep_id or sweep_id_for(test_combinations, TEST_DURATION_SECONDS))
+    test_combinations = resume_pending(ledger, test_combinations)
+    if not test_combinations:
+        print(f"Analyzer: Nothing to do; all tests of sweep {ledger.sweep_id} are complete (run with --fresh to measure them again)")
+        return 0 
 
     # Ensure client ID is unique if multiple analyzers run against the same broker
-    analyzer_client_id = f"analyzer_client_{int(time.time())}"
+    analyzer_client_id = f"analyzer_client_{int(time.time())}_{BROKER_PORT}"
     client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=analyzer_client_id)
     client.on_connect = on_connect_analyzer 
     client.on_message = on_message_analyzer 
+    client.on_subscribe = on_subscribe_analyzer 
+    client.on_unsubscribe = on_unsubscribe_analyzer 
 
     try:
         client.connect(BROKER_ADDRESS, BROKER_PORT, 60)
         client.loop_start()
     except Exception as e:
         print(f"Analyzer: Error connecting to broker: {e}. Exiting")
-        return 
+        return 0 
 
     # Wait for connection to establish 
     connection_timeout = 10 
@@ -429,76 +909,147 @@ def main_analyzer():
     if not client.is_connected():
         print("Analyzer: Failed to connect to broker after timeout. Exiting")
         client.loop_stop()
-        return 
+        return 0 
 
-    test_run_ctr = 0 
-    is_first_csv_write = True
+    if INGEST_THREAD: # nothing is subscribed yet, so no message can arrive before this 
+        INGEST_WORKER = IngestWorker(handle_analyzer_message)
+        INGEST_WORKER.start()
 
+    if ANALYZER_CAPTURE_PROCESSES > 1:
+        CAPTURE_WORKERS = CaptureWorkerPool(ANALYZER_CAPTURE_PROCESSES, max(params["pub_instance_count"] for params in test_combinations),
+                                            BROKER_ADDRESS, BROKER_PORT)
+        if not CAPTURE_WORKERS.start():
+            print("Analyzer: Warning - not every capture worker connected; their share of the publishers will show as lost")
 
-    for analyzer_qos_level in analyzer_subscription_qos_levels:
-        client.user_data_set({"current_analyzer_qos": analyzer_qos_level})
-        print(f"\nAnalyzer: Setting up subscriptions for Analyzer QoS = {analyzer_qos_level}")
-        # Unsub from all relevant topics first to ensure QoS change takes effect 
-        client.unsubscribe(DATA_TOPIC_WILDCARD)
-        for sys_topic in SYS_TOPICS_TO_MONITOR:
-            client.unsubscribe(sys_topic)
-        time.sleep(1) 
-
-        # Subscribe with the new Analyzer QoS 
-        client.subscribe(DATA_TOPIC_WILDCARD, qos=analyzer_qos_level)
-        for sys_topic in SYS_TOPICS_TO_MONITOR:
-            client.subscribe(sys_topic, qos=analyzer_qos_level)
-        time.sleep(1)
+    if RAW_SOCKET_SUBSCRIBER:
+        RAW_SUBSCRIBER = RawSubscriber(INGEST_WORKER.ring.put if INGEST_WORKER else handle_analyzer_message, f"{analyzer_client_id}_data")
+        try:
+            raw_connected = RAW_SUBSCRIBER.connect(BROKER_ADDRESS, BROKER_PORT)
+        except OSError as e:
+            print(f"Analyzer: Error connecting the raw-socket subscriber: {e}")
+            raw_connected = False 
+        if not raw_connected:
+            print("Analyzer: Raw-socket subscriber could not connect. Exiting")
+            client.loop_stop()
+            client.disconnect()
+            RAW_SUBSCRIBER = None 
+            return 0 
+
+    # publisher acks are control traffic: always QoS 1, independent of the analyzer QoS under test 
+    _, mid = client.subscribe(STATUS_TOPIC_WILDCARD, qos=1)
+    wait_for_subscription_acks([mid])
+    calibrate_publisher_clocks(client)
+
+    test_run_ctr = total_tests - len(test_combinations) # tests finished by an earlier, interrupted run 
+    completed_tests = 0 
+    subscribed_analyzer_qos = None 
+
+    live_monitor = LiveMonitor(RECEIVED_PUBLISHER_STATS) if LIVE_MONITOR else None 
+    if live_monitor:
+        live_monitor.start()
+
+    for current_test_params in test_combinations:
+        if current_test_params["analyzer_qos"] != subscribed_analyzer_qos:
+            subscribe_with_analyzer_qos(client, current_test_params["analyzer_qos"])
+            subscribed_analyzer_qos = current_test_params["analyzer_qos"]
+
+        test_run_ctr += 1 
+        print(f"\n---- Starting test {test_run_ctr}/{total_tests} ----")
+        print(f"Parameters: {current_test_params}")
+
+        RECEIVED_PUBLISHER_MSGS.clear()
+        RECEIVED_PUBLISHER_STATS.clear()
+        if CAPTURE_WORKERS:
+            CAPTURE_WORKERS.clear()
+        RECEIVED_SYS_MSGS.clear()
+        DATA_COLLECTION_STOP_EVENT.clear()
+        COLLECTION_END_NS = None 
+
+        sync_token = f"{analyzer_client_id}-{test_run_ctr}"
+        not_ready = sync_publishers(client, current_test_params, sync_token)
+        
+        print(f"Analyzer: Starting {'adaptive' if ADAPTIVE_DURATION else f'{TEST_DURATION_SECONDS}s'} data collection...")
+        TEST_START_TIME = time.time()
+        if live_monitor:
+            live_monitor.begin_test(current_test_params)
 
-        for pub_qos_val in pub_qos_levels:
-            for pub_delay_val in pub_delay_ms:
-                for pub_msg_size_val in pub_msg_sizes_bytes:
-                    for pub_instance_count_val in pub_instance_counts:
-                        test_run_ctr += 1 
-                        print(f"\n---- Starting test {test_run_ctr}/162 ----")
-                        current_test_params = {
-                            "analyzer_qos": analyzer_qos_level, 
-                            "pub_qos": pub_qos_val,
-                            "pub_delay": pub_delay_val, 
-                            "pub_msg_size": pub_msg_size_val, 
-                            "pub_instance_count": pub_instance_count_val 
-                        }
-                        print(f"Parameters: {current_test_params}")
-
-                        RECEIVED_PUBLISHER_MSGS.clear()
-                        RECEIVED_SYS_MSGS.clear()
-                        DATA_COLLECTION_STOP_EVENT.clear()
-
-                        publish_control_messages(client, pub_qos_val, pub_delay_val, pub_msg_size_val, pub_instance_count_val)
-                        
-                        print(f"Analyzer: Starting {TEST_DURATION_SECONDS}s data collection...")
-                        TEST_START_TIME = time.time()
-
-                        collection_timer_thread = threading.Thread(target=data_collection_thread_func, args=(TEST_DURATION_SECONDS,))
-                        collection_timer_thread.start()
-
-                        trigger_publishers(client)
-                        collection_timer_thread.join()
-
-                        print("Analyzer: Calculating stats...")
-                        calculated_stats = calculate_stats(current_test_params)
-                        print(f"Analyzer: Results for test {test_run_ctr}:{calculated_stats}")
-
-                        write_results_to_csv(calculated_stats, is_first_write=is_first_csv_write)
-                        if is_first_csv_write:
-                            is_first_csv_write = False 
-
-                        print(f"---- Test {test_run_ctr} Complete ----")
-                        time.sleep(3)
-
-    print("\n==== All 162 Tests Complete ====")
-    print(f"Results saved to {OUTPUT_CSV_FILE}")
+        if ADAPTIVE_DURATION:
+            collection_timer_thread = threading.Thread(target=adaptive_collection_thread_func, args=(ConvergenceTracker(RECEIVED_PUBLISHER_STATS),))
+        else:
+            collection_timer_thread = threading.Thread(target=data_collection_thread_func, args=(TEST_DURATION_SECONDS,))
+        collection_timer_thread.start()
+
+        trigger_publishers(client)
+        collection_timer_thread.join()
+        if TEST_ELAPSED_SECONDS < PUBLISHER_BURST_SECONDS:
+            # publishers burst for a fixed 30s; stop them so the 'done' acks come right away 
+            # and the next test starts clean 
+            stop_publishers_command(client)
+        if live_monitor:
+            live_monitor.end_test()
+
+        publisher_rates, publisher_ack_stats = [], []
+        if SYNC_WITH_ACKS:
+            # the next test may only start once every burst has ended; the 'done' acks also 
+            # carry each publisher's achieved rate for this test's results row 
+            expected_publishers = set(range(1, current_test_params["pub_instance_count"] + 1)) - not_ready 
+            missing = wait_for_publisher_acks("done", sync_token, expected_publishers, PUBLISHER_DONE_TIMEOUT_SECONDS)
+            if missing:
+                print(f"Analyzer: Warning - no 'done' ack within {PUBLISHER_DONE_TIMEOUT_SECONDS}s from publishers {sorted(missing)}")
+            with ACK_CONDITION:
+                publisher_rates = [PUBLISHER_ACHIEVED_RATES[instance_id][1] for instance_id in sorted(expected_publishers - missing)
+                                   if PUBLISHER_ACHIEVED_RATES.get(instance_id, (None,))[0] == sync_token]
+                publisher_ack_stats = [PUBLISHER_ACK_STATS[instance_id][1:] for instance_id in sorted(expected_publishers - missing)
+                                       if PUBLISHER_ACK_STATS.get(instance_id, (None,))[0] == sync_token]
+
+        if INGEST_WORKER:
+            INGEST_WORKER.wait_until_drained() # everything received so far has been parsed 
+        if CAPTURE_WORKERS:
+            merged_rows = CAPTURE_WORKERS.collect()
+            merged_rows = merged_rows[merged_rows[:, COL_RECEIVED_TS] <= COLLECTION_END_NS] # same cut-off as record_publisher_message 
+            legacy_rows = merged_rows[:, COL_SENT_TS] < LEGACY_MS_TIMESTAMP_LIMIT # ms-stamping publishers 
+            merged_rows[legacy_rows, COL_SENT_TS] *= 1_000_000 
+            RECEIVED_PUBLISHER_MSGS.extend(merged_rows)
+        print("Analyzer: Calculating stats...")
+        calculated_stats = calculate_stats(current_test_params, publisher_rates, publisher_ack_stats)
+        print(f"Analyzer: Results for test {test_run_ctr}:{calculated_stats}")
+
+        if write_results_to_csv(calculated_stats):
+            ledger.mark_done(current_test_params, calculated_stats["Test_Run_Timestamp"])
+            completed_tests += 1 
+
+        print(f"---- Test {test_run_ctr} Complete ----")
+        if not SYNC_WITH_ACKS:
+            time.sleep(3)
+
+    print(f"\n==== All {total_tests} Tests Complete ====")
+    print(f"Results saved to {OUTPUT_CSV_FILE} and {results_store.OUTPUT_NPZ_DIR}/")
+    if live_monitor:
+        live_monitor.stop()
     client.loop_stop()
     client.disconnect()
+    if RAW_SUBSCRIBER:
+        RAW_SUBSCRIBER.disconnect()
+        RAW_SUBSCRIBER = None 
+    if INGEST_WORKER:
+        INGEST_WORKER.stop()
+        if INGEST_WORKER.ring.full_waits:
+            print(f"Analyzer: Warning - the ingest ring was full {INGEST_WORKER.ring.full_waits} times; the capture "
+                  f"thread waited for the parser (raise ingest_ring.INGEST_RING_CAPACITY)")
+        INGEST_WORKER = None 
+    if CAPTURE_WORKERS:
+        CAPTURE_WORKERS.stop()
+        CAPTURE_WORKERS = None 
     print("Analyzer: Disconnected and shutdown")
+    return completed_tests 
 
 if __name__ == '__main__':
-    main_analyzer() 
+    parser = argparse.ArgumentParser(description="Run the analyzer sweep against one broker.")
+    parser.add_argument("sweep", nargs="?", help="Sweep spec (.json/.toml); defaults to the full grid")
+    add_resume_arguments(parser)
+    args = parser.parse_args()
+    sweep_id = apply_resume_arguments(args)
+    main_analyzer(build_test_combinations(args.sweep) if args.sweep else None, sweep_id) 
 
 
 
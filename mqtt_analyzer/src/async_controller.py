@@ -0,0 +1,477 @@
+import time
+import socket
+import asyncio
+import argparse
+from collections import defaultdict
+
+import paho.mqtt.client as mqtt
+
+import analyzer
+import payload_format
+import adaptive_duration
+import sweep_scheduler
+from capture_buffer import CaptureBuffer
+from online_stats import OnlineStats
+from adaptive_duration import ConvergenceTracker
+from run_ledger import RunLedger, sweep_id_for
+
+############################# Configurations ##################################
+
+MISC_LOOP_INTERVAL_SECONDS = 1 # paho loop_misc(): keepalive pings and QoS retries
+RECONNECT_INTERVAL_SECONDS = 1
+CONNECT_TIMEOUT_SECONDS = 10
+SOCKET_SEND_BUFFER_BYTES = 2048 # as in paho's asyncio example; keeps writes from piling up in the kernel
+
+###############################################################################
+
+class AsyncAnalyzer:
+    """
+    One analyzer (broker connection, capture and sweep state) driven entirely by an
+    asyncio event loop instead of main_analyzer()'s paho loop_start() thread, timer
+    threads and module globals. paho runs on the event loop through its socket callbacks
+    (add_reader/add_writer on the client socket, loop_misc() from a task), so every
+    callback, and therefore every update of this object's state, happens on the loop
+    thread and needs no lock. Subscribe acks, publisher status acks and the collection
+    window are awaited, and several AsyncAnalyzer instances (one per broker), or
+    monitor() tasks, run side by side in one process.
+
+    Test logic, configuration and the results format are the analyzer's: control
+    messages go out through analyzer.publish_control_messages(), stats come from
+    analyzer.compute_stats() (run in a worker thread so one test's numpy work doesn't
+    stall the other loops' windows), and rows are written with write_results_to_csv().
+    Publisher status acks are required (analyzer.SYNC_WITH_ACKS); ONLINE_STATS and
+    ADAPTIVE_DURATION are honoured, LIVE_MONITOR and the capture offloads
+    (INGEST_THREAD, ANALYZER_CAPTURE_PROCESSES, RAW_SOCKET_SUBSCRIBER) are not used here.
+    Cancelling a running sweep stops the publishers' burst and disconnects.
+    """
+    def __init__(self, broker_port=None, broker_address=None):
+        self.broker_address = broker_address or analyzer.BROKER_ADDRESS
+        self.broker_port = broker_port or analyzer.BROKER_PORT
+        self.name = f"Analyzer [{self.broker_port}]"
+        self.client_id = f"analyzer_async_{int(time.time())}_{self.broker_port}"
+        self.client = None
+        self.loop = None
+        self.misc_task = None
+        self.connected_event = None
+        self.acks_changed = None # set whenever a publisher status ack arrives
+        self.pending_mids = {} # (un)subscribe mid -> future resolved by its SUBACK/UNSUBACK
+        self.closing = False
+
+        self.captured = CaptureBuffer()
+        self.online_stats = OnlineStats()
+        self.sys_msgs = []
+        self.publisher_acks = {} # instance id -> (state, token, detail)
+        self.achieved_rates = {} # instance id -> (token, achieved msg/s)
+        self.ack_stats = {} # instance id -> (token, ack p50 ms, ack p99 ms, max queue depth)
+        self.clock_sync_sent_ns = {}
+        self.clock_samples = defaultdict(list)
+        self.clock_offsets_ns = {}
+        self.subscribed_analyzer_qos = None
+        self.window_start_time = None # loop.time() the current collection window began
+        self.collecting = False # publisher messages are only recorded from a test's reset to the end of its window
+
+    # ---- paho on the event loop -------------------------------------------------
+
+    def _on_socket_open(self, client, userdata, sock):
+        self.loop.add_reader(sock, client.loop_read)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_SEND_BUFFER_BYTES)
+
+    def _on_socket_close(self, client, userdata, sock):
+        self.loop.remove_reader(sock)
+
+    def _on_socket_register_write(self, client, userdata, sock):
+        self.loop.add_writer(sock, client.loop_write)
+
+    def _on_socket_unregister_write(self, client, userdata, sock):
+        self.loop.remove_writer(sock)
+
+    async def _misc_loop(self):
+        while True:
+            await asyncio.sleep(MISC_LOOP_INTERVAL_SECONDS)
+            if self.client.loop_misc() == mqtt.MQTT_ERR_NO_CONN and not self.closing:
+                try:
+                    print(f"{self.name}: Reconnecting to broker...")
+                    self.client.reconnect() # _on_connect restores the subscriptions
+                except OSError as e:
+                    print(f"{self.name}: Reconnect failed: {e}")
+                    await asyncio.sleep(RECONNECT_INTERVAL_SECONDS)
+
+    def _on_connect(self, client, userdata, flags, reason_code, properties=None):
+        if reason_code == 0:
+            print(f"{self.name}: Connected to MQTT Broker!")
+            if self.subscribed_analyzer_qos is not None: # reconnected: the clean session dropped our subscriptions
+                self.loop.create_task(self._restore_subscriptions())
+            self.connected_event.set()
+        else:
+            print(f"{self.name}: Failed to connect, return code {reason_code}")
+
+    def _on_disconnect(self, client, userdata, flags, reason_code, properties=None):
+        self.connected_event.clear()
+        if not self.closing:
+            print(f"{self.name}: Disconnected from broker ({reason_code})")
+
+    def _on_subscribe(self, client, userdata, mid, reason_code_list, properties=None):
+        for reason_code in reason_code_list:
+            if reason_code.is_failure:
+                print(f"{self.name}: Subscription (mid {mid}) failed: {reason_code}")
+        future = self.pending_mids.pop(mid, None)
+        if future and not future.done():
+            future.set_result(reason_code_list)
+
+    def _on_message(self, client, userdata, msg):
+        received_ns = time.time_ns()
+        topic = msg._topic
+        if topic.startswith(b"counter/"):
+            if not self.collecting:
+                return
+            try:
+                instance_id, ctr, sent_ns = payload_format.parse_publisher_message(topic, msg.payload)
+            except ValueError as e:
+                print(f"{self.name}: Received malformed publisher message on {topic!r}: {e}")
+                return
+            if sent_ns < analyzer.LEGACY_MS_TIMESTAMP_LIMIT:
+                sent_ns *= 1_000_000
+            if analyzer.ONLINE_STATS or analyzer.ADAPTIVE_DURATION:
+                self.online_stats.update(instance_id, ctr, received_ns // 1_000_000,
+                                         received_ns - sent_ns + self.clock_offsets_ns.get(instance_id, 0))
+            if not analyzer.ONLINE_STATS:
+                self.captured.append(instance_id, ctr, sent_ns, received_ns)
+        elif topic.startswith(b"status/"):
+            self._handle_status(msg.topic, msg.payload.decode(errors="replace"), received_ns)
+        elif msg.topic in analyzer.SYS_TOPICS_TO_MONITOR:
+            self.sys_msgs.append({"topic": msg.topic, "payload": msg.payload.decode(errors="replace"),
+                                  "analyzer_timestamp_received": received_ns // 1_000_000})
+
+    def _handle_status(self, topic, payload_str, received_ns):
+        """Records a publisher status ack (same format as analyzer.handle_analyzer_message)."""
+        try:
+            state, token, detail = payload_str.split(':', 2)
+            instance_id = int(topic.split('/')[1])
+            if state == "clock":
+                if int(token) in self.clock_sync_sent_ns:
+                    self.clock_samples[instance_id].append((self.clock_sync_sent_ns[int(token)], int(detail), received_ns))
+                return
+            detail_fields = detail.split(':')
+            if state == "done":
+                achieved_rate, ack_stats = analyzer.parse_done_detail(detail_fields)
+                if achieved_rate is not None:
+                    self.achieved_rates[instance_id] = (token, achieved_rate)
+                if ack_stats is not None:
+                    self.ack_stats[instance_id] = (token, *ack_stats)
+            self.publisher_acks[instance_id] = (state, token, int(detail_fields[0]))
+            self.acks_changed.set()
+        except (ValueError, IndexError):
+            print(f"{self.name}: Received malformed publisher status: Topic={topic}, Payload={payload_str}")
+
+    # ---- connection and subscriptions --------------------------------------------
+
+    async def connect(self):
+        """
+        Connects to the broker, subscribes to the publisher status topics and calibrates
+        the publisher clocks.
+
+        Returns:
+            bool: True once connected.
+        """
+        self.loop = asyncio.get_running_loop()
+        self.connected_event = asyncio.Event()
+        self.acks_changed = asyncio.Event()
+        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=self.client_id)
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
+        self.client.on_message = self._on_message
+        self.client.on_subscribe = self._on_subscribe
+        self.client.on_unsubscribe = self._on_subscribe
+        self.client.on_socket_open = self._on_socket_open
+        self.client.on_socket_close = self._on_socket_close
+        self.client.on_socket_register_write = self._on_socket_register_write
+        self.client.on_socket_unregister_write = self._on_socket_unregister_write
+        try:
+            self.client.connect(self.broker_address, self.broker_port, 60)
+        except OSError as e:
+            print(f"{self.name}: Error connecting to broker: {e}")
+            return False
+        self.misc_task = asyncio.create_task(self._misc_loop())
+        try:
+            await asyncio.wait_for(self.connected_event.wait(), CONNECT_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            print(f"{self.name}: Failed to connect to broker after timeout")
+            return False
+
+        # publisher acks are control traffic: always QoS 1, independent of the analyzer QoS under test
+        await self._await_mid(self.client.subscribe(analyzer.STATUS_TOPIC_WILDCARD, qos=1)[1])
+        await self.calibrate_publisher_clocks()
+        return True
+
+    async def _restore_subscriptions(self):
+        await self._await_mid(self.client.subscribe(analyzer.STATUS_TOPIC_WILDCARD, qos=1)[1])
+        await self.subscribe_with_analyzer_qos(self.subscribed_analyzer_qos)
+
+    async def close(self):
+        """Sends what is still queued (e.g. a 'stop' command), disconnects and stops driving the client."""
+        self.closing = True
+        if self.misc_task:
+            self.misc_task.cancel()
+            self.misc_task = None
+        if self.client and self.client.is_connected():
+            self.client.disconnect()
+            deadline = self.loop.time() + CONNECT_TIMEOUT_SECONDS
+            while self.client.want_write() and self.loop.time() < deadline:
+                await asyncio.sleep(0.01) # the socket writer callback sends the queued packets
+
+    async def _await_mid(self, mid):
+        """Waits for the broker to acknowledge an (un)subscribe request."""
+        future = self.loop.create_future()
+        self.pending_mids[mid] = future
+        try:
+            await asyncio.wait_for(future, analyzer.SUBSCRIBE_ACK_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            self.pending_mids.pop(mid, None)
+            print(f"{self.name}: Warning - broker did not acknowledge (un)subscribe within {analyzer.SUBSCRIBE_ACK_TIMEOUT_SECONDS}s")
+
+    async def subscribe_with_analyzer_qos(self, analyzer_qos_level):
+        """(Re)subscribes to the publisher data and $SYS topics with the given analyzer QoS."""
+        print(f"\n{self.name}: Setting up subscriptions for Analyzer QoS = {analyzer_qos_level}")
+        topics = [analyzer.DATA_TOPIC_WILDCARD] + analyzer.SYS_TOPICS_TO_MONITOR
+        await self._await_mid(self.client.unsubscribe(topics)[1])
+        await self._await_mid(self.client.subscribe([(topic, analyzer_qos_level) for topic in topics])[1])
+        self.subscribed_analyzer_qos = analyzer_qos_level
+
+    async def calibrate_publisher_clocks(self):
+        """NTP-style publisher clock offsets, as analyzer.calibrate_publisher_clocks()."""
+        self.clock_sync_sent_ns.clear()
+        self.clock_samples.clear()
+        for sync_round in range(analyzer.CLOCK_SYNC_ROUNDS):
+            self.clock_sync_sent_ns[sync_round] = time.time_ns()
+            self.client.publish(analyzer.REQUEST_TOPIC_CLOCKSYNC, str(sync_round), qos=0)
+            await asyncio.sleep(analyzer.CLOCK_SYNC_ROUND_SECONDS)
+        await asyncio.sleep(analyzer.CLOCK_SYNC_SETTLE_SECONDS)
+
+        self.clock_offsets_ns.clear()
+        for instance_id, samples in sorted(self.clock_samples.items()):
+            t0, t1, t2 = min(samples, key=lambda sample: sample[2] - sample[0])
+            self.clock_offsets_ns[instance_id] = t1 - (t0 + t2) // 2
+        if self.clock_offsets_ns:
+            print(f"{self.name}: Clock offsets for {len(self.clock_offsets_ns)} publishers, "
+                  f"max |offset| {max(abs(offset) for offset in self.clock_offsets_ns.values()) / 1e3:.1f} us")
+        else:
+            print(f"{self.name}: No clock sync replies; latencies assume publishers share the analyzer clock")
+
+    # ---- one test ----------------------------------------------------------------
+
+    async def wait_for_publisher_acks(self, state, token, instance_ids, timeout_seconds, on_retry=None):
+        """
+        Waits until every publisher in instance_ids has acked `state` with `token`.
+        on_retry(missing) is called every PUBLISHER_SYNC_RETRY_SECONDS meanwhile.
+
+        Returns:
+            set: Instance ids that did not ack in time.
+        """
+        deadline = self.loop.time() + timeout_seconds
+        next_retry = self.loop.time() + analyzer.PUBLISHER_SYNC_RETRY_SECONDS
+        while True:
+            missing = {instance_id for instance_id in instance_ids
+                       if self.publisher_acks.get(instance_id, (None, None))[:2] != (state, token)}
+            now = self.loop.time()
+            if not missing or now >= deadline:
+                return missing
+            if on_retry and now >= next_retry:
+                on_retry(missing)
+                next_retry = now + analyzer.PUBLISHER_SYNC_RETRY_SECONDS
+            self.acks_changed.clear()
+            try:
+                await asyncio.wait_for(self.acks_changed.wait(), (min(deadline, next_retry) if on_retry else deadline) - now)
+            except asyncio.TimeoutError:
+                pass
+
+    async def sync_publishers(self, test_params, token):
+        """Sends the test's config and sync token and waits for the 'ready' acks (see analyzer.sync_publishers)."""
+        def send_config(missing=None):
+            analyzer.publish_control_messages(self.client, test_params["pub_qos"], test_params["pub_delay"], test_params["pub_msg_size"],
+                                              test_params["pub_instance_count"], test_params.get("pub_payload_random", 0),
+                                              test_params.get("pub_payload_binary", 0),
+                                              test_params.get("pub_max_inflight", analyzer.DEFAULT_PUB_MAX_INFLIGHT),
+                                              test_params.get("pub_max_queued", analyzer.DEFAULT_PUB_MAX_QUEUED))
+            self.client.publish(analyzer.REQUEST_TOPIC_SYNC, token, qos=1)
+
+        send_config()
+        missing = await self.wait_for_publisher_acks("ready", token, range(1, test_params["pub_instance_count"] + 1),
+                                                     analyzer.PUBLISHER_READY_TIMEOUT_SECONDS, on_retry=send_config)
+        if missing:
+            print(f"{self.name}: Warning - no 'ready' ack within {analyzer.PUBLISHER_READY_TIMEOUT_SECONDS}s from publishers {sorted(missing)}; starting anyway")
+        else:
+            print(f"{self.name}: All {test_params['pub_instance_count']} publishers ready")
+        return missing
+
+    async def collect(self):
+        """
+        The data collection window: a fixed TEST_DURATION_SECONDS, or with ADAPTIVE_DURATION
+        until the online stats converge (see analyzer.adaptive_collection_thread_func).
+
+        Returns:
+            tuple: (window length in s, convergence dict or None).
+        """
+        self.window_start_time = self.loop.time()
+        if not analyzer.ADAPTIVE_DURATION:
+            await asyncio.sleep(analyzer.TEST_DURATION_SECONDS)
+            print(f"{self.name}: {analyzer.TEST_DURATION_SECONDS}s data collection period ended")
+            return analyzer.TEST_DURATION_SECONDS, None
+
+        tracker = ConvergenceTracker(self.online_stats)
+        next_sample_time = self.window_start_time
+        while True:
+            next_sample_time += adaptive_duration.ADAPTIVE_SAMPLE_INTERVAL_SECONDS
+            await asyncio.sleep(max(0, next_sample_time - self.loop.time()))
+            tracker.sample()
+            elapsed = self.loop.time() - self.window_start_time
+            converged = elapsed >= adaptive_duration.ADAPTIVE_MIN_SECONDS and tracker.converged()
+            if converged or elapsed >= adaptive_duration.ADAPTIVE_MAX_SECONDS:
+                break
+        convergence = dict(tracker.confidence(), converged=converged)
+        print(f"{self.name}: Adaptive data collection ended after {elapsed:.1f}s ({'converged' if converged else 'max duration reached'})")
+        return elapsed, convergence
+
+    async def run_test(self, test_params, token):
+        """
+        Runs one test: subscriptions, publisher sync, collection window, 'done' acks and stats.
+
+        Returns:
+            dict: The results row (see analyzer.calculate_stats()).
+        """
+        if test_params["analyzer_qos"] != self.subscribed_analyzer_qos:
+            await self.subscribe_with_analyzer_qos(test_params["analyzer_qos"])
+        self.captured.clear()
+        self.online_stats.clear()
+        self.sys_msgs.clear()
+        self.collecting = True
+
+        not_ready = await self.sync_publishers(test_params, token)
+        print(f"{self.name}: Triggering publishers ('request/go start')")
+        self.client.publish(analyzer.REQUEST_TOPIC_GO, "start", qos=1)
+        try:
+            collection_seconds, convergence = await self.collect()
+        except asyncio.CancelledError:
+            self.client.publish(analyzer.REQUEST_TOPIC_GO, "stop", qos=1)
+            raise
+        finally:
+            self.window_start_time = None
+            self.collecting = False # messages arriving while waiting for the 'done' acks are not counted
+        if collection_seconds < analyzer.PUBLISHER_BURST_SECONDS:
+            self.client.publish(analyzer.REQUEST_TOPIC_GO, "stop", qos=1)
+
+        expected_publishers = set(range(1, test_params["pub_instance_count"] + 1)) - not_ready
+        missing = await self.wait_for_publisher_acks("done", token, expected_publishers, analyzer.PUBLISHER_DONE_TIMEOUT_SECONDS)
+        if missing:
+            print(f"{self.name}: Warning - no 'done' ack within {analyzer.PUBLISHER_DONE_TIMEOUT_SECONDS}s from publishers {sorted(missing)}")
+        reporting = sorted(expected_publishers - missing)
+        publisher_rates = [self.achieved_rates[instance_id][1] for instance_id in reporting
+                           if self.achieved_rates.get(instance_id, (None,))[0] == token]
+        publisher_ack_stats = [self.ack_stats[instance_id][1:] for instance_id in reporting
+                               if self.ack_stats.get(instance_id, (None,))[0] == token]
+
+        captured_rows = self.captured.rows()
+        sys_msgs = list(self.sys_msgs)
+        online_stats = self.online_stats if analyzer.ONLINE_STATS else None
+        return await asyncio.to_thread(analyzer.compute_stats, test_params, captured_rows, sys_msgs, collection_seconds,
+                                       dict(self.clock_offsets_ns), publisher_rates, publisher_ack_stats,
+                                       online_stats=online_stats, convergence=convergence)
+
+    # ---- sweeps and monitors -----------------------------------------------------
+
+    async def run_sweep(self, test_combinations, sweep_id=None):
+        """
+        Connects, runs the given tests in order (with analyzer.RESUME_SWEEPS, skipping ones the
+        run ledger has already recorded for sweep_id), writes each results row and records it
+        in the ledger, and disconnects, also when cancelled.
+
+        Returns:
+            int: Number of tests completed.
+        """
+        ledger = RunLedger(sweep_id or sweep_id_for(test_combinations, analyzer.TEST_DURATION_SECONDS))
+        test_combinations = analyzer.resume_pending(ledger, test_combinations, self.name)
+        if not test_combinations:
+            print(f"{self.name}: Nothing to do; all tests are complete (run with --fresh to measure them again)")
+            return 0
+
+        completed = 0
+        try:
+            if not await self.connect():
+                return 0
+            for test_index, test_params in enumerate(test_combinations, start=1):
+                print(f"\n---- {self.name}: starting test {test_index}/{len(test_combinations)} ----")
+                print(f"Parameters: {test_params}")
+                results = await self.run_test(test_params, f"{self.client_id}-{test_index}")
+                print(f"{self.name}: Results for test {test_index}:{results}")
+                if analyzer.write_results_to_csv(results):
+                    ledger.mark_done(test_params, results["Test_Run_Timestamp"])
+                completed += 1
+        except asyncio.CancelledError:
+            print(f"{self.name}: Sweep cancelled after {completed} tests")
+            raise
+        finally:
+            await self.close()
+        print(f"{self.name}: {completed} tests complete")
+        return completed
+
+    async def monitor(self, interval_seconds):
+        """Prints the receive rate and active publishers of the running collection window every interval_seconds."""
+        last_window, last_count = None, 0
+        while True:
+            await asyncio.sleep(interval_seconds)
+            if self.window_start_time is None:
+                continue
+            if self.window_start_time != last_window: # a new window started since the last report
+                last_window, last_count = self.window_start_time, 0
+            count = len(self.online_stats) if analyzer.ONLINE_STATS else len(self.captured)
+            print(f"{self.name}: {(count - last_count) / interval_seconds:,.0f} msg/s over the last {interval_seconds}s, "
+                  f"{count} messages in {self.loop.time() - self.window_start_time:.0f}s of this window")
+            last_count = count
+
+async def run_sweeps(broker_ports, test_combinations=None, monitor_seconds=None, sweep_id=None):
+    """
+    Runs the sweep concurrently against several local brokers from one process and one
+    event loop: the combinations are split as in sweep_scheduler.run_parallel_sweep(),
+    and each broker gets an AsyncAnalyzer (and optionally a monitor task). Results rows
+    go straight to analyzer.OUTPUT_CSV_FILE; all writes happen on the loop thread, so
+    rows from different brokers never interleave.
+
+    Args:
+        broker_ports (list): One port per broker instance (each needs its own publishers).
+        test_combinations (list): Test params dicts. Defaults to the full analyzer grid.
+        monitor_seconds (float): If set, print each broker's receive rate this often.
+        sweep_id (str): Run ledger sweep ID. Defaults to one derived from the whole sweep.
+    """
+    if test_combinations is None:
+        test_combinations = analyzer.build_test_combinations()
+    sweep_id = sweep_id or sweep_id_for(test_combinations, analyzer.TEST_DURATION_SECONDS)
+    controllers, sweeps = [], []
+    for port, shard in zip(broker_ports, sweep_scheduler.shard_combinations(test_combinations, len(broker_ports))):
+        if shard:
+            controller = AsyncAnalyzer(port)
+            controllers.append(controller)
+            sweeps.append(controller.run_sweep(shard, sweep_id))
+    monitors = [asyncio.create_task(controller.monitor(monitor_seconds)) for controller in controllers] if monitor_seconds else []
+
+    sweep_start_time = time.time()
+    try:
+        completed = await asyncio.gather(*sweeps)
+    finally:
+        for task in monitors:
+            task.cancel()
+    print(f"\nAnalyzer: {sum(completed)} tests on {len(controllers)} brokers finished in "
+          f"{(time.time() - sweep_start_time) / 60:.1f} min; results in {analyzer.OUTPUT_CSV_FILE}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run analyzer sweeps against one or more brokers from a single asyncio event loop.")
+    parser.add_argument("ports", nargs="*", type=int, default=[analyzer.BROKER_PORT], help="Broker ports, one analyzer per port")
+    parser.add_argument("--sweep", help="Sweep spec (.json/.toml); defaults to the full grid")
+    parser.add_argument("--monitor-seconds", type=float, help="Print each broker's receive rate this often")
+    analyzer.add_resume_arguments(parser)
+    args = parser.parse_args()
+    sweep_id = analyzer.apply_resume_arguments(args)
+    if not analyzer.SYNC_WITH_ACKS:
+        parser.error("the asyncio controller needs publishers that send status acks (analyzer.SYNC_WITH_ACKS)")
+    try:
+        asyncio.run(run_sweeps(args.ports, analyzer.build_test_combinations(args.sweep) if args.sweep else None, args.monitor_seconds, sweep_id))
+    except KeyboardInterrupt:
+        print("Analyzer: Interrupted; publishers were told to stop")
@@ -0,0 +1,237 @@
+import time
+import threading
+import multiprocessing
+import numpy as np
+import paho.mqtt.client as mqtt
+
+import payload_format
+from capture_buffer import CaptureBuffer, COL_RECEIVED_TS
+
+############################# Configurations ##################################
+
+# 'topics': worker k subscribes to counter/<id>/# for every K-th publisher ID, so each
+# publisher's stream is captured whole by one process. 'shared': every worker subscribes
+# to $share/<group>/counter/# and the broker spreads messages across them (needs broker
+# support for shared subscriptions; one publisher's messages then land in several workers).
+CAPTURE_SPLIT_MODE = "topics"
+CAPTURE_SHARE_GROUP = "mqtt_analyzer"
+CAPTURE_WORKER_STARTUP_TIMEOUT_SECONDS = 10
+CAPTURE_WORKER_REPLY_TIMEOUT_SECONDS = 30 # collect() pickles a full test's rows through the pipe
+CAPTURE_SUBSCRIBE_TIMEOUT_SECONDS = 5
+
+###############################################################################
+
+def topic_filters_for_worker(worker_index, num_workers, max_instance_number):
+    """
+    Data topic filters one capture worker subscribes to.
+
+    Args:
+        worker_index (int): 0-based worker index.
+        num_workers (int): Number of capture workers.
+        max_instance_number (int): Highest publisher ID the sweep uses.
+    Returns:
+        list: Topic filters, e.g. ['counter/01/#', 'counter/05/#', ...] for worker 0 of 4.
+    """
+    if CAPTURE_SPLIT_MODE == "shared":
+        return [f"$share/{CAPTURE_SHARE_GROUP}/counter/#"]
+    return [f"counter/{instance_id:02d}/#" for instance_id in range(worker_index + 1, max_instance_number + 1, num_workers)]
+
+def _run_capture_worker(worker_index, broker_address, broker_port, conn):
+    """
+    Body of one capture worker process: an MQTT client that appends every publisher
+    message it receives to its own CaptureBuffer, and serves commands from the analyzer
+    over `conn` until told to stop:
+        (seq, 'subscribe', qos, filters) -> (seq, 'subscribed', ok)
+        (seq, 'clear')                   -> (seq, 'cleared')
+        (seq, 'collect')                 -> (seq, 'rows', (n, 4) int64 array, malformed count)
+        (seq, 'stop')
+    Every reply echoes its command's sequence number; the startup reply is (0, 'connected', ok).
+    Sent timestamps are stored as received; the analyzer scales legacy ms stamps after merging.
+    """
+    state = {"buffer": CaptureBuffer(), "malformed": 0}
+    buffer_lock = threading.Lock() # the buffer is swapped out by 'clear'/'collect' on this thread
+    acked_mids = set()
+    ack_condition = threading.Condition()
+
+    def on_message(client, userdata, msg):
+        received_ns = time.time_ns()
+        try:
+            instance_id, ctr, sent_ts = payload_format.parse_publisher_message(msg._topic, msg.payload)
+        except ValueError:
+            state["malformed"] += 1
+            return
+        with buffer_lock:
+            state["buffer"].append(instance_id, ctr, sent_ts, received_ns)
+
+    def on_ack(client, userdata, mid, reason_code_list, properties=None):
+        for reason_code in reason_code_list:
+            if reason_code.is_failure:
+                print(f"Analyzer [capture {worker_index}]: (Un)subscribe (mid {mid}) failed: {reason_code}")
+        with ack_condition:
+            acked_mids.add(mid)
+            ack_condition.notify_all()
+
+    def wait_for_ack(mid):
+        with ack_condition:
+            return ack_condition.wait_for(lambda: mid in acked_mids, timeout=CAPTURE_SUBSCRIBE_TIMEOUT_SECONDS)
+
+    def swap_buffer():
+        with buffer_lock:
+            old_buffer, state["buffer"] = state["buffer"], CaptureBuffer()
+        return old_buffer
+
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=f"analyzer_capture_{worker_index}_{int(time.time())}_{broker_port}")
+    client.on_message = on_message
+    client.on_subscribe = on_ack
+    client.on_unsubscribe = on_ack
+    try:
+        client.connect(broker_address, broker_port, 60)
+        client.loop_start()
+        deadline = time.time() + CAPTURE_WORKER_STARTUP_TIMEOUT_SECONDS
+        while not client.is_connected() and time.time() < deadline:
+            time.sleep(0.05)
+        conn.send((0, "connected", client.is_connected()))
+    except OSError as e:
+        print(f"Analyzer [capture {worker_index}]: Error connecting to broker: {e}")
+        conn.send((0, "connected", False))
+        return
+
+    subscribed_filters = []
+    try:
+        while True:
+            seq, *command = conn.recv()
+            if command[0] == "subscribe":
+                _, qos, filters = command
+                ok = True
+                if subscribed_filters:
+                    _, mid = client.unsubscribe(subscribed_filters)
+                    ok = wait_for_ack(mid)
+                _, mid = client.subscribe([(topic_filter, qos) for topic_filter in filters])
+                ok = wait_for_ack(mid) and ok
+                subscribed_filters = filters
+                conn.send((seq, "subscribed", ok))
+            elif command[0] == "clear":
+                swap_buffer()
+                state["malformed"] = 0
+                conn.send((seq, "cleared"))
+            elif command[0] == "collect":
+                conn.send((seq, "rows", swap_buffer().rows(), state["malformed"]))
+                state["malformed"] = 0
+            elif command[0] == "stop":
+                break
+    except (EOFError, KeyboardInterrupt):
+        pass # analyzer went away
+    finally:
+        client.loop_stop()
+        client.disconnect()
+
+class CaptureWorkerPool:
+    """
+    K analyzer subscriber processes that split the publisher data topics between them,
+    so receiving and parsing publisher messages scales past the one core a single paho
+    client (and the GIL) can use. The analyzer's own client keeps the status and $SYS
+    topics; each test, clear() empties every worker's capture and collect() merges them
+    into one array in receive order for calculate_stats().
+
+    All workers run on the analyzer's host, so their receive timestamps come from the
+    same clock and merging by receive time gives the true arrival order.
+
+    Each request carries a sequence number that the workers echo, so a reply that
+    arrives after its request timed out is discarded by the next request instead of
+    being taken as that request's answer.
+    """
+    def __init__(self, num_workers, max_instance_number, broker_address, broker_port):
+        self.num_workers = num_workers
+        self.max_instance_number = max_instance_number
+        self.broker_address = broker_address
+        self.broker_port = broker_port
+        self.processes = []
+        self.conns = []
+        self.sequence = 0 # of the last request; 0 is the workers' startup reply
+
+    def start(self):
+        """
+        Starts the worker processes and waits for them to connect.
+
+        Returns:
+            bool: True if every worker connected to the broker.
+        """
+        for worker_index in range(self.num_workers):
+            parent_conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_run_capture_worker, daemon=True,
+                                              args=(worker_index, self.broker_address, self.broker_port, child_conn))
+            process.start()
+            self.processes.append(process)
+            self.conns.append(parent_conn)
+        replies = self._request_all(None, CAPTURE_WORKER_STARTUP_TIMEOUT_SECONDS + 5)
+        connected = sum(1 for reply in replies if reply and reply[1])
+        print(f"Analyzer: {connected}/{self.num_workers} capture workers connected ({CAPTURE_SPLIT_MODE} split)")
+        return connected == self.num_workers
+
+    def subscribe(self, qos):
+        """
+        (Re)subscribes every worker to its share of the data topics with the given QoS.
+
+        Returns:
+            bool: True if every worker's subscription was acknowledged.
+        """
+        commands = [("subscribe", qos, topic_filters_for_worker(worker_index, self.num_workers, self.max_instance_number))
+                    for worker_index in range(self.num_workers)]
+        return all(reply and reply[1] for reply in self._request_all(commands, CAPTURE_SUBSCRIBE_TIMEOUT_SECONDS * 2 + 1))
+
+    def clear(self):
+        """Drops everything the workers captured so far (call before each test)."""
+        self._request_all([("clear",)] * len(self.conns), CAPTURE_WORKER_REPLY_TIMEOUT_SECONDS)
+
+    def collect(self):
+        """
+        Takes every worker's capture since the last clear()/collect() and merges it.
+
+        Returns:
+            np.ndarray: (n, 4) int64 rows as in CaptureBuffer.rows(), ordered by receive time.
+        """
+        replies = self._request_all([("collect",)] * len(self.conns), CAPTURE_WORKER_REPLY_TIMEOUT_SECONDS)
+        parts = [reply[1] for reply in replies if reply]
+        malformed = sum(reply[2] for reply in replies if reply)
+        if malformed:
+            print(f"Analyzer: Capture workers dropped {malformed} malformed publisher messages")
+        if len(parts) < len(replies):
+            print(f"Analyzer: Warning - {len(replies) - len(parts)} capture workers did not reply; their messages are missing")
+        if not parts:
+            return np.empty((0, 4), dtype=np.int64)
+        rows = np.concatenate(parts)
+        return rows[np.argsort(rows[:, COL_RECEIVED_TS], kind="stable")]
+
+    def stop(self):
+        for conn in self.conns:
+            try:
+                conn.send((self.sequence + 1, "stop"))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.processes, self.conns = [], []
+
+    def _request_all(self, commands, timeout_seconds):
+        """
+        Sends each worker its command under a new sequence number (None: wait for the
+        startup replies) and returns each one's reply without the sequence number, None
+        where it timed out. Late replies to earlier requests are read and dropped.
+        """
+        if commands is not None:
+            self.sequence += 1
+            for conn, command in zip(self.conns, commands):
+                conn.send((self.sequence,) + command)
+        deadline = time.time() + timeout_seconds
+        replies = []
+        for worker_index, conn in enumerate(self.conns):
+            reply = None
+            while reply is None and conn.poll(max(deadline - time.time(), 0)):
+                seq, *reply = conn.recv()
+                if seq != self.sequence:
+                    print(f"Analyzer: Discarding late '{reply[0]}' reply from capture worker {worker_index}")
+                    reply = None
+            replies.append(tuple(reply) if reply else None)
+        return replies
@@ -0,0 +1,122 @@
+import time
+import threading
+
+############################# Configurations ##################################
+
+INGEST_RING_CAPACITY = 1 << 20 # slots; a power of two (about 2 s of backlog at 500k msg/s)
+INGEST_BATCH = 4096 # messages handled per drain before the consumer publishes its progress
+INGEST_IDLE_SLEEP_SECONDS = 0.0005 # consumer poll interval while the ring is empty
+INGEST_FULL_SLEEP_SECONDS = 0.0001 # producer back-off while the ring is full
+
+###############################################################################
+
+class IngestRing:
+    """
+    Single-producer single-consumer ring of (topic bytes, payload bytes, receive time ns)
+    entries, used to hand received messages from the capture thread to a parsing worker.
+    Slots are preallocated lists indexed by a monotonically increasing position masked to
+    the capacity. The producer only ever writes `head` and the consumer only `tail`, each
+    with a single attribute store, so no lock is taken on either side; a slot is filled
+    before `head` moves past it and released before `tail` does.
+
+    When the ring is full, put() backs off until the consumer frees a slot rather than
+    dropping the message (loss must only ever be what the broker and network lost); the
+    number of such waits is counted in `full_waits`.
+    """
+    def __init__(self, capacity=INGEST_RING_CAPACITY):
+        if capacity & (capacity - 1):
+            raise ValueError(f"ring capacity must be a power of two, got {capacity}")
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.topics = [None] * capacity
+        self.payloads = [None] * capacity
+        self.received_ns = [0] * capacity
+        self.head = 0 # next position to write (producer)
+        self.tail = 0 # next position to read (consumer)
+        self.full_waits = 0
+
+    def put(self, topic, payload, received_ns):
+        """Enqueues one message. Called only from the capture thread."""
+        head = self.head
+        while head - self.tail > self.mask:
+            self.full_waits += 1
+            time.sleep(INGEST_FULL_SLEEP_SECONDS)
+        slot = head & self.mask
+        self.topics[slot] = topic
+        self.payloads[slot] = payload
+        self.received_ns[slot] = received_ns
+        self.head = head + 1
+
+    def drain(self, handler, max_items=INGEST_BATCH):
+        """
+        Passes up to max_items queued messages to handler(topic, payload, received_ns)
+        in arrival order. Called only from the consumer thread.
+
+        Returns:
+            int: Number of messages handled.
+        """
+        tail = self.tail
+        end = min(self.head, tail + max_items)
+        topics, payloads, received_ns, mask = self.topics, self.payloads, self.received_ns, self.mask
+        for position in range(tail, end):
+            slot = position & mask
+            try:
+                handler(topics[slot], payloads[slot], received_ns[slot])
+            except Exception as e: # one bad message must not stop the worker
+                print(f"Analyzer [ingest]: Error handling message on {topics[slot]!r}: {e}")
+            topics[slot] = payloads[slot] = None # don't keep payloads alive until the slot is reused
+        self.tail = end
+        return end - tail
+
+    def __len__(self):
+        return self.head - self.tail
+
+class IngestWorker:
+    """
+    Drains an IngestRing on its own thread, calling handler for every message, so the
+    paho network thread only timestamps and enqueues. wait_until_drained() lets the
+    caller wait for everything received so far to have been handled (e.g. before
+    computing a test's statistics).
+    """
+    def __init__(self, handler, ring=None):
+        self.handler = handler
+        self.ring = ring or IngestRing()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.handled = 0
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Handles what is still queued, then stops the worker thread."""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+
+    def _run(self):
+        drain, handler = self.ring.drain, self.handler
+        while True:
+            handled = drain(handler)
+            self.handled += handled
+            if not handled:
+                if self.stop_event.is_set():
+                    return
+                time.sleep(INGEST_IDLE_SLEEP_SECONDS)
+
+    def wait_until_drained(self, timeout_seconds=None):
+        """
+        Blocks until every message enqueued before this call has been handled.
+
+        Returns:
+            bool: False if the timeout expired first.
+        """
+        target = self.ring.head
+        deadline = None if timeout_seconds is None else time.time() + timeout_seconds
+        while self.ring.tail < target:
+            if deadline is not None and time.time() >= deadline:
+                return False
+            time.sleep(INGEST_IDLE_SLEEP_SECONDS)
+        return True
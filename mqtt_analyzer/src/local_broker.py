@@ -0,0 +1,548 @@
+import sys
+import math
+import time
+import shutil
+import socket
+import struct
+import asyncio
+import argparse
+import itertools
+from collections import deque
+import threading
+import subprocess
+
+############################# Configurations ##################################
+
+LOCAL_BROKER_HOST = "127.0.0.1"
+LOCAL_BROKER_PORT = 1883
+LOCAL_BROKER_VERSION = "mqtt_analyzer local_broker 1.0"
+# $SYS/broker/... topics are (re)published, retained, this often (mosquitto's sys_interval)
+LOCAL_BROKER_SYS_INTERVAL_SECONDS = 10
+# QoS 0 messages to a client whose unsent output exceeds this are dropped (counted in
+# $SYS/broker/publish/messages/dropped), like mosquitto's max_queued_messages
+LOCAL_BROKER_MAX_CLIENT_BUFFER_BYTES = 64 << 20
+# QoS 1/2 deliveries awaiting acknowledgement per client; more wait in a queue of up to
+# LOCAL_BROKER_MAX_QUEUED_MESSAGES and the rest are dropped (mosquitto's defaults)
+LOCAL_BROKER_MAX_INFLIGHT_MESSAGES = 20
+LOCAL_BROKER_MAX_QUEUED_MESSAGES = 1000
+LOCAL_BROKER_STARTUP_TIMEOUT_SECONDS = 5
+# launch_broker(prefer_mosquitto=True) starts this mosquitto binary if it is on PATH
+MOSQUITTO_BINARY = "mosquitto"
+
+# MQTT 3.1.1 control packet types (upper nibble of the fixed header)
+CONNECT = 1
+CONNACK = 2
+PUBLISH = 3
+PUBACK = 4
+PUBREC = 5
+PUBREL = 6
+PUBCOMP = 7
+SUBSCRIBE = 8
+SUBACK = 9
+UNSUBSCRIBE = 10
+UNSUBACK = 11
+PINGREQ = 12
+PINGRESP = 13
+DISCONNECT = 14
+
+SHARED_PREFIX = "$share/"
+PINGRESP_PACKET = bytes([PINGRESP << 4, 0])
+UINT16 = struct.Struct("!H")
+
+###############################################################################
+
+def encode_remaining_length(length):
+    """MQTT variable-length encoding of a packet's remaining length."""
+    encoded = bytearray()
+    while True:
+        byte, length = length & 0x7F, length >> 7
+        encoded.append(byte | 0x80 if length else byte)
+        if not length:
+            return bytes(encoded)
+
+def topic_matches(topic_filter, topic):
+    """
+    True if topic matches the subscription filter ('+' one level, '#' the rest).
+    Topics starting with '$' are not matched by filters starting with a wildcard.
+    """
+    if topic.startswith("$") and topic_filter[:1] in ("+", "#"):
+        return False
+    filter_levels = topic_filter.split("/")
+    topic_levels = topic.split("/")
+    for index, level in enumerate(filter_levels):
+        if level == "#":
+            return True
+        if index >= len(topic_levels) or (level != "+" and level != topic_levels[index]):
+            return False
+    return len(filter_levels) == len(topic_levels)
+
+def valid_topic_filter(topic_filter):
+    levels = topic_filter.split("/")
+    return bool(topic_filter) and all(("#" not in level or level == "#") and ("+" not in level or level == "+") for level in levels) \
+        and "#" not in levels[:-1]
+
+class BrokerSession(asyncio.Protocol):
+    """One client connection: parses its packets and writes what is routed to it."""
+    def __init__(self, broker):
+        self.broker = broker
+        self.transport = None
+        self.buffer = bytearray()
+        self.client_id = None
+        self.subscriptions = {} # filter (as subscribed, incl. $share/...) -> granted qos
+        self.packet_ids = itertools.cycle(range(1, 65536))
+        self.outbound_inflight = {} # packet id -> qos of a QoS 1/2 delivery awaiting PUBACK / PUBCOMP
+        self.outbound_queue = deque() # (topic field, payload, qos, retain) waiting for an inflight slot
+        self.inbound_qos2 = set() # packet ids of QoS 2 publishes received but not yet released
+        self.keepalive_seconds = 0
+        self.last_packet_time = time.monotonic()
+
+    # ---- asyncio.Protocol ----------------------------------------------------------
+
+    def connection_made(self, transport):
+        self.transport = transport
+        sock = transport.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def connection_lost(self, exc):
+        self.broker.remove_session(self)
+
+    def data_received(self, data):
+        self.last_packet_time = time.monotonic()
+        buffer = self.buffer
+        buffer += data
+        pos, end = 0, len(buffer)
+        try:
+            while end - pos >= 2:
+                index, length, shift = pos + 1, 0, 0
+                while index < end:
+                    byte = buffer[index]
+                    index += 1
+                    length |= (byte & 0x7F) << shift
+                    if not byte & 0x80:
+                        break
+                    shift += 7
+                    if shift > 21:
+                        raise ValueError("remaining length longer than 4 bytes")
+                else:
+                    break
+                if index + length > end:
+                    break
+                self.handle_packet(buffer[pos], bytes(buffer[index:index + length]))
+                pos = index + length
+                if self.transport.is_closing():
+                    return
+        except (ValueError, IndexError, struct.error, UnicodeDecodeError) as e:
+            print(f"Broker: Protocol error from {self.client_id or 'new client'}: {e}; disconnecting")
+            self.transport.close()
+            return
+        del buffer[:pos]
+
+    # ---- packets -----------------------------------------------------------------
+
+    def handle_packet(self, header, body):
+        packet_type = header >> 4
+        if self.client_id is None and packet_type != CONNECT:
+            raise ValueError(f"packet type {packet_type} before CONNECT")
+        if packet_type == PUBLISH:
+            self.handle_publish(header, body)
+        elif packet_type == PUBACK or packet_type == PUBCOMP:
+            self.outbound_inflight.pop(UINT16.unpack_from(body)[0], None)
+            while self.outbound_queue and len(self.outbound_inflight) < LOCAL_BROKER_MAX_INFLIGHT_MESSAGES:
+                self.send_publish(*self.outbound_queue.popleft())
+        elif packet_type == PUBREC:
+            self.transport.write(bytes([(PUBREL << 4) | 0x02, 2]) + body[:2])
+        elif packet_type == PUBREL:
+            self.inbound_qos2.discard(body[:2])
+            self.transport.write(bytes([PUBCOMP << 4, 2]) + body[:2])
+        elif packet_type == SUBSCRIBE:
+            self.handle_subscribe(body)
+        elif packet_type == UNSUBSCRIBE:
+            self.handle_unsubscribe(body)
+        elif packet_type == PINGREQ:
+            self.transport.write(PINGRESP_PACKET)
+        elif packet_type == DISCONNECT:
+            self.transport.close()
+        elif packet_type == CONNECT:
+            self.handle_connect(body)
+        else:
+            raise ValueError(f"unexpected packet type {packet_type}")
+
+    def handle_connect(self, body):
+        if self.client_id is not None:
+            raise ValueError("second CONNECT")
+        name_length = UINT16.unpack_from(body)[0]
+        pos = 2 + name_length
+        protocol_level, flags = body[pos], body[pos + 1]
+        self.keepalive_seconds = UINT16.unpack_from(body, pos + 2)[0]
+        pos += 4
+        if protocol_level not in (3, 4):
+            self.transport.write(bytes([CONNACK << 4, 2, 0, 1])) # unacceptable protocol version
+            self.transport.close()
+            return
+        client_id_length = UINT16.unpack_from(body, pos)[0]
+        client_id = body[pos + 2:pos + 2 + client_id_length].decode()
+        # will topic/message, username and password are accepted and ignored
+        if not client_id:
+            client_id = f"auto-{id(self):x}"
+        self.client_id = client_id
+        self.broker.add_session(self)
+        self.transport.write(bytes([CONNACK << 4, 2, 0, 0]))
+
+    def handle_publish(self, header, body):
+        qos = (header >> 1) & 0x03
+        topic_length = UINT16.unpack_from(body)[0]
+        topic = body[2:2 + topic_length].decode()
+        pos = 2 + topic_length
+        if qos == 3 or "+" in topic or "#" in topic:
+            raise ValueError(f"invalid PUBLISH (qos {qos}, topic {topic!r})")
+        if qos:
+            packet_id = body[pos:pos + 2]
+            pos += 2
+            if qos == 1:
+                self.transport.write(bytes([PUBACK << 4, 2]) + packet_id)
+            else:
+                self.transport.write(bytes([PUBREC << 4, 2]) + packet_id)
+                if packet_id in self.inbound_qos2:
+                    return # a resent QoS 2 PUBLISH is acknowledged again but delivered once
+                self.inbound_qos2.add(packet_id)
+        self.broker.publish(topic, body[pos:], qos, retain=bool(header & 0x01))
+
+    def handle_subscribe(self, body):
+        packet_id = body[:2]
+        pos, granted, new_filters = 2, bytearray(), []
+        while pos < len(body):
+            filter_length = UINT16.unpack_from(body, pos)[0]
+            topic_filter = body[pos + 2:pos + 2 + filter_length].decode()
+            requested_qos = body[pos + 2 + filter_length]
+            pos += 3 + filter_length
+            if requested_qos > 2 or not valid_topic_filter(topic_filter):
+                granted.append(0x80)
+                continue
+            self.subscriptions[topic_filter] = requested_qos
+            granted.append(requested_qos)
+            new_filters.append(topic_filter)
+        self.broker.subscriptions_changed()
+        self.transport.write(bytes([SUBACK << 4]) + encode_remaining_length(2 + len(granted)) + packet_id + bytes(granted))
+        for topic_filter in new_filters:
+            self.broker.send_retained(self, topic_filter)
+
+    def handle_unsubscribe(self, body):
+        pos = 2
+        while pos < len(body):
+            filter_length = UINT16.unpack_from(body, pos)[0]
+            self.subscriptions.pop(body[pos + 2:pos + 2 + filter_length].decode(), None)
+            pos += 2 + filter_length
+        self.broker.subscriptions_changed()
+        self.transport.write(bytes([UNSUBACK << 4, 2]) + body[:2])
+
+    # ---- delivery ----------------------------------------------------------------
+
+    def deliver(self, topic_field, payload, qos, retain=False, qos0_packet=None):
+        """
+        Writes one PUBLISH to this client. topic_field is the encoded topic string;
+        qos0_packet, if given, is the ready-made QoS 0 packet shared by all QoS 0 receivers.
+
+        Returns:
+            bool: False if the message was dropped (QoS 0 to a client that isn't keeping up,
+                  or QoS 1/2 with the inflight window and queue full).
+        """
+        if self.transport.is_closing():
+            return False
+        if not qos:
+            if self.transport.get_write_buffer_size() > LOCAL_BROKER_MAX_CLIENT_BUFFER_BYTES:
+                return False
+            self.transport.write(qos0_packet or (bytes([(PUBLISH << 4) | retain]) + encode_remaining_length(len(topic_field) + len(payload))
+                                                 + topic_field + payload))
+            return True
+        if len(self.outbound_inflight) >= LOCAL_BROKER_MAX_INFLIGHT_MESSAGES:
+            if len(self.outbound_queue) >= LOCAL_BROKER_MAX_QUEUED_MESSAGES:
+                return False
+            self.outbound_queue.append((topic_field, payload, qos, retain))
+            return True
+        self.send_publish(topic_field, payload, qos, retain)
+        return True
+
+    def send_publish(self, topic_field, payload, qos, retain):
+        """Writes a QoS 1/2 PUBLISH under a new packet ID and tracks it until it is acknowledged."""
+        packet_id = next(self.packet_ids)
+        while packet_id in self.outbound_inflight:
+            packet_id = next(self.packet_ids)
+        self.outbound_inflight[packet_id] = qos
+        self.transport.write(bytes([(PUBLISH << 4) | (qos << 1) | retain]) + encode_remaining_length(len(topic_field) + 2 + len(payload))
+                             + topic_field + UINT16.pack(packet_id) + payload)
+
+class LocalBroker:
+    """
+    A small MQTT 3.1.1 broker for running the analyzer, publishers and benchmarks
+    without an installed broker: QoS 0/1/2 in both directions, retained messages,
+    '+'/'#' wildcards, $share/<group>/<filter> shared subscriptions (round-robin within
+    a group), client ID takeover, and synthetic $SYS/broker/... topics with mosquitto's
+    names (load averages are exponentially decaying per-minute rates, as in mosquitto).
+    QoS 1/2 deliveries to each client are windowed and queued with mosquitto's default
+    limits, so an overloaded QoS 1/2 test loses messages as it would with mosquitto.
+
+    Sessions are always clean (no persistence, no offline queueing), wills are ignored
+    and there is no authentication. Messages are routed on a single asyncio event loop;
+    the subscribers matching a topic are cached until the next (un)subscribe, so the
+    per-message cost does not grow with the number of subscriptions.
+    """
+    def __init__(self):
+        self.sessions = {} # client id -> BrokerSession
+        self.retained = {} # topic -> (payload, qos)
+        self.route_cache = {} # topic -> ([(session, qos)], [(group key, [(session, qos)])])
+        self.shared_cursors = {} # (group, filter) -> round-robin position
+        self.server = None
+        self.sys_task = None
+        self.start_time = time.time()
+        self.messages_received = 0
+        self.messages_sent = 0
+        self.messages_dropped = 0
+        self.max_clients = 0
+        self.load_received_1min = 0.0
+        self.load_sent_1min = 0.0
+        self.last_received = 0 # message counts at the previous $SYS update
+        self.last_sent = 0
+        self.thread = None
+        self.loop = None
+
+    # ---- sessions and subscriptions ---------------------------------------------
+
+    def add_session(self, session):
+        previous = self.sessions.get(session.client_id)
+        if previous is not None and previous is not session:
+            previous.transport.close() # client ID takeover, as in mosquitto
+            previous.client_id = None # its connection_lost must not remove the new session
+        self.sessions[session.client_id] = session
+        self.max_clients = max(self.max_clients, len(self.sessions))
+        self.subscriptions_changed()
+
+    def remove_session(self, session):
+        if session.client_id is not None and self.sessions.get(session.client_id) is session:
+            del self.sessions[session.client_id]
+            self.subscriptions_changed()
+
+    def subscriptions_changed(self):
+        self.route_cache.clear()
+
+    def _routes(self, topic):
+        routes = self.route_cache.get(topic)
+        if routes is None:
+            direct, groups = [], {}
+            for session in self.sessions.values():
+                best_qos = -1
+                for topic_filter, qos in session.subscriptions.items():
+                    if topic_filter.startswith(SHARED_PREFIX):
+                        group, _, shared_filter = topic_filter[len(SHARED_PREFIX):].partition("/")
+                        if topic_matches(shared_filter, topic):
+                            groups.setdefault((group, shared_filter), []).append((session, qos))
+                    elif qos > best_qos and topic_matches(topic_filter, topic):
+                        best_qos = qos # overlapping filters: one copy at the highest QoS
+                if best_qos >= 0:
+                    direct.append((session, best_qos))
+            routes = self.route_cache[topic] = (direct, list(groups.items()))
+        return routes
+
+    # ---- routing -----------------------------------------------------------------
+
+    def publish(self, topic, payload, qos, retain=False, count=True):
+        """Routes one message to every matching subscriber (and stores it if retained)."""
+        if count:
+            self.messages_received += 1
+        if retain:
+            if payload:
+                self.retained[topic] = (payload, qos)
+            else:
+                self.retained.pop(topic, None)
+        direct, groups = self._routes(topic)
+        if not direct and not groups:
+            return
+        topic_field = UINT16.pack(len(topic.encode())) + topic.encode()
+        qos0_packet = bytes([PUBLISH << 4]) + encode_remaining_length(len(topic_field) + len(payload)) + topic_field + payload
+        for session, sub_qos in direct:
+            self._deliver(session, topic_field, payload, min(qos, sub_qos), qos0_packet)
+        for group_key, members in groups:
+            cursor = self.shared_cursors.get(group_key, 0)
+            session, sub_qos = members[cursor % len(members)]
+            self.shared_cursors[group_key] = cursor + 1
+            self._deliver(session, topic_field, payload, min(qos, sub_qos), qos0_packet)
+
+    def _deliver(self, session, topic_field, payload, qos, qos0_packet):
+        if session.deliver(topic_field, payload, qos, qos0_packet=qos0_packet):
+            self.messages_sent += 1
+        else:
+            self.messages_dropped += 1
+
+    def send_retained(self, session, topic_filter):
+        """Sends the retained messages matching a new subscription, with the retain flag set."""
+        if topic_filter.startswith(SHARED_PREFIX):
+            return # retained messages are not sent to shared subscriptions
+        granted_qos = session.subscriptions.get(topic_filter, 0)
+        for topic, (payload, qos) in list(self.retained.items()):
+            if topic_matches(topic_filter, topic):
+                topic_field = UINT16.pack(len(topic.encode())) + topic.encode()
+                if session.deliver(topic_field, payload, min(qos, granted_qos), retain=True):
+                    self.messages_sent += 1
+
+    # ---- $SYS ------------------------------------------------------------------
+
+    def sys_values(self, interval_seconds):
+        """The synthetic $SYS/broker/... values, updating the 1 min load averages."""
+        decay = math.exp(-interval_seconds / 60)
+        received_per_min = (self.messages_received - self.last_received) * 60 / interval_seconds
+        sent_per_min = (self.messages_sent - self.last_sent) * 60 / interval_seconds
+        self.last_received, self.last_sent = self.messages_received, self.messages_sent
+        self.load_received_1min = self.load_received_1min * decay + received_per_min * (1 - decay)
+        self.load_sent_1min = self.load_sent_1min * decay + sent_per_min * (1 - decay)
+        inflight = sum(len(session.outbound_inflight) for session in self.sessions.values())
+        queued = sum(len(session.outbound_queue) for session in self.sessions.values())
+        return {
+            "$SYS/broker/version": LOCAL_BROKER_VERSION,
+            "$SYS/broker/uptime": f"{int(time.time() - self.start_time)} seconds",
+            "$SYS/broker/clients/connected": len(self.sessions),
+            "$SYS/broker/clients/active": len(self.sessions),
+            "$SYS/broker/clients/total": len(self.sessions),
+            "$SYS/broker/clients/maximum": self.max_clients,
+            "$SYS/broker/messages/received": self.messages_received,
+            "$SYS/broker/messages/sent": self.messages_sent,
+            "$SYS/broker/messages/stored": len(self.retained) + inflight + queued,
+            "$SYS/broker/messages/inflight": inflight,
+            "$SYS/broker/retained messages/count": len(self.retained),
+            "$SYS/broker/subscriptions/count": sum(len(session.subscriptions) for session in self.sessions.values()),
+            "$SYS/broker/publish/messages/dropped": self.messages_dropped,
+            "$SYS/broker/load/messages/received/1min": f"{self.load_received_1min:.2f}",
+            "$SYS/broker/load/messages/sent/1min": f"{self.load_sent_1min:.2f}",
+        }
+
+    async def _publish_sys_topics(self):
+        while True:
+            await asyncio.sleep(LOCAL_BROKER_SYS_INTERVAL_SECONDS)
+            now = time.monotonic()
+            for session in list(self.sessions.values()):
+                if session.keepalive_seconds and now - session.last_packet_time > 1.5 * session.keepalive_seconds:
+                    print(f"Broker: Client {session.client_id} exceeded its keepalive; disconnecting")
+                    session.transport.close()
+            for topic, value in self.sys_values(LOCAL_BROKER_SYS_INTERVAL_SECONDS).items():
+                self.publish(topic, str(value).encode(), 0, retain=True, count=False)
+
+    # ---- running -----------------------------------------------------------------
+
+    async def start(self, host=LOCAL_BROKER_HOST, port=LOCAL_BROKER_PORT):
+        """
+        Starts listening (port 0 picks a free port).
+
+        Returns:
+            int: The port the broker listens on.
+        """
+        self.loop = asyncio.get_running_loop()
+        self.server = await self.loop.create_server(lambda: BrokerSession(self), host, port)
+        for topic, value in self.sys_values(LOCAL_BROKER_SYS_INTERVAL_SECONDS).items():
+            self.publish(topic, str(value).encode(), 0, retain=True, count=False)
+        self.sys_task = asyncio.create_task(self._publish_sys_topics())
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.sys_task:
+            self.sys_task.cancel()
+        if self.server:
+            self.server.close()
+            for session in list(self.sessions.values()):
+                session.transport.close()
+            await self.server.wait_closed()
+
+    def start_in_thread(self, host=LOCAL_BROKER_HOST, port=0):
+        """
+        Runs the broker on its own event loop in a daemon thread.
+
+        Returns:
+            int: The port the broker listens on.
+        """
+        started = threading.Event()
+        result = {}
+
+        def run():
+            async def main():
+                result["port"] = await self.start(host, port)
+                started.set()
+                await asyncio.Event().wait() # until the loop is stopped
+            try:
+                asyncio.run(main())
+            except RuntimeError:
+                pass # loop stopped by stop_in_thread()
+            except OSError as e:
+                result["error"] = e
+                started.set()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        started.wait(LOCAL_BROKER_STARTUP_TIMEOUT_SECONDS)
+        if "error" in result:
+            raise result["error"]
+        return result["port"]
+
+    def stop_in_thread(self):
+        if self.loop is not None and self.thread is not None:
+            asyncio.run_coroutine_threadsafe(self.stop(), self.loop).result(LOCAL_BROKER_STARTUP_TIMEOUT_SECONDS)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(LOCAL_BROKER_STARTUP_TIMEOUT_SECONDS)
+            self.thread = None
+
+def free_port(host=LOCAL_BROKER_HOST):
+    """A currently unused TCP port on host."""
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+def wait_for_port(port, timeout_seconds=LOCAL_BROKER_STARTUP_TIMEOUT_SECONDS, host=LOCAL_BROKER_HOST):
+    """True once something accepts TCP connections on host:port."""
+    deadline = time.time() + timeout_seconds
+    while time.time() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+def launch_broker(port=0, prefer_mosquitto=False):
+    """
+    Starts a broker for a hermetic run: mosquitto on the given (or a free) port if
+    prefer_mosquitto and it is installed, otherwise a LocalBroker in a background thread.
+
+    Returns:
+        tuple: (port, stop) where stop() shuts the broker down.
+    """
+    mosquitto = shutil.which(MOSQUITTO_BINARY) if prefer_mosquitto else None
+    if mosquitto:
+        port = port or free_port()
+        process = subprocess.Popen([mosquitto, "-p", str(port)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if not wait_for_port(port):
+            process.terminate()
+            raise RuntimeError(f"mosquitto did not start listening on port {port}")
+        print(f"Broker: mosquitto on port {port}")
+        return port, process.terminate
+    broker = LocalBroker()
+    port = broker.start_in_thread(port=port)
+    print(f"Broker: local_broker on port {port}")
+    return port, broker.stop_in_thread
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the in-repo MQTT broker stand-in.")
+    parser.add_argument("port", type=int, nargs="?", default=LOCAL_BROKER_PORT, help="Port to listen on (0 for a free one)")
+    parser.add_argument("--host", default=LOCAL_BROKER_HOST, help="Address to listen on")
+    parser.add_argument("--sys-interval", type=float, default=LOCAL_BROKER_SYS_INTERVAL_SECONDS, help="Seconds between $SYS updates")
+    args = parser.parse_args()
+    LOCAL_BROKER_SYS_INTERVAL_SECONDS = args.sys_interval
+
+    async def serve():
+        broker = LocalBroker()
+        port = await broker.start(args.host, args.port)
+        print(f"Broker: Listening on {args.host}:{port}", flush=True)
+        await broker.server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        print("Broker: Stopped")
+    except OSError as e:
+        sys.exit(f"Broker: Could not listen on {args.host}:{args.port}: {e}")
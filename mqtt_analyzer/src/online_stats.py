@@ -0,0 +1,198 @@
+from array import array
+from payload_format import MAX_CTR
+
+############################# Configurations ##################################
+
+GAP_WINDOW_CTRS = 4096 # first-arrival timestamps kept per publisher for gap pairing
+BITMAP_INITIAL_BYTES = 4096 # seen-ctr bitmap grows by doubling from here
+HISTOGRAM_SUB_BUCKETS = 16 # log-linear gap histogram: 16 buckets per power of two (~6% resolution)
+HISTOGRAM_MAX_EXPONENT = 64
+
+###############################################################################
+
+class GapHistogram:
+    """
+    Fixed-size log-linear histogram of non-negative integer gaps, for percentiles
+    without keeping the samples. Values below HISTOGRAM_SUB_BUCKETS are exact; above
+    that each power of two is split into HISTOGRAM_SUB_BUCKETS equal buckets.
+    """
+    def __init__(self):
+        self.counts = array('q', [0]) * (HISTOGRAM_SUB_BUCKETS * (HISTOGRAM_MAX_EXPONENT + 1))
+        self.total = 0
+
+    def record(self, value):
+        if value < HISTOGRAM_SUB_BUCKETS:
+            index = max(value, 0) # negative gaps (successor arrived first) count as 0
+        else:
+            shift = value.bit_length() - HISTOGRAM_SUB_BUCKETS.bit_length()
+            index = HISTOGRAM_SUB_BUCKETS * shift + (value >> shift)
+        self.counts[index] += 1
+        self.total += 1
+
+    @staticmethod
+    def _bucket_lower_bound(index):
+        if index < HISTOGRAM_SUB_BUCKETS:
+            return index
+        shift = index // HISTOGRAM_SUB_BUCKETS - 1
+        return (index - HISTOGRAM_SUB_BUCKETS * shift) << shift
+
+    def percentiles(self, quantiles):
+        """
+        Returns the lower bound of the bucket holding each requested quantile.
+
+        Args:
+            quantiles (list): Quantiles in [0, 1], ascending.
+        Returns:
+            list: One value per quantile (0 if the histogram is empty).
+        """
+        if self.total == 0:
+            return [0 for _ in quantiles]
+        results = []
+        targets = iter([max(1, int(q * self.total + 0.5)) for q in quantiles])
+        target = next(targets)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            while target is not None and seen >= target:
+                results.append(self._bucket_lower_bound(index))
+                target = next(targets, None)
+            if target is None:
+                break
+        return results
+
+class PublisherAccumulator:
+    """
+    Running loss/duplicate/out-of-order/gap state for one publisher, updated per message.
+
+    - Seen ctrs are a bitmap (1 bit per ctr), so duplicates and unique counts are exact.
+    - Out-of-order uses the running max ctr, exactly as calculate_stats() does.
+    - Gaps between first arrivals of consecutive ctrs feed a Welford mean/variance.
+      First-arrival timestamps are kept in a ring of the last GAP_WINDOW_CTRS ctrs,
+      so a pair whose members arrive further apart than that is not counted.
+    Memory is the bitmap plus the fixed ring, independent of message rate.
+    """
+    def __init__(self):
+        self.seen = bytearray(BITMAP_INITIAL_BYTES)
+        self.ring_ctrs = array('q', [-1]) * GAP_WINDOW_CTRS
+        self.ring_ts = array('q', [0]) * GAP_WINDOW_CTRS
+        self.received = 0
+        self.duplicates = 0
+        self.outoforder = 0
+        self.max_ctr = -1
+        self.gap_count = 0
+        self.gap_mean = 0.0
+        self.gap_m2 = 0.0
+        self.gap_histogram = GapHistogram()
+
+    def _add_gap(self, gap):
+        self.gap_histogram.record(gap)
+        self.gap_count += 1
+        delta = gap - self.gap_mean
+        self.gap_mean += delta / self.gap_count
+        self.gap_m2 += delta * (gap - self.gap_mean)
+
+    def update(self, ctr, received_ts):
+        """
+        Accounts for one received message.
+
+        Raises:
+            ValueError: If ctr is outside 0 .. MAX_CTR - 1 (the message parsers already 
+                        reject those as malformed; this keeps the bitmap bounded regardless).
+        """
+        if not 0 <= ctr < MAX_CTR:
+            raise ValueError(f"ctr {ctr} outside 0..{MAX_CTR - 1}")
+        self.received += 1
+        if ctr < self.max_ctr:
+            self.outoforder += 1
+        elif ctr > self.max_ctr:
+            self.max_ctr = ctr
+
+        byte_index = ctr >> 3
+        if byte_index >= len(self.seen):
+            self.seen.extend(bytes(max(len(self.seen), byte_index + 1 - len(self.seen))))
+        bit = 1 << (ctr & 7)
+        if self.seen[byte_index] & bit:
+            self.duplicates += 1
+            return
+        self.seen[byte_index] |= bit
+
+        slot = ctr % GAP_WINDOW_CTRS
+        self.ring_ctrs[slot] = ctr
+        self.ring_ts[slot] = received_ts
+        previous_slot = (ctr - 1) % GAP_WINDOW_CTRS
+        if ctr > 0 and self.ring_ctrs[previous_slot] == ctr - 1:
+            self._add_gap(received_ts - self.ring_ts[previous_slot])
+        next_slot = (ctr + 1) % GAP_WINDOW_CTRS
+        if self.ring_ctrs[next_slot] == ctr + 1: # successor arrived first (reordered)
+            self._add_gap(self.ring_ts[next_slot] - received_ts)
+
+    def metrics(self):
+        """
+        Returns the publisher's metrics in the same shape as stats_engine.publisher_metrics().
+        O(1): everything is already accumulated.
+        """
+        if self.received == 0:
+            return {"loss_pct": 0.0, "outoforder_pct": 0, "dup_pct": 0, "avg_gap": 0, "stddev_gap": 0,
+                    "received": 0, "unique": 0, "outoforder": 0, "dup": 0}
+        unique = self.received - self.duplicates
+        expected_based_on_max_ctr = self.max_ctr + 1
+        return {
+            "loss_pct": ((expected_based_on_max_ctr - unique) / expected_based_on_max_ctr) * 100 if expected_based_on_max_ctr > 0 else 0,
+            "outoforder_pct": (self.outoforder / self.received) * 100,
+            "dup_pct": (self.duplicates / self.received) * 100,
+            "avg_gap": self.gap_mean if self.gap_count else 0,
+            "stddev_gap": (self.gap_m2 / self.gap_count) ** 0.5 if self.gap_count > 1 else 0,
+            "received": self.received,
+            "unique": unique,
+            "outoforder": self.outoforder,
+            "dup": self.duplicates,
+        }
+
+class OnlineStats:
+    """
+    Per-publisher accumulators, keyed by instance id in order of first message, plus a
+    run-wide one-way latency histogram (in microseconds, so percentiles are within
+    the histogram's ~6% resolution) and the exact maximum latency.
+    """
+    def __init__(self):
+        self.publishers = {}
+        self.count = 0
+        self.latency_histogram = GapHistogram()
+        self.latency_max_ns = None
+
+    def update(self, instance_id, ctr, received_ts, latency_ns=None):
+        accumulator = self.publishers.get(instance_id)
+        if accumulator is None:
+            accumulator = self.publishers[instance_id] = PublisherAccumulator()
+        accumulator.update(ctr, received_ts)
+        self.count += 1
+        if latency_ns is not None:
+            self.latency_histogram.record(latency_ns // 1000)
+            if self.latency_max_ns is None or latency_ns > self.latency_max_ns:
+                self.latency_max_ns = latency_ns
+
+    def clear(self):
+        self.publishers = {}
+        self.count = 0
+        self.latency_histogram = GapHistogram()
+        self.latency_max_ns = None
+
+    def latency_summary(self, quantiles=(0.5, 0.95, 0.99)):
+        """
+        Returns latency percentiles in the same shape as stats_engine.latency_summary().
+
+        Returns:
+            dict: 'p50', 'p95', ... and 'max', in ms (None if no latencies were recorded).
+        """
+        names = [f"p{int(q * 100)}" for q in quantiles] + ["max"]
+        if self.latency_max_ns is None:
+            return dict.fromkeys(names)
+        values = [value / 1e3 for value in self.latency_histogram.percentiles(list(quantiles))] + [self.latency_max_ns / 1e6]
+        return dict(zip(names, values))
+
+    def __len__(self):
+        return self.count
+
+    def all_metrics(self):
+        """Returns a list of (instance_id, metrics dict), one per publisher seen."""
+        return [(instance_id, accumulator.metrics()) for instance_id, accumulator in list(self.publishers.items())]
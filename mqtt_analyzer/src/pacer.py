@@ -0,0 +1,68 @@
+import time
+
+############################# Configurations ##################################
+
+PACER_BUSY_WAIT = False # spin for the last PACER_SPIN_NS before each send (sub-ms periods)
+PACER_SPIN_NS = 200_000 # with busy-wait: sleep until this close to the deadline, then spin
+PACER_MAX_LAG_PERIODS = 10 # further behind than this, restart the schedule instead of bursting
+
+###############################################################################
+
+class DeadlinePacer:
+    """
+    Paces a loop to a fixed period against absolute target times (start + k * period),
+    instead of sleeping a fixed delay after each send. Time spent sending and any sleep
+    overshoot are taken out of the next wait, so the long-run rate doesn't drift below
+    the target. If the loop falls more than PACER_MAX_LAG_PERIODS behind (e.g. a stall),
+    the schedule restarts from now rather than sending a catch-up burst; such restarts
+    are counted in `resets`.
+
+    time.sleep() typically overshoots by 50-100 us on Linux, so periods below about a
+    millisecond need busy_wait to hold their rate; it costs one core per paced loop.
+    """
+    def __init__(self, period_ns, busy_wait=None):
+        self.period_ns = period_ns
+        self.busy_wait = PACER_BUSY_WAIT if busy_wait is None else busy_wait
+        self.start_ns = time.time_ns()
+        self.next_send_ns = self.start_ns
+        self.resets = 0
+
+    def wait(self):
+        """
+        Blocks until the next send slot and advances the schedule.
+
+        Returns:
+            int: time_ns() at the moment the slot was reached.
+        """
+        target_ns = self.next_send_ns
+        now_ns = time.time_ns()
+        if self.busy_wait:
+            if target_ns - now_ns > PACER_SPIN_NS:
+                time.sleep((target_ns - now_ns - PACER_SPIN_NS) / 1e9)
+            while now_ns < target_ns:
+                now_ns = time.time_ns()
+        elif target_ns > now_ns:
+            time.sleep((target_ns - now_ns) / 1e9)
+            now_ns = time.time_ns()
+
+        self.next_send_ns = target_ns + self.period_ns
+        if now_ns - self.next_send_ns > PACER_MAX_LAG_PERIODS * self.period_ns:
+            self.next_send_ns = now_ns + self.period_ns
+            self.resets += 1
+        return now_ns
+
+    def target_rate(self):
+        """Target messages per second."""
+        return 1e9 / self.period_ns
+
+def achieved_rate(message_count, start_ns, end_ns):
+    """
+    Messages per second actually achieved over a burst.
+
+    Args:
+        message_count (int): Messages sent.
+        start_ns, end_ns (int): time_ns() at the start and end of the burst.
+    Returns:
+        float: Achieved rate (0 if the burst had no duration).
+    """
+    return message_count * 1e9 / (end_ns - start_ns) if end_ns > start_ns else 0.0
@@ -2,6 +2,11 @@ import paho.mqtt.client as mqtt
 import time 
 import sys
 import threading # for publishing burst 
+import random 
+import string 
+import payload_format 
+from pacer import DeadlinePacer, achieved_rate 
+from ack_tracker import PublishAckTracker, format_ack_detail 
 
 ############################### Congifuration #################################
 # load from config.py 
@@ -12,8 +17,30 @@ REQUEST_TOPIC_DELAY = "request/delay"
 REQUEST_TOPIC_MESSAGESIZE = "request/messagesize"
 REQUEST_TOPIC_INSTANCECOUNT = "request/instancecount"
 REQUEST_TOPIC_GO = "request/go"
+REQUEST_TOPIC_PAYLOADRANDOM = "request/payloadrandom"
+REQUEST_TOPIC_PAYLOADBINARY = "request/payloadbinary"
+REQUEST_TOPIC_SYNC = "request/sync" # analyzer sends a token after a test's control messages 
+REQUEST_TOPIC_CLOCKSYNC = "request/clocksync" # analyzer clock calibration; answered with 'clock:<round>:<time_ns>' 
+REQUEST_TOPIC_MAXINFLIGHT = "request/maxinflight" 
+REQUEST_TOPIC_MAXQUEUED = "request/maxqueued" 
+# 'ready:<token>:<active>' / 'done:<token>:<sent>:<rate>[:<ack p50 ms>:<ack p99 ms>:<max queue depth>]' 
+# go to status/<instance_id>; the ack fields are only sent after QoS 1/2 bursts 
+STATUS_TOPIC_PREFIX = "status" 
 DATA_TOPIC_PREFIX = "counter"
 RECONNECT_DELAY = 5
+BURST_SECONDS = 30 
+# True: publish from a preallocated buffer with in-place header updates and amortized 
+# stop checks (publish_hot_loop); False: the original per-message string formatting loop.
+PUBLISH_HOT_LOOP = True 
+STOP_CHECK_INTERVAL = 64 # messages between STOP_PUBLISHING_EVENT checks in the hot loop 
+MAX_INSTANCE_NUMBER = 65535 # instance ids are an unsigned 16-bit header field in binary payloads 
+# paho's QoS 1/2 windows: messages awaiting PUBACK/PUBCOMP before further ones are queued, 
+# and queued messages before publish() refuses more (0 = unbounded). Defaults are paho's own; 
+# the analyzer can change them per test over request/maxinflight and request/maxqueued, which 
+# costs a reconnect (paho only takes new limits while the connection is closed).
+MAX_INFLIGHT_MESSAGES = 20 
+MAX_QUEUED_MESSAGES = 0 
+ACK_DRAIN_SECONDS = 5 # after a QoS 1/2 burst, wait this long for outstanding acks before reporting 'done' 
 ###############################################################################
 
 # Global Variables 
@@ -21,6 +48,8 @@ CURRENT_QOS = 0
 CURRENT_DELAY = 100 # ms 
 CURRENT_MESSAGE_SIZE = 0 # bytes 
 CURRENT_INSTANCE_COUNT = 1 
+CURRENT_PAYLOAD_RANDOM = False # random alphanumeric payload instead of 'x' * size 
+CURRENT_PAYLOAD_BINARY = False # binary header framing (payload_format.py) instead of 'ctr:ts:payload' 
 PUBLISHER_ID = "pub-01"
 IS_ACTIVE = False 
 PUBLISHING_THREAD = None 
@@ -29,6 +58,12 @@ STOP_PUBLISHING_EVENT = threading.Event()
 RECONNECT_LOCK = threading.Lock()
 IS_RECONNECTING = False
 CLI_PUBLISHER_ID = None # set by cli 
+CURRENT_SYNC_TOKEN = "" # token of the last request/sync; echoed in status acks 
+PENDING_READY_TOKEN = None # sync received mid-burst; ack once the burst has stopped 
+CURRENT_MAX_INFLIGHT = MAX_INFLIGHT_MESSAGES 
+CURRENT_MAX_QUEUED = MAX_QUEUED_MESSAGES 
+PENDING_WINDOW_LIMITS = None # (max_inflight, max_queued) requested on the live connection; applied by main() 
+ACK_TRACKER = PublishAckTracker() # PUBACK/PUBCOMP latency and queue depth of QoS 1/2 bursts 
 
 ########################### MQTT Callback Functions ###########################
 def on_connect(client, userdata, flags, rc, properties=None):
@@ -58,6 +93,12 @@ def on_connect(client, userdata, flags, rc, properties=None):
                           (REQUEST_TOPIC_DELAY, 0),
                           (REQUEST_TOPIC_MESSAGESIZE, 0),
                           (REQUEST_TOPIC_INSTANCECOUNT, 0),
+                          (REQUEST_TOPIC_PAYLOADRANDOM, 0),
+                          (REQUEST_TOPIC_PAYLOADBINARY, 0),
+                          (REQUEST_TOPIC_SYNC, 0),
+                          (REQUEST_TOPIC_CLOCKSYNC, 0),
+                          (REQUEST_TOPIC_MAXINFLIGHT, 0),
+                          (REQUEST_TOPIC_MAXQUEUED, 0),
                           (REQUEST_TOPIC_GO, 0)])
         print(f"{CLI_PUBLISHER_ID}: Subscribed to request topics.")
     else:
@@ -95,6 +136,9 @@ def on_disconnect(client, userdata, flags, rc, properties=None):
 
     print(f"{CLI_PUBLISHER_ID}: Disconnected. Source: {disconnect_source}. Paho RC: {actual_paho_rc}. Broker Reason Code: {broker_reason_code}.")
 
+    if PENDING_WINDOW_LIMITS is not None: # our own disconnect for new in-flight/queue limits; main() reconnects 
+        return 
+
     should_reconnect = False 
     if actual_paho_rc != mqtt.MQTT_ERR_SUCCESS:
         print(f"{CLI_PUBLISHER_ID}: Paho RC indicates an issue ({actual_paho_rc}). Will attempt reconnect.")
@@ -143,6 +187,57 @@ def attempt_reconnect(client):
     else:
         print(f"{CLI_PUBLISHER_ID}: Reconnection attempt already in progress")
 
+def set_window_limits(client, max_inflight, max_queued):
+    """
+    Applies QoS 1/2 in-flight and queue limits to a paho client. paho 2.x only accepts them 
+    while the client has no open connection, so call this before connect(), or once 
+    disconnect() has closed the socket and before reconnect().
+
+    Args:
+        client: The MQTT client instance.
+        max_inflight (int): Messages awaiting PUBACK/PUBCOMP at once (0 = unlimited).
+        max_queued (int): Queued messages before publish() refuses more (0 = unbounded).
+    Raises:
+        RuntimeError: If the client's connection is still open.
+    """
+    client.max_inflight_messages_set(max_inflight)
+    client.max_queued_messages_set(max_queued)
+
+def apply_pending_window_limits(client):
+    """
+    Applies PENDING_WINDOW_LIMITS after loop_forever() has returned on the disconnect the 
+    request/maxinflight / request/maxqueued handler started, then reconnects. Requests the 
+    broker delivered in between are lost, but the analyzer resends the config and sync to 
+    publishers that haven't acked.
+
+    Args:
+        client: The MQTT client instance.
+    """
+    global PENDING_WINDOW_LIMITS, CURRENT_MAX_INFLIGHT, CURRENT_MAX_QUEUED
+    CURRENT_MAX_INFLIGHT, CURRENT_MAX_QUEUED = PENDING_WINDOW_LIMITS
+    PENDING_WINDOW_LIMITS = None
+    set_window_limits(client, CURRENT_MAX_INFLIGHT, CURRENT_MAX_QUEUED)
+    print(f"{CLI_PUBLISHER_ID}: Max in-flight messages {CURRENT_MAX_INFLIGHT}, max queued messages {CURRENT_MAX_QUEUED}. Reconnecting...")
+    try:
+        client.reconnect()
+    except OSError as e: # loop_forever() keeps retrying 
+        print(f"{CLI_PUBLISHER_ID}: Error during reconnect attempt: {e}")
+
+def publish_status(client, state, detail):
+    """
+    Publishes a status ack ('ready' or 'done') for the current sync token to 
+    status/<instance_id>, so the analyzer can wait for publishers instead of sleeping. 
+    Sent at QoS 0: a QoS 1 ack would wait behind the burst's whole QoS 1/2 in-flight 
+    window and queue; the analyzer resends config + sync to publishers whose 'ready' it misses.
+
+    Args:
+        client: The MQTT client instance.
+        state (str): 'ready' (config applied) or 'done' (burst finished).
+        detail: 1/0 active flag for 'ready'; '<messages sent>:<achieved msg/s>' for 'done'.
+    """
+    topic_instance_id = CLI_PUBLISHER_ID.split('-')[1]
+    client.publish(f"{STATUS_TOPIC_PREFIX}/{topic_instance_id}", f"{state}:{CURRENT_SYNC_TOKEN}:{detail}", qos=0)
+
 def on_message(client, userdata, msg):
     """
     Callback for when a PUBLISH message is received from the server.
@@ -152,10 +247,14 @@ def on_message(client, userdata, msg):
         userdata: The private user data as set in Client() or user_data_set()
         msg: An MQTTMessage instance. It has members topic, payload, qos, retain.
     """
-    global CURRENT_QOS, CURRENT_DELAY, CURRENT_MESSAGE_SIZE, CURRENT_INSTANCE_COUNT, IS_ACTIVE
-    global PUBLISHING_THREAD, STOP_PUBLISHING_EVENT 
+    global CURRENT_QOS, CURRENT_DELAY, CURRENT_MESSAGE_SIZE, CURRENT_INSTANCE_COUNT, CURRENT_PAYLOAD_RANDOM, CURRENT_PAYLOAD_BINARY, IS_ACTIVE
+    global PUBLISHING_THREAD, STOP_PUBLISHING_EVENT, CURRENT_SYNC_TOKEN, PENDING_READY_TOKEN, PENDING_WINDOW_LIMITS 
 
+    received_ns = time.time_ns() # stamped first so clock sync replies carry the arrival time 
     payload = msg.payload.decode()
+    if msg.topic == REQUEST_TOPIC_CLOCKSYNC: # answered before any logging to keep the round trip short 
+        client.publish(f"{STATUS_TOPIC_PREFIX}/{CLI_PUBLISHER_ID.split('-')[1]}", f"clock:{payload}:{received_ns}", qos=0)
+        return 
     print(f"{CLI_PUBLISHER_ID}: Received message on {msg.topic}: {payload}")
 
     if msg.topic == REQUEST_TOPIC_QOS:
@@ -171,7 +270,9 @@ def on_message(client, userdata, msg):
 
     elif msg.topic == REQUEST_TOPIC_DELAY:
         try:
-            CURRENT_DELAY = int(payload)
+            CURRENT_DELAY = float(payload) # sub-ms periods are allowed (see pacer.py) 
+            if CURRENT_DELAY.is_integer():
+                CURRENT_DELAY = int(CURRENT_DELAY) # keeps the data topic name as before 
             if CURRENT_DELAY < 0:
                 print(f"{CLI_PUBLISHER_ID}: Invalid delay value received: {CURRENT_DELAY}. Defaulting to 0.")
                 CURRENT_DELAY = 0 
@@ -217,6 +318,49 @@ def on_message(client, userdata, msg):
                 print(f"{CLI_PUBLISHER_ID}: Error parsing ID. Signaling current publishing burst to stop.")
                 STOP_PUBLISHING_EVENT.set()
 
+    elif msg.topic == REQUEST_TOPIC_PAYLOADRANDOM:
+        CURRENT_PAYLOAD_RANDOM = payload.strip() not in ("", "0")
+        print(f"{CLI_PUBLISHER_ID}: Random payload {'enabled' if CURRENT_PAYLOAD_RANDOM else 'disabled'}")
+
+    elif msg.topic == REQUEST_TOPIC_PAYLOADBINARY:
+        CURRENT_PAYLOAD_BINARY = payload.strip() not in ("", "0")
+        print(f"{CLI_PUBLISHER_ID}: Binary payload framing {'enabled' if CURRENT_PAYLOAD_BINARY else 'disabled'}")
+
+    elif msg.topic in (REQUEST_TOPIC_MAXINFLIGHT, REQUEST_TOPIC_MAXQUEUED):
+        try:
+            value = int(payload)
+            if value < 0:
+                raise ValueError(payload)
+        except ValueError:
+            print(f"{CLI_PUBLISHER_ID}: Invalid in-flight/queue limit payload: {payload}")
+        else:
+            max_inflight, max_queued = PENDING_WINDOW_LIMITS or (CURRENT_MAX_INFLIGHT, CURRENT_MAX_QUEUED)
+            if msg.topic == REQUEST_TOPIC_MAXINFLIGHT:
+                max_inflight = value 
+            else:
+                max_queued = value 
+            if PENDING_WINDOW_LIMITS is not None:
+                PENDING_WINDOW_LIMITS = (max_inflight, max_queued) # disconnect already under way 
+            elif (max_inflight, max_queued) != (CURRENT_MAX_INFLIGHT, CURRENT_MAX_QUEUED):
+                # paho refuses new limits on an open connection: disconnect, and main() applies 
+                # them and reconnects once loop_forever() returns 
+                PENDING_WINDOW_LIMITS = (max_inflight, max_queued)
+                if PUBLISHING_THREAD and PUBLISHING_THREAD.is_alive():
+                    STOP_PUBLISHING_EVENT.set()
+                print(f"{CLI_PUBLISHER_ID}: Disconnecting to apply max in-flight messages {max_inflight}, max queued messages {max_queued}")
+                client.disconnect()
+
+    elif msg.topic == REQUEST_TOPIC_SYNC:
+        # control messages arrive in order on this connection, so every request/* value 
+        # sent before the sync token has been applied by now 
+        CURRENT_SYNC_TOKEN = payload.strip()
+        if PUBLISHING_THREAD and PUBLISHING_THREAD.is_alive():
+            print(f"{CLI_PUBLISHER_ID}: Sync received mid-burst. Stopping burst before acknowledging")
+            PENDING_READY_TOKEN = CURRENT_SYNC_TOKEN 
+            STOP_PUBLISHING_EVENT.set()
+        else:
+            publish_status(client, "ready", int(IS_ACTIVE))
+
     elif msg.topic == REQUEST_TOPIC_GO:
         if payload.lower() == "start": 
             if IS_ACTIVE:
@@ -236,65 +380,258 @@ def on_message(client, userdata, msg):
             if PUBLISHING_THREAD and PUBLISHING_THREAD.is_alive():
                 STOP_PUBLISHING_EVENT.set()
 
-def publish_burst(client):
+def build_random_pool(message_size):
+    """Random alphanumeric data for a burst (2 x message_size); each message takes a different window of it."""
+    return ''.join(random.choices(string.ascii_letters + string.digits, k=2 * message_size))
+
+def build_burst_payload(instance_number, message_size, random_pool=None):
     """
-    Manages the 30-second burst of message publishing. 
-    This function is intended to be run in a separate thread. It sends messages at a rate 
-    determined by 'CURRENT_DELAY' with a payload size of 'CURRENT_MESSAGE_SIZE' and QoS level 
-    'CURRENT_QOS'.
+    Payload state shared by the burst loops: the padding string, the preallocated binary 
+    message (header + padding, see payload_format.py) and a view of its padding, and a 
+    view of random_pool that each message copies its padding window from.
+
+    Args:
+        instance_number (int): Publisher instance number (binary header field).
+        message_size (int): Padding bytes per message.
+        random_pool (str): Output of build_random_pool(), or None for 'x' padding.
+    Returns:
+        tuple: (payload_string, binary_buffer, padding_view, random_pool_view); 
+               random_pool_view is None without random padding.
+    """
+    payload_string = random_pool[:message_size] if random_pool else 'x' * message_size 
+    binary_buffer = payload_format.build_binary_buffer(instance_number, payload_string.encode())
+    padding_view = memoryview(binary_buffer)[payload_format.HEADER_STRUCT.size:]
+    random_pool_view = memoryview(random_pool.encode()) if random_pool and message_size else None 
+    return payload_string, binary_buffer, padding_view, random_pool_view 
+
+def publish_hot_loop(client, publish_topic, instance_number, deadline_ns, settings, stop_event, random_pool=None, ack_tracker=None, io_lock=None):
+    """
+    Publishing loop for PUBLISH_HOT_LOOP. time_ns() is read once per message (timestamp 
+    and deadline), the stop event is checked every STOP_CHECK_INTERVAL messages when not 
+    pacing, and everything the loop touches is bound to a local first. A non-zero 
+    delay is held with a DeadlinePacer (absolute send times, see pacer.py) 
+    rather than a sleep after each send.
+
+    With binary payloads the whole message is one preallocated bytearray and only 
+    the header is patched in place, so nothing is allocated per message at QoS 0. Text 
+    messages are still built with one f-string: converting ctr and timestamp to decimal 
+    dominates their cost, and patching fixed-width digits into a buffer measured slower 
+    than formatting the 4000-byte string.
+
+    The test settings are passed in rather than read from the CURRENT_* globals so the 
+    multi-publisher engine (publisher_engine.py) can run the same loop for each of its 
+    logical publishers.
+
+    At QoS 1/2 with an ack_tracker, each message's mid and send time are recorded for 
+    publish-to-ack latency, the number of unacknowledged messages is sampled at every 
+    stop check, and messages publish() refuses (max_queued_messages reached) are counted.
 
     Args:
         client: The MQTT client instance used for publishing.
+        publish_topic (str): Data topic for this burst.
+        instance_number (int): Publisher instance number (binary header field).
+        deadline_ns (int): time_ns() at which the burst ends.
+        settings (dict): 'qos', 'delay' (ms), 'message_size' and 'payload_binary' of the test.
+        stop_event (threading.Event): Ends the burst early when set.
+        random_pool (str): Output of build_random_pool(), or None for 'x' padding.
+        ack_tracker (PublishAckTracker): Started tracker for QoS 1/2 bursts, or None.
+        io_lock (threading.Lock): Held around each publish() when another thread also 
+                                  services this client's socket (publisher_engine.py), or None.
+    Returns:
+        tuple: (messages published, True if the stop event ended the burst).
     """
-    global CURRENT_QOS, CURRENT_DELAY, CURRENT_MESSAGE_SIZE, CLI_PUBLISHER_ID, STOP_PUBLISHING_EVENT 
-    print(f"{CLI_PUBLISHER_ID}: Starting 30s publish burst. QoS={CURRENT_QOS}, Delay={CURRENT_DELAY}ms, Size={CURRENT_MESSAGE_SIZE}")
+    size = settings["message_size"] 
+    payload_string, buffer, padding_view, random_pool_view = build_burst_payload(instance_number, size, random_pool)
+
+    # local names: attribute and global lookups are a measurable share of a ~1 us iteration 
+    publish = client.publish 
+    qos = settings["qos"] 
+    snapshot = qos > 0 # paho keeps QoS 1/2 payloads for retransmission; QoS 0 is copied in publish() 
+    delay = settings["delay"] 
+    pacer_wait = DeadlinePacer(int(delay * 1_000_000)).wait if delay > 0 else None 
+    time_ns = time.time_ns 
+    stop_is_set = stop_event.is_set 
+    binary = settings["payload_binary"] 
+    pack_into = payload_format.HEADER_STRUCT.pack_into 
+    magic, version = payload_format.BINARY_MAGIC, payload_format.BINARY_VERSION 
+    # the stop event is polled every message when pacing (cheap next to the sleep) 
+    stop_mask = 0 if pacer_wait else STOP_CHECK_INTERVAL - 1 
+    track_acks = ack_tracker is not None and qos > 0 
+    sent_ns = ack_tracker.sent_ns if track_acks else None 
+    sample_queue_depth = ack_tracker.sample_queue_depth if track_acks else None 
+    queue_full = mqtt.MQTT_ERR_QUEUE_SIZE 
 
-    start_time = time.time()
     message_counter = 0 
-    payload_string = 'x' * CURRENT_MESSAGE_SIZE 
-    topic_instance_id = CLI_PUBLISHER_ID.split('-')[1] 
-    publish_topic = f"{DATA_TOPIC_PREFIX}/{topic_instance_id}/{CURRENT_QOS}/{CURRENT_DELAY}/{CURRENT_MESSAGE_SIZE}"
+    while True:
+        timestamp_ns = pacer_wait() if pacer_wait else time_ns()
+        if timestamp_ns >= deadline_ns:
+            break 
+        if not message_counter & stop_mask:
+            if stop_is_set():
+                return message_counter, True 
+            if track_acks:
+                sample_queue_depth()
+
+        if random_pool_view is not None:
+            offset = message_counter % size 
+            if binary:
+                padding_view[:] = random_pool_view[offset:offset + size]
+            else:
+                payload_string = random_pool[offset:offset + size]
+        if binary:
+            pack_into(buffer, 0, magic, version, instance_number, message_counter, timestamp_ns)
+            payload = bytes(buffer) if snapshot else buffer 
+        else:
+            payload = f"{message_counter}:{timestamp_ns}:{payload_string}"
+        if io_lock is None:
+            message_info = publish(publish_topic, payload, qos)
+        else:
+            with io_lock:
+                message_info = publish(publish_topic, payload, qos)
+        if track_acks:
+            if message_info.rc == queue_full:
+                ack_tracker.rejected += 1 
+            else:
+                sent_ns[message_info.mid] = timestamp_ns 
+
+        message_counter += 1 
+    return message_counter, False 
 
-    while time.time() - start_time < 30:
+def _burst_hot(client, publish_topic, instance_number, random_pool, track_acks):
+    """
+    One burst with publish_hot_loop() and the CURRENT_* test settings.
+
+    Returns:
+        tuple: (messages published, True if STOP_PUBLISHING_EVENT ended the burst).
+    """
+    settings = {"qos": CURRENT_QOS, "delay": CURRENT_DELAY, "message_size": CURRENT_MESSAGE_SIZE, "payload_binary": CURRENT_PAYLOAD_BINARY}
+    return publish_hot_loop(client, publish_topic, instance_number, time.time_ns() + BURST_SECONDS * 1_000_000_000,
+                            settings, STOP_PUBLISHING_EVENT, random_pool, ACK_TRACKER if track_acks else None)
+
+def _burst_legacy(client, publish_topic, instance_number, random_pool, track_acks):
+    """
+    One burst with the original loop (PUBLISH_HOT_LOOP off): settings are read from the 
+    CURRENT_* globals on every message, a non-zero delay is a sleep after each send, and 
+    the queue depth of QoS 1/2 bursts is sampled after every publish.
+
+    Returns:
+        tuple: (messages published, True if STOP_PUBLISHING_EVENT ended the burst).
+    """
+    payload_string, binary_buffer, padding_view, random_pool_view = build_burst_payload(instance_number, CURRENT_MESSAGE_SIZE, random_pool)
+    start_time = time.time()
+    message_counter = 0 
+    while time.time() - start_time < BURST_SECONDS:
         if STOP_PUBLISHING_EVENT.is_set():
-            print(f"{CLI_PUBLISHER_ID}: Publishing burst interrupted by stop event.")
-            break 
+            return message_counter, True 
 
-        timestamp_ms = int(time.time() * 1000)
-        message = f"{message_counter}:{timestamp_ms}:{payload_string}"
+        timestamp_ns = time.time_ns()
+        if random_pool_view is not None:
+            offset = message_counter % CURRENT_MESSAGE_SIZE 
+            if CURRENT_PAYLOAD_BINARY:
+                padding_view[:] = random_pool_view[offset:offset + CURRENT_MESSAGE_SIZE]
+            else:
+                payload_string = random_pool[offset:offset + CURRENT_MESSAGE_SIZE]
+        if CURRENT_PAYLOAD_BINARY:
+            payload_format.pack_header(binary_buffer, instance_number, message_counter, timestamp_ns)
+            # QoS 0 payloads are copied into the packet inside publish(); paho keeps QoS 1/2 
+            # payloads for retransmission, so those need their own snapshot of the buffer 
+            message = binary_buffer if CURRENT_QOS == 0 else bytes(binary_buffer)
+        else:
+            message = f"{message_counter}:{timestamp_ns}:{payload_string}"
 
-        result = client.publish(publish_topic, message, qos=CURRENT_QOS)
+        message_info = client.publish(publish_topic, message, qos=CURRENT_QOS)
+        if track_acks:
+            if message_info.rc == mqtt.MQTT_ERR_QUEUE_SIZE:
+                ACK_TRACKER.rejected += 1 
+            else:
+                ACK_TRACKER.sent_ns[message_info.mid] = timestamp_ns 
+            ACK_TRACKER.sample_queue_depth()
 
         message_counter += 1
         # delay of 0 will loop as fast as possible
         if CURRENT_DELAY > 0:
             time.sleep(CURRENT_DELAY / 1000.0)
+    return message_counter, False 
 
-    print(f"{CLI_PUBLISHER_ID}: Finished publishing burst. Sent {message_counter} messages in approx 30 seconds")
+def publish_burst(client):
+    """
+    Manages the BURST_SECONDS burst of message publishing. 
+    This function is intended to be run in a separate thread. It sends messages at a rate 
+    determined by 'CURRENT_DELAY' with a payload size of 'CURRENT_MESSAGE_SIZE' and QoS level 
+    'CURRENT_QOS'. With CURRENT_PAYLOAD_BINARY, one preallocated buffer (header + padding, see 
+    build_burst_payload()) is reused and only its header is repacked per message. The loop is 
+    _burst_hot() with PUBLISH_HOT_LOOP, _burst_legacy() otherwise. QoS 1/2 bursts are tracked by 
+    ACK_TRACKER and their ack latency and queue depth reported in the 'done' status.
+
+    Args:
+        client: The MQTT client instance used for publishing.
+    """
+    global CLI_PUBLISHER_ID, PENDING_READY_TOKEN 
+    print(f"{CLI_PUBLISHER_ID}: Starting {BURST_SECONDS}s publish burst. QoS={CURRENT_QOS}, Delay={CURRENT_DELAY}ms, Size={CURRENT_MESSAGE_SIZE}, "
+          f"RandomPayload={CURRENT_PAYLOAD_RANDOM}, BinaryPayload={CURRENT_PAYLOAD_BINARY}, MaxInflight={CURRENT_MAX_INFLIGHT}, MaxQueued={CURRENT_MAX_QUEUED}")
+    track_acks = CURRENT_QOS > 0 
+    if track_acks:
+        ACK_TRACKER.start()
+
+    start_ns = time.time_ns()
+    random_pool = build_random_pool(CURRENT_MESSAGE_SIZE) if CURRENT_PAYLOAD_RANDOM else None 
+    topic_instance_id = CLI_PUBLISHER_ID.split('-')[1] 
+    publish_topic = f"{DATA_TOPIC_PREFIX}/{topic_instance_id}/{CURRENT_QOS}/{CURRENT_DELAY}/{CURRENT_MESSAGE_SIZE}"
+    burst = _burst_hot if PUBLISH_HOT_LOOP else _burst_legacy 
+    message_counter, interrupted = burst(client, publish_topic, int(topic_instance_id), random_pool, track_acks)
+    if interrupted:
+        print(f"{CLI_PUBLISHER_ID}: Publishing burst interrupted by stop event.")
+
+    # messages publish() refused (queue full) never left the publisher 
+    rate = achieved_rate(message_counter - (ACK_TRACKER.rejected if track_acks else 0), start_ns, time.time_ns())
+    target = f"{1000 / CURRENT_DELAY:.1f} msg/s" if CURRENT_DELAY > 0 else "unpaced"
+    print(f"{CLI_PUBLISHER_ID}: Finished publishing burst. Sent {message_counter} messages in approx {BURST_SECONDS} seconds "
+          f"(achieved {rate:.1f} msg/s, target {target})")
+    done_detail = f"{message_counter}:{rate:.3f}"
+    if track_acks:
+        ACK_TRACKER.wait_for_drain(ACK_DRAIN_SECONDS)
+        ack_summary = ACK_TRACKER.finish()
+        print(f"{CLI_PUBLISHER_ID}: Acks: {ack_summary['acked']} completed, {ack_summary['unacked']} outstanding, "
+              f"{ack_summary['rejected']} refused (queue full); publish-to-ack p50 {ack_summary['ack_p50_ms']} ms, "
+              f"p99 {ack_summary['ack_p99_ms']} ms; queue depth max {ack_summary['max_queue_depth']}, "
+              f"mean {ack_summary['mean_queue_depth']:.1f}")
+        done_detail += f":{format_ack_detail(ack_summary)}"
+    if PENDING_READY_TOKEN is not None:
+        # the analyzer already moved on to the next test; this burst was cut short for it 
+        PENDING_READY_TOKEN = None 
+        publish_status(client, "ready", int(IS_ACTIVE))
+    else:
+        publish_status(client, "done", done_detail)
     # Goes back to listening 
 
 def main():
     """
     Main function to initialize and run the MQTT publisher client.
-    It parses command-line arguments for the publisher ID, sets up the MQTT client, 
-    connects to the broker, and starts the client's network loop.
+    It parses command-line arguments for the publisher ID (and optional broker port), 
+    sets up the MQTT client, connects to the broker, and starts the client's network loop.
     """
-    global CLI_PUBLISHER_ID 
+    global CLI_PUBLISHER_ID, BROKER_PORT 
 
     if len(sys.argv) < 2:
-        print("Usage: python publisher.py <CLI_PUBLISHER_ID>")
+        print("Usage: python publisher.py <CLI_PUBLISHER_ID> [broker_port]")
         print("Example: python publisher.py pub-01")
         sys.exit(1)
 
     CLI_PUBLISHER_ID = sys.argv[1]
+    if len(sys.argv) > 2:
+        try:
+            BROKER_PORT = int(sys.argv[2])
+        except ValueError:
+            print(f"Error: Invalid broker port '{sys.argv[2]}'")
+            sys.exit(1)
     instance_number_try = 0 
 
     try:
         instance_number_try = int(CLI_PUBLISHER_ID.split('-')[1])
-        if not (1 <= instance_number_try <= 10):
-            raise ValueError("Instance number out of range 1-10")
+        if not (1 <= instance_number_try <= MAX_INSTANCE_NUMBER):
+            raise ValueError(f"Instance number out of range 1-{MAX_INSTANCE_NUMBER}")
     except (IndexError, ValueError) as e:
-        print(f"Error: Publisher ID must be in the format 'pub-XX' where XX is a number from 01 to 10. Got: {CLI_PUBLISHER_ID}")
+        print(f"Error: Publisher ID must be in the format 'pub-XX' where XX is a number from 01 to {MAX_INSTANCE_NUMBER}. Got: {CLI_PUBLISHER_ID}")
         print(e)
         sys.exit(1)
 
@@ -303,6 +640,8 @@ def main():
     client.on_connect = on_connect
     client.on_message = on_message
     client.on_disconnect = on_disconnect 
+    client.on_publish = ACK_TRACKER.on_publish 
+    set_window_limits(client, MAX_INFLIGHT_MESSAGES, MAX_QUEUED_MESSAGES)
 
     try:
         print(f"{CLI_PUBLISHER_ID}: Attempting to connect to broker {BROKER_ADDRESS}:{BROKER_PORT}")
@@ -316,7 +655,11 @@ def main():
     # loop_forever() blocks until client.disconnect() is called 
 
     try:
-        client.loop_forever()
+        while True:
+            client.loop_forever()
+            if PENDING_WINDOW_LIMITS is None:
+                break 
+            apply_pending_window_limits(client)
     except KeyboardInterrupt:
         print(f"{CLI_PUBLISHER_ID}: Exiting due to KeyboardInterrupt")
     finally: 
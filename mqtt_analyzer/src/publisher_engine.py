@@ -0,0 +1,384 @@
+import paho.mqtt.client as mqtt
+import time
+import sys
+import threading
+import selectors
+import publisher
+from pacer import achieved_rate
+from ack_tracker import PublishAckTracker, format_ack_detail
+
+############################# Configurations ##################################
+
+BROKER_ADDRESS = "localhost"
+BROKER_PORT = 1883
+CONNECT_TIMEOUT_SECONDS = 30 # for all data connections to be acknowledged at startup
+NETWORK_POLL_SECONDS = 0.1 # select() timeout of the shared network thread
+KEEPALIVE_SECONDS = 60
+RECONNECT_DELAY = publisher.RECONNECT_DELAY
+BURST_SECONDS = publisher.BURST_SECONDS
+
+###############################################################################
+
+class LogicalPublisher:
+    """
+    One simulated publisher: its own MQTT connection (client ID pub-XX, so the broker
+    sees the same clients as with one process per instance) and its own burst thread
+    and stop event. Test settings live in the engine and are shared by all of them.
+    """
+    def __init__(self, instance_number):
+        self.instance_number = instance_number
+        self.topic_instance_id = f"{instance_number:02d}"
+        self.client_id = f"pub-{self.topic_instance_id}"
+        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=self.client_id)
+        self.ack_tracker = PublishAckTracker()
+        self.client.on_publish = self.ack_tracker.on_publish
+        # held for every call that can touch the client's socket or outgoing queue (publish on the
+        # burst thread; loop_read/loop_write/loop_misc/reconnect on the network thread): paho's
+        # _packet_write pops and pushes back partly written packets without a lock of its own
+        self.io_lock = threading.Lock()
+        self.window_limits = (publisher.MAX_INFLIGHT_MESSAGES, publisher.MAX_QUEUED_MESSAGES)
+        publisher.set_window_limits(self.client, *self.window_limits)
+        self.pending_limits = None # (max_inflight, max_queued) to apply once the connection has closed
+        self.burst_thread = None
+        self.stop_event = threading.Event()
+        self.pending_ready = False # sync received mid-burst; ack 'ready' once the burst has stopped
+        self.reconnect_at = None # time.time() of the next reconnect attempt after a lost connection
+
+    def is_publishing(self):
+        return self.burst_thread is not None and self.burst_thread.is_alive()
+
+class PublisherEngine:
+    """
+    Hosts N logical publishers in one process, replacing one publisher.py process per
+    instance. A single control client subscribes to request/* and keeps one copy of
+    the test settings; it answers sync and clock sync on status/<id> for every hosted
+    instance, so the analyzer sees the same acks as from separate processes. Bursts run
+    one thread per active publisher with publisher.publish_hot_loop(), each on the
+    publisher's own data connection.
+
+    The data clients have no paho loop thread each: publish() writes to the socket from
+    the burst thread, and one network thread multiplexes all sockets with selectors for
+    the incoming side (PUBACK/PUBREC/PUBCOMP, PINGRESP, and the PUBRELs and released
+    in-flight publishes they trigger) and keepalive. Both threads write to the socket,
+    so each publisher's io_lock makes them take turns; writing from the burst thread
+    keeps the socket's backpressure on the publishing loop. A few hundred
+    publishers therefore cost a few hundred burst threads and sockets, not a few hundred
+    interpreters; the publishing itself still shares one GIL, so unpaced (delay 0) tests
+    measure the aggregate rate of one core.
+    """
+    def __init__(self, instance_numbers, broker_address=None, broker_port=None):
+        self.broker_address = broker_address or BROKER_ADDRESS
+        self.broker_port = broker_port or BROKER_PORT
+        self.publishers = [LogicalPublisher(n) for n in instance_numbers]
+        self.name = f"engine-{instance_numbers[0]:02d}-{instance_numbers[-1]:02d}"
+        # shared test settings, replaced as a whole by the control client
+        self.settings = {"qos": 0, "delay": 100, "message_size": 0, "payload_binary": False,
+                         "max_inflight": publisher.MAX_INFLIGHT_MESSAGES, "max_queued": publisher.MAX_QUEUED_MESSAGES}
+        self.payload_random = False
+        self.instance_count = 1
+        self.sync_token = ""
+        self.settings_lock = threading.Lock()
+        self.burst_lock = threading.Lock()
+        self.bursts_running = 0
+        self.burst_totals = [0, 0.0, 0] # messages sent, sum of achieved rates, max queue depth of the current go
+        self.shutdown_event = threading.Event()
+        self.network_thread = None
+
+        self.control_client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=f"{self.name}-{self.broker_port}")
+        self.control_client.on_connect = self.on_control_connect
+        self.control_client.on_message = self.on_control_message
+
+    ########################## Control client callbacks ###########################
+    def on_control_connect(self, client, userdata, flags, rc, properties=None):
+        """Subscribes to the request topics on every (re)connect."""
+        if rc == 0:
+            print(f"{self.name}: Control client connected to MQTT Broker")
+            client.subscribe([(topic, 0) for topic in (publisher.REQUEST_TOPIC_QOS, publisher.REQUEST_TOPIC_DELAY,
+                                                       publisher.REQUEST_TOPIC_MESSAGESIZE, publisher.REQUEST_TOPIC_INSTANCECOUNT,
+                                                       publisher.REQUEST_TOPIC_PAYLOADRANDOM, publisher.REQUEST_TOPIC_PAYLOADBINARY,
+                                                       publisher.REQUEST_TOPIC_SYNC, publisher.REQUEST_TOPIC_CLOCKSYNC,
+                                                       publisher.REQUEST_TOPIC_MAXINFLIGHT, publisher.REQUEST_TOPIC_MAXQUEUED,
+                                                       publisher.REQUEST_TOPIC_GO)])
+        else:
+            print(f"{self.name}: Control client failed to connect, return code {rc}")
+
+    def on_control_message(self, client, userdata, msg):
+        """
+        Applies a request/* message to the shared settings, or acts on sync/go for every
+        hosted publisher. Values are validated the same way as in publisher.on_message().
+        """
+        received_ns = time.time_ns()
+        payload = msg.payload.decode().strip()
+        if msg.topic == publisher.REQUEST_TOPIC_CLOCKSYNC: # all hosted publishers share this clock
+            for pub in self.publishers:
+                client.publish(f"{publisher.STATUS_TOPIC_PREFIX}/{pub.topic_instance_id}", f"clock:{payload}:{received_ns}", qos=0)
+            return
+        print(f"{self.name}: Received message on {msg.topic}: {payload}")
+
+        try:
+            with self.settings_lock:
+                settings = dict(self.settings)
+                if msg.topic == publisher.REQUEST_TOPIC_QOS:
+                    settings["qos"] = int(payload) if int(payload) in (0, 1, 2) else 0
+                elif msg.topic == publisher.REQUEST_TOPIC_DELAY:
+                    delay = max(float(payload), 0)
+                    settings["delay"] = int(delay) if delay.is_integer() else delay
+                elif msg.topic == publisher.REQUEST_TOPIC_MESSAGESIZE:
+                    settings["message_size"] = max(int(payload), 0)
+                elif msg.topic == publisher.REQUEST_TOPIC_PAYLOADBINARY:
+                    settings["payload_binary"] = payload not in ("", "0")
+                elif msg.topic == publisher.REQUEST_TOPIC_PAYLOADRANDOM:
+                    self.payload_random = payload not in ("", "0")
+                elif msg.topic == publisher.REQUEST_TOPIC_INSTANCECOUNT:
+                    self.instance_count = int(payload)
+                elif msg.topic == publisher.REQUEST_TOPIC_MAXINFLIGHT:
+                    settings["max_inflight"] = max(int(payload), 0)
+                elif msg.topic == publisher.REQUEST_TOPIC_MAXQUEUED:
+                    settings["max_queued"] = max(int(payload), 0)
+                self.settings = settings
+        except ValueError:
+            print(f"{self.name}: Invalid payload on {msg.topic}: {payload}")
+            return
+
+        if msg.topic in (publisher.REQUEST_TOPIC_MAXINFLIGHT, publisher.REQUEST_TOPIC_MAXQUEUED):
+            # paho refuses new limits on an open connection: disconnect each data client, and
+            # the network thread applies them and reconnects once the socket has closed
+            limits = (settings["max_inflight"], settings["max_queued"])
+            for pub in self.publishers:
+                with pub.io_lock:
+                    if pub.pending_limits is None and limits == pub.window_limits:
+                        continue
+                    if pub.pending_limits is None:
+                        pub.stop_event.set()
+                        pub.client.disconnect()
+                    pub.pending_limits = limits
+
+        elif msg.topic == publisher.REQUEST_TOPIC_INSTANCECOUNT:
+            for pub in self.publishers:
+                if not self.is_active(pub) and pub.is_publishing():
+                    pub.stop_event.set()
+
+        elif msg.topic == publisher.REQUEST_TOPIC_SYNC:
+            # request/* values are applied in order on the control connection, so every
+            # setting sent before the token is in place for all hosted publishers
+            self.sync_token = payload
+            for pub in self.publishers:
+                if pub.is_publishing():
+                    pub.pending_ready = True
+                    pub.stop_event.set()
+                else:
+                    self.publish_status(pub, "ready", int(self.is_active(pub)))
+
+        elif msg.topic == publisher.REQUEST_TOPIC_GO:
+            if payload.lower() == "start":
+                self.start_bursts()
+            elif payload.lower() == "stop":
+                print(f"{self.name}: 'Stop' signal received.")
+                for pub in self.publishers:
+                    pub.stop_event.set()
+
+    ############################### Publishing ####################################
+    def is_active(self, pub):
+        return 1 <= pub.instance_number <= self.instance_count
+
+    def publish_status(self, pub, state, detail):
+        """Status ack for one hosted publisher (see publisher.publish_status()). Sent at QoS 1 on the control client, which carries no data."""
+        self.control_client.publish(f"{publisher.STATUS_TOPIC_PREFIX}/{pub.topic_instance_id}",
+                                    f"{state}:{self.sync_token}:{detail}", qos=1)
+
+    def start_bursts(self):
+        """Starts one burst thread per active, idle publisher with a snapshot of the shared settings."""
+        with self.settings_lock:
+            settings = dict(self.settings)
+            payload_random = self.payload_random
+        random_pool = publisher.build_random_pool(settings["message_size"]) if payload_random else None # read-only, shared
+        to_start = [pub for pub in self.publishers if self.is_active(pub) and not pub.is_publishing()]
+        if not to_start:
+            print(f"{self.name}: 'Go' signal received, but no hosted publisher is active and idle.")
+            return
+        with self.burst_lock:
+            if self.bursts_running == 0:
+                self.burst_totals = [0, 0.0, 0]
+            self.bursts_running += len(to_start)
+        print(f"{self.name}: 'Go' signal received. Starting {len(to_start)} publishing bursts. QoS={settings['qos']}, "
+              f"Delay={settings['delay']}ms, Size={settings['message_size']}, RandomPayload={payload_random}, "
+              f"BinaryPayload={settings['payload_binary']}, MaxInflight={settings['max_inflight']}, MaxQueued={settings['max_queued']}")
+        for pub in to_start:
+            pub.stop_event.clear()
+            pub.burst_thread = threading.Thread(target=self.publish_burst, args=(pub, settings, random_pool), daemon=True)
+            pub.burst_thread.start()
+
+    def publish_burst(self, pub, settings, random_pool):
+        """One logical publisher's burst (the engine's counterpart of publisher.publish_burst())."""
+        publish_topic = (f"{publisher.DATA_TOPIC_PREFIX}/{pub.topic_instance_id}/{settings['qos']}/"
+                         f"{settings['delay']}/{settings['message_size']}")
+        track_acks = settings["qos"] > 0
+        if track_acks:
+            pub.ack_tracker.start()
+        start_ns = time.time_ns()
+        message_counter, _ = publisher.publish_hot_loop(pub.client, publish_topic, pub.instance_number,
+                                                        start_ns + BURST_SECONDS * 1_000_000_000,
+                                                        settings, pub.stop_event, random_pool, pub.ack_tracker, pub.io_lock)
+        rate = achieved_rate(message_counter - (pub.ack_tracker.rejected if track_acks else 0), start_ns, time.time_ns())
+        done_detail = f"{message_counter}:{rate:.3f}"
+        if track_acks:
+            pub.ack_tracker.wait_for_drain(publisher.ACK_DRAIN_SECONDS)
+            ack_summary = pub.ack_tracker.finish()
+            done_detail += f":{format_ack_detail(ack_summary)}"
+        if pub.pending_ready:
+            pub.pending_ready = False
+            self.publish_status(pub, "ready", int(self.is_active(pub)))
+        else:
+            self.publish_status(pub, "done", done_detail)
+
+        with self.burst_lock:
+            self.burst_totals[0] += message_counter
+            self.burst_totals[1] += rate
+            if track_acks:
+                self.burst_totals[2] = max(self.burst_totals[2], ack_summary["max_queue_depth"])
+            self.bursts_running -= 1
+            if self.bursts_running == 0:
+                print(f"{self.name}: All bursts finished. Sent {self.burst_totals[0]} messages "
+                      f"(aggregate achieved {self.burst_totals[1]:.1f} msg/s"
+                      f"{f', max queue depth {self.burst_totals[2]}' if track_acks else ''})")
+
+    ############################### Network loop ##################################
+    def apply_window_limits(self, pub):
+        """Applies a publisher's pending in-flight/queue limits once its connection has closed, then reconnects it."""
+        with pub.io_lock:
+            pub.client.disconnect() # no socket left: only marks a lost connection closed, so paho takes the limits
+            publisher.set_window_limits(pub.client, *pub.pending_limits)
+            pub.window_limits, pub.pending_limits = pub.pending_limits, None
+            try:
+                pub.client.reconnect()
+                pub.reconnect_at = None
+            except OSError as e:
+                print(f"{self.name}: Error during reconnect attempt of {pub.client_id}: {e}")
+                pub.reconnect_at = time.time() + RECONNECT_DELAY
+
+    def network_loop(self):
+        """
+        Services every data client's socket from one thread: reads acks as they arrive,
+        flushes writes paho could not complete from the burst threads, runs keepalive
+        once a second and reconnects lost connections after RECONNECT_DELAY. Clients
+        disconnected for new in-flight/queue limits are reconnected as soon as they close.
+        """
+        selector = selectors.DefaultSelector()
+        registered = {} # LogicalPublisher -> socket currently registered
+        last_misc = 0
+        while not self.shutdown_event.is_set():
+            for pub in self.publishers:
+                if pub.pending_limits is not None and pub.client.socket() is None:
+                    self.apply_window_limits(pub)
+                sock = pub.client.socket()
+                if registered.get(pub) is not sock:
+                    if pub in registered:
+                        selector.unregister(registered.pop(pub))
+                    if sock is not None:
+                        selector.register(sock, selectors.EVENT_READ, pub)
+                        registered[pub] = sock
+
+            for key, _ in selector.select(timeout=NETWORK_POLL_SECONDS):
+                pub = key.data
+                with pub.io_lock:
+                    rc = pub.client.loop_read()
+                if rc != mqtt.MQTT_ERR_SUCCESS and pub.reconnect_at is None and pub.pending_limits is None:
+                    print(f"{self.name}: {pub.client_id} lost its connection. Reconnecting in {RECONNECT_DELAY} seconds.")
+                    pub.reconnect_at = time.time() + RECONNECT_DELAY
+            for pub in self.publishers:
+                if pub.client.want_write():
+                    with pub.io_lock:
+                        pub.client.loop_write()
+
+            now = time.time()
+            if now - last_misc >= 1:
+                last_misc = now
+                for pub in self.publishers:
+                    with pub.io_lock:
+                        pub.client.loop_misc()
+                    if pub.reconnect_at is not None and now >= pub.reconnect_at:
+                        try:
+                            with pub.io_lock:
+                                pub.client.reconnect()
+                            pub.reconnect_at = None
+                        except OSError as e:
+                            print(f"{self.name}: Error during reconnect attempt of {pub.client_id}: {e}")
+                            pub.reconnect_at = now + RECONNECT_DELAY
+        selector.close()
+
+    def connect(self):
+        """
+        Connects the control client and every data client.
+
+        Returns:
+            bool: True if all data connections were acknowledged within CONNECT_TIMEOUT_SECONDS.
+        """
+        print(f"{self.name}: Connecting {len(self.publishers)} publishers to broker {self.broker_address}:{self.broker_port}")
+        self.control_client.connect(self.broker_address, self.broker_port, KEEPALIVE_SECONDS)
+        self.control_client.loop_start()
+        for pub in self.publishers:
+            pub.client.connect(self.broker_address, self.broker_port, KEEPALIVE_SECONDS)
+        self.network_thread = threading.Thread(target=self.network_loop, daemon=True)
+        self.network_thread.start()
+
+        deadline = time.time() + CONNECT_TIMEOUT_SECONDS
+        while time.time() < deadline:
+            connected = sum(pub.client.is_connected() for pub in self.publishers)
+            if connected == len(self.publishers):
+                print(f"{self.name}: All {connected} publishers connected.")
+                return True
+            time.sleep(0.1)
+        print(f"{self.name}: Warning - only {connected}/{len(self.publishers)} publishers connected "
+              f"after {CONNECT_TIMEOUT_SECONDS}s.")
+        return False
+
+    def shutdown(self):
+        """Stops running bursts and disconnects every client."""
+        for pub in self.publishers:
+            pub.stop_event.set()
+        for pub in self.publishers:
+            if pub.burst_thread is not None:
+                pub.burst_thread.join(timeout=5)
+        for pub in self.publishers:
+            with pub.io_lock:
+                pub.client.disconnect()
+        self.shutdown_event.set()
+        if self.network_thread is not None:
+            self.network_thread.join(timeout=5)
+        self.control_client.loop_stop()
+        self.control_client.disconnect()
+        print(f"{self.name}: Disconnected and shutdown")
+
+def main():
+    """
+    Runs an engine hosting publishers <first_id> .. <first_id + count - 1>.
+    """
+    if len(sys.argv) < 3:
+        print("Usage: python publisher_engine.py <first_id> <count> [broker_port]")
+        print("Example: python publisher_engine.py 1 200   (pub-01 .. pub-200)")
+        sys.exit(1)
+    try:
+        first_id, count = int(sys.argv[1]), int(sys.argv[2])
+        broker_port = int(sys.argv[3]) if len(sys.argv) > 3 else BROKER_PORT
+        if first_id < 1 or count < 1:
+            raise ValueError("first_id and count must be at least 1")
+        if first_id + count - 1 > publisher.MAX_INSTANCE_NUMBER:
+            raise ValueError(f"instance numbers must not exceed {publisher.MAX_INSTANCE_NUMBER}")
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    engine = PublisherEngine(list(range(first_id, first_id + count)), broker_port=broker_port)
+    try:
+        engine.connect()
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print(f"{engine.name}: Exiting due to KeyboardInterrupt")
+    except OSError as e:
+        print(f"{engine.name}: Error connecting to broker: {e}")
+    finally:
+        engine.shutdown()
+
+if __name__ == '__main__':
+    main()
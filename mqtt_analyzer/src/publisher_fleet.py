@@ -0,0 +1,136 @@
+import os
+import time
+import queue
+import argparse
+import multiprocessing
+
+import publisher
+import publisher_engine
+
+############################# Configurations ##################################
+
+FLEET_PIN_CORES = True # pin each worker process to one core (os.sched_setaffinity, Linux)
+FLEET_RESERVED_CORES = 0 # leave the first N usable cores to the broker/analyzer on the same box
+WORKER_STARTUP_TIMEOUT_SECONDS = 60
+
+###############################################################################
+
+def slice_instances(first_id, count, num_workers):
+    """
+    Splits publisher IDs first_id .. first_id + count - 1 into num_workers contiguous
+    slices of (nearly) equal size, so each worker hosts a block such as pub-01..pub-50.
+
+    Args:
+        first_id (int): First publisher instance number.
+        count (int): Number of publishers in the fleet.
+        num_workers (int): Number of worker processes.
+    Returns:
+        list: One list of instance numbers per worker (empty lists dropped).
+    """
+    base, extra = divmod(count, num_workers)
+    slices, start = [], first_id
+    for worker_index in range(num_workers):
+        size = base + (1 if worker_index < extra else 0)
+        if size:
+            slices.append(list(range(start, start + size)))
+        start += size
+    return slices
+
+def usable_cores():
+    """Cores this process may run on (minus FLEET_RESERVED_CORES), or None where affinity is unsupported."""
+    if not hasattr(os, "sched_getaffinity"):
+        return None
+    cores = sorted(os.sched_getaffinity(0))
+    return cores[FLEET_RESERVED_CORES:] or cores
+
+def _run_worker(worker_index, instance_numbers, broker_port, core, ready_queue, stop_event):
+    """
+    Body of one worker process: pins itself to its core, then hosts its slice of
+    publishers in a PublisherEngine until the fleet is stopped. The analyzer drives
+    every engine over the same request/* topics, so workers need no coordination of
+    their own beyond startup and shutdown.
+    """
+    if core is not None:
+        os.sched_setaffinity(0, {core})
+    engine = publisher_engine.PublisherEngine(instance_numbers, broker_port=broker_port)
+    try:
+        connected = engine.connect()
+        ready_queue.put((worker_index, connected))
+        stop_event.wait()
+    except KeyboardInterrupt:
+        pass # the launcher sets stop_event on Ctrl-C
+    except OSError as e:
+        print(f"{engine.name}: Error connecting to broker: {e}")
+        ready_queue.put((worker_index, False))
+    finally:
+        engine.shutdown()
+
+def run_fleet(count, broker_port, num_workers=None, first_id=1):
+    """
+    Starts a fleet of `count` publishers spread over worker processes, one per core by
+    default, and blocks until interrupted. A single Python process tops out at roughly
+    one core of publishing (the GIL), so saturating a broker from a many-core box needs
+    the publishers split across processes; pinning keeps each worker on its own core
+    instead of migrating between them.
+
+    Args:
+        count (int): Number of publishers (pub-<first_id> onwards).
+        broker_port (int): Broker port every publisher connects to.
+        num_workers (int): Worker processes; defaults to one per usable core.
+        first_id (int): Instance number of the first publisher.
+    """
+    cores = usable_cores()
+    if num_workers is None:
+        num_workers = len(cores) if cores else os.cpu_count() or 1
+    slices = slice_instances(first_id, count, min(num_workers, count))
+    if FLEET_PIN_CORES and cores is None:
+        print("Fleet: core pinning is not supported on this platform; workers will float")
+
+    ready_queue = multiprocessing.Queue()
+    stop_event = multiprocessing.Event()
+    workers = []
+    for worker_index, instance_numbers in enumerate(slices):
+        core = cores[worker_index % len(cores)] if FLEET_PIN_CORES and cores else None
+        workers.append(multiprocessing.Process(target=_run_worker,
+                                               args=(worker_index, instance_numbers, broker_port, core, ready_queue, stop_event)))
+        print(f"Fleet: worker {worker_index}: pub-{instance_numbers[0]:02d}..pub-{instance_numbers[-1]:02d}"
+              f"{f' on core {core}' if core is not None else ''}")
+    for worker in workers:
+        worker.start()
+
+    try:
+        connected_workers = 0
+        deadline = time.time() + WORKER_STARTUP_TIMEOUT_SECONDS
+        for _ in workers:
+            try:
+                _, connected = ready_queue.get(timeout=max(deadline - time.time(), 0.1))
+            except queue.Empty:
+                break
+            connected_workers += connected
+        print(f"Fleet: {connected_workers}/{len(workers)} workers fully connected; {count} publishers on port {broker_port}. "
+              f"Ctrl-C to stop.")
+        while any(worker.is_alive() for worker in workers):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Fleet: Stopping workers...")
+    finally:
+        stop_event.set()
+        for worker in workers:
+            worker.join(timeout=15)
+            if worker.is_alive():
+                worker.terminate()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run a fleet of publishers as pinned worker processes, each hosting a slice of publisher IDs.")
+    parser.add_argument("count", type=int, help="Number of publishers")
+    parser.add_argument("broker_port", type=int, nargs="?", default=publisher_engine.BROKER_PORT, help="Broker port")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per usable core)")
+    parser.add_argument("--first-id", type=int, default=1, help="Instance number of the first publisher")
+    parser.add_argument("--reserve-cores", type=int, default=FLEET_RESERVED_CORES, help="Usable cores to leave free for the broker/analyzer")
+    parser.add_argument("--no-pin", action="store_true", help="Don't pin workers to cores")
+    args = parser.parse_args()
+    if args.count < 1 or args.first_id < 1 or args.first_id + args.count - 1 > publisher.MAX_INSTANCE_NUMBER:
+        parser.error(f"publisher IDs must lie within 1-{publisher.MAX_INSTANCE_NUMBER}")
+    FLEET_RESERVED_CORES = args.reserve_cores
+    FLEET_PIN_CORES = FLEET_PIN_CORES and not args.no_pin
+    run_fleet(args.count, args.broker_port, args.workers, args.first_id)
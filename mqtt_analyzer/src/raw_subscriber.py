@@ -0,0 +1,276 @@
+import time
+import socket
+import struct
+import threading
+
+############################# Configurations ##################################
+
+RAW_RECV_BUFFER_BYTES = 4 << 20 # receive buffer recv_into() fills; grows if a single packet is larger
+RAW_SOCKET_RCVBUF_BYTES = 8 << 20 # SO_RCVBUF requested from the kernel
+RAW_KEEPALIVE_SECONDS = 60
+RAW_CONNECT_TIMEOUT_SECONDS = 10
+RAW_ACK_TIMEOUT_SECONDS = 5
+
+# MQTT 3.1.1 control packet types (upper nibble of the fixed header)
+CONNECT = 1
+CONNACK = 2
+PUBLISH = 3
+PUBACK = 4
+PUBREC = 5
+PUBREL = 6
+PUBCOMP = 7
+SUBSCRIBE = 8
+SUBACK = 9
+UNSUBSCRIBE = 10
+UNSUBACK = 11
+PINGREQ = 12
+PINGRESP = 13
+DISCONNECT = 14
+
+PACKET_ID_STRUCT = struct.Struct("!H")
+PINGREQ_PACKET = bytes([PINGREQ << 4, 0])
+DISCONNECT_PACKET = bytes([DISCONNECT << 4, 0])
+
+###############################################################################
+
+class MQTTProtocolError(Exception):
+    """The broker sent something this subscriber can't parse."""
+
+def encode_remaining_length(length):
+    """MQTT variable-length encoding of a packet's remaining length."""
+    encoded = bytearray()
+    while True:
+        byte, length = length & 0x7F, length >> 7
+        encoded.append(byte | 0x80 if length else byte)
+        if not length:
+            return bytes(encoded)
+
+def encode_string(value):
+    """MQTT UTF-8 string: 2-byte big-endian length, then the bytes."""
+    data = value.encode() if isinstance(value, str) else value
+    return PACKET_ID_STRUCT.pack(len(data)) + data
+
+def build_packet(first_byte, body):
+    return bytes([first_byte]) + encode_remaining_length(len(body)) + body
+
+class RawSubscriber:
+    """
+    Minimal MQTT 3.1.1 subscriber for the analyzer's data topics: CONNECT, SUBSCRIBE/
+    UNSUBSCRIBE, PINGREQ and the QoS 1/2 receive handshakes (PUBACK, PUBREC/PUBREL/
+    PUBCOMP), and nothing else (no publishing, no will, no session resume).
+
+    A single reader thread fills one preallocated bytearray with socket.recv_into() and
+    parses every complete packet in it through a memoryview, so a PUBLISH costs two
+    slices (topic and payload bytes) and one on_message(topic bytes, payload bytes,
+    received_ns) call, instead of paho's MQTTMessage object, topic decoding and
+    per-packet reads. The callback signature matches IngestRing.put() and the analyzer's
+    handle_analyzer_message(). Every message parsed from one recv_into() shares that
+    read's receive timestamp. The acks a read calls for are sent together in one sendall().
+    """
+    def __init__(self, on_message, client_id):
+        self.on_message = on_message
+        self.client_id = client_id
+        self.sock = None
+        self.reader_thread = None
+        self.send_lock = threading.Lock()
+        self.response_condition = threading.Condition()
+        self.responses = {} # packet id (0 for CONNACK) -> body of the SUBACK/UNSUBACK/CONNACK
+        self.awaiting_pubrel = set() # QoS 2 packet ids delivered but not yet released
+        self.next_packet_id = 0
+        self.keepalive_seconds = RAW_KEEPALIVE_SECONDS
+        self.last_send_time = 0
+        self.connected = False
+        self.messages_received = 0
+
+    def connect(self, host, port, keepalive_seconds=RAW_KEEPALIVE_SECONDS):
+        """
+        Opens a clean session and starts the reader thread.
+
+        Returns:
+            bool: True if the broker accepted the connection (CONNACK return code 0).
+        Raises:
+            OSError: If the TCP connection fails.
+        """
+        self.keepalive_seconds = keepalive_seconds
+        self.sock = socket.create_connection((host, port), timeout=RAW_CONNECT_TIMEOUT_SECONDS)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RAW_SOCKET_RCVBUF_BYTES)
+        except OSError:
+            pass # keep the kernel default
+        self.sock.settimeout(keepalive_seconds / 2) # recv wakes up in time to send PINGREQ
+        variable_header = encode_string("MQTT") + bytes([4, 0x02]) + PACKET_ID_STRUCT.pack(keepalive_seconds) # 3.1.1, clean session
+        self._send(build_packet(CONNECT << 4, variable_header + encode_string(self.client_id)))
+
+        self.reader_thread = threading.Thread(target=self._read_loop, daemon=True)
+        self.reader_thread.start()
+        connack = self._wait_for_response(0, RAW_CONNECT_TIMEOUT_SECONDS)
+        self.connected = connack is not None and connack[1] == 0
+        return self.connected
+
+    def is_connected(self):
+        return self.connected
+
+    def subscribe(self, topics_with_qos):
+        """
+        Subscribes to [(topic filter, qos), ...] and waits for the SUBACK.
+
+        Returns:
+            list: Granted QoS per filter (0x80 for a refused filter), or None on timeout.
+        """
+        packet_id = self._new_packet_id()
+        body = PACKET_ID_STRUCT.pack(packet_id) + b"".join(encode_string(topic) + bytes([qos]) for topic, qos in topics_with_qos)
+        self._send(build_packet((SUBSCRIBE << 4) | 0x02, body))
+        suback = self._wait_for_response(packet_id, RAW_ACK_TIMEOUT_SECONDS)
+        return list(suback[2:]) if suback is not None else None
+
+    def unsubscribe(self, topics):
+        """
+        Unsubscribes from the given filters and waits for the UNSUBACK.
+
+        Returns:
+            bool: False if the broker didn't acknowledge in time.
+        """
+        packet_id = self._new_packet_id()
+        body = PACKET_ID_STRUCT.pack(packet_id) + b"".join(encode_string(topic) for topic in topics)
+        self._send(build_packet((UNSUBSCRIBE << 4) | 0x02, body))
+        return self._wait_for_response(packet_id, RAW_ACK_TIMEOUT_SECONDS) is not None
+
+    def disconnect(self):
+        """Sends DISCONNECT, closes the socket and waits for the reader thread to end."""
+        if self.sock is None:
+            return
+        self.connected = False
+        try:
+            self._send(DISCONNECT_PACKET)
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass # already gone
+        self.sock.close()
+        if self.reader_thread:
+            self.reader_thread.join(timeout=5)
+        self.sock = None
+
+    def _new_packet_id(self):
+        self.next_packet_id = self.next_packet_id % 65535 + 1
+        with self.response_condition:
+            self.responses.pop(self.next_packet_id, None)
+        return self.next_packet_id
+
+    def _send(self, data):
+        with self.send_lock:
+            self.sock.sendall(data)
+            self.last_send_time = time.monotonic()
+
+    def _wait_for_response(self, packet_id, timeout_seconds):
+        with self.response_condition:
+            self.response_condition.wait_for(lambda: packet_id in self.responses or not self.reader_thread.is_alive(),
+                                             timeout=timeout_seconds)
+            return self.responses.pop(packet_id, None)
+
+    def _read_loop(self):
+        buffer = bytearray(RAW_RECV_BUFFER_BYTES)
+        view = memoryview(buffer)
+        start = end = 0 # unparsed bytes are buffer[start:end]
+        ping_interval = self.keepalive_seconds / 2
+        try:
+            while True:
+                if end == len(buffer):
+                    if start: # move the partial packet to the front
+                        view[:end - start] = view[start:end]
+                        start, end = 0, end - start
+                    else: # one packet larger than the whole buffer
+                        view.release()
+                        buffer.extend(bytes(len(buffer)))
+                        view = memoryview(buffer)
+                try:
+                    received = self.sock.recv_into(view[end:])
+                except socket.timeout:
+                    received = None
+                if received == 0:
+                    break # broker closed the connection
+                if received:
+                    received_ns = time.time_ns()
+                    end += received
+                    start = self._parse_packets(buffer, view, start, end, received_ns)
+                    if start == end:
+                        start = end = 0
+                if time.monotonic() - self.last_send_time >= ping_interval:
+                    self._send(PINGREQ_PACKET)
+        except (OSError, MQTTProtocolError) as e:
+            if self.connected:
+                print(f"Analyzer [raw subscriber]: Connection lost: {e}")
+        finally:
+            if self.connected:
+                print("Analyzer [raw subscriber]: Broker closed the connection")
+            self.connected = False
+            view.release()
+            with self.response_condition:
+                self.response_condition.notify_all()
+
+    def _parse_packets(self, buffer, view, pos, end, received_ns):
+        """
+        Handles every complete packet in buffer[pos:end].
+
+        Returns:
+            int: Position of the first byte not yet parsed (start of a partial packet).
+        """
+        on_message = self.on_message
+        acks = bytearray()
+        delivered = 0
+        while end - pos >= 2:
+            header = buffer[pos]
+            # remaining length: up to 4 bytes, 7 bits each
+            index, length, shift = pos + 1, 0, 0
+            while index < end:
+                byte = buffer[index]
+                index += 1
+                length |= (byte & 0x7F) << shift
+                if not byte & 0x80:
+                    break
+                shift += 7
+                if shift > 21:
+                    raise MQTTProtocolError("remaining length longer than 4 bytes")
+            else:
+                break # length field incomplete
+            packet_end = index + length
+            if packet_end > end:
+                break # body incomplete
+
+            packet_type = header >> 4
+            if packet_type == PUBLISH:
+                qos = (header >> 1) & 0x03
+                topic_end = index + 2 + ((buffer[index] << 8) | buffer[index + 1])
+                payload_start = topic_end
+                deliver = True
+                if qos:
+                    packet_id_bytes = bytes(view[topic_end:topic_end + 2])
+                    payload_start += 2
+                    if qos == 1:
+                        acks += bytes([PUBACK << 4, 2]) + packet_id_bytes
+                    else:
+                        acks += bytes([PUBREC << 4, 2]) + packet_id_bytes
+                        # a resent PUBLISH (lost PUBREC) is acknowledged again but delivered once
+                        deliver = packet_id_bytes not in self.awaiting_pubrel
+                        self.awaiting_pubrel.add(packet_id_bytes)
+                if deliver:
+                    on_message(bytes(view[index + 2:topic_end]), bytes(view[payload_start:packet_end]), received_ns)
+                    delivered += 1
+            elif packet_type == PUBREL:
+                packet_id_bytes = bytes(view[index:index + 2])
+                self.awaiting_pubrel.discard(packet_id_bytes)
+                acks += bytes([PUBCOMP << 4, 2]) + packet_id_bytes
+            elif packet_type in (SUBACK, UNSUBACK, CONNACK):
+                body = bytes(view[index:packet_end])
+                packet_id = 0 if packet_type == CONNACK else PACKET_ID_STRUCT.unpack_from(body)[0]
+                with self.response_condition:
+                    self.responses[packet_id] = body
+                    self.response_condition.notify_all()
+            elif packet_type != PINGRESP:
+                raise MQTTProtocolError(f"unexpected packet type {packet_type}")
+            pos = packet_end
+
+        self.messages_received += delivered
+        if acks:
+            self._send(acks)
+        return pos
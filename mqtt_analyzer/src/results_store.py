@@ -0,0 +1,156 @@
+import os
+import csv
+import glob
+import numpy as np
+
+############################# Configurations ##################################
+
+OUTPUT_NPZ_DIR = "mqtt_test_results_npz"
+
+# Column name -> dtype. Every run file is written with exactly these columns (missing
+# values filled with the column's fill value) so files from any sweep can be concatenated.
+# New columns must only ever be appended; older files are padded with the fill value on load.
+RESULTS_SCHEMA = [
+    ("Test_Run_Timestamp", "U32"),
+    ("Analyzer_sub_QoS", "i8"),
+    ("Publisher_pub_QoS", "i8"),
+    ("Publisher_delay_ms", "i8"),
+    ("Publisher_msg_size_bytes", "i8"),
+    ("Publisher_instance_count_cfg", "i8"),
+    ("Total_msgs_received_by_analyzer", "i8"),
+    ("Mean_total_rate_mps_analyzer", "f8"),
+    ("Avg_loss_pct_per_active_pub", "f8"),
+    ("Avg_outoforder_pct_per_active_pub", "f8"),
+    ("Avg_dup_pct_per_active_pub", "f8"),
+    ("Avg_inter_msg_gap_ms_per_active_pub", "f8"),
+    ("Avg_stddev_inter_msg_gap_ms_per_active_pub", "f8"),
+    ("SYS_load_messages_received_1min_last", "f8"),
+    ("SYS_load_messages_sent_1min_last", "f8"),
+    ("SYS_clients_active_last", "f8"),
+    ("SYS_messages_stored_last", "f8"),
+    ("SYS_subscriptions_count_last", "f8"),
+    ("Collection_duration_s", "f8"),
+    ("CI_rate_rel_halfwidth", "f8"),
+    ("CI_loss_abs_halfwidth_pct", "f8"),
+    ("CI_gap_rel_halfwidth", "f8"),
+    ("Converged_early", "U8"),
+    ("Publisher_payload_random", "i8"),
+    ("Latency_p50_ms", "f8"),
+    ("Latency_p95_ms", "f8"),
+    ("Latency_p99_ms", "f8"),
+    ("Latency_max_ms", "f8"),
+    ("Publisher_payload_binary", "i8"),
+    ("Publisher_target_rate_mps", "f8"),
+    ("Publisher_achieved_rate_mps", "f8"),
+    ("Publisher_max_inflight", "i8"),
+    ("Publisher_max_queued", "i8"),
+    ("Publisher_ack_p50_ms", "f8"),
+    ("Publisher_ack_p99_ms", "f8"),
+    ("Publisher_max_queue_depth", "f8"),
+    ("Publisher_delay_ms_f", "f8"), # exact delay; Publisher_delay_ms truncates sub-ms delays
+]
+FILL_VALUES = {"U": "", "i": -1, "f": np.nan}
+
+# Column -> source column it is filled from when a run (or an older file) doesn't have it.
+COLUMN_SOURCES = {"Publisher_delay_ms_f": "Publisher_delay_ms"}
+
+###############################################################################
+
+def _to_column_value(value, dtype):
+    """
+    Converts a single result value (as produced by calculate_stats() or read from CSV)
+    to the schema dtype. Non-numeric values such as "N/A" become the column's fill value.
+    """
+    kind = np.dtype(dtype).kind
+    if value is None or value == "":
+        return FILL_VALUES[kind]
+    if kind == "U":
+        return str(value)
+    try:
+        return int(float(value)) if kind == "i" else float(value)
+    except (TypeError, ValueError):
+        return FILL_VALUES[kind]
+
+def _row_value(row, name):
+    """Returns row[name], falling back to the column's COLUMN_SOURCES entry if it's missing."""
+    if name not in row and name in COLUMN_SOURCES:
+        return row.get(COLUMN_SOURCES[name])
+    return row.get(name)
+
+def write_run_npz(results_dict, output_dir=None):
+    """
+    Writes one test run's results as a columnar .npz file (one length-1 array per
+    schema column). Files are named by run timestamp so a sweep directory sorts in run order.
+
+    Args:
+        results_dict (dict): The dictionary returned by calculate_stats() for one test run.
+        output_dir (str): Directory holding the per-run .npz files (default OUTPUT_NPZ_DIR).
+    Returns:
+        str: Path of the written file.
+    """
+    output_dir = output_dir or OUTPUT_NPZ_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    columns = {
+        name: np.array([_to_column_value(_row_value(results_dict, name), dtype)], dtype=dtype)
+        for name, dtype in RESULTS_SCHEMA
+    }
+    run_stamp = str(results_dict.get("Test_Run_Timestamp", "")).replace(":", "-") or str(len(os.listdir(output_dir)))
+    path = os.path.join(output_dir, f"run_{run_stamp}.npz")
+    np.savez(path, **columns)
+    return path
+
+def _empty_columns():
+    return {name: np.empty(0, dtype=dtype) for name, dtype in RESULTS_SCHEMA}
+
+def load_results(output_dir=None):
+    """
+    Loads every per-run .npz file in a sweep directory into one array per column.
+
+    Args:
+        output_dir (str): Directory holding the per-run .npz files (default OUTPUT_NPZ_DIR).
+    Returns:
+        dict: Column name -> NumPy array with one entry per test run, in run order.
+    """
+    output_dir = output_dir or OUTPUT_NPZ_DIR
+    paths = sorted(glob.glob(os.path.join(output_dir, "run_*.npz")))
+    if not paths:
+        return _empty_columns()
+
+    parts = {name: [] for name, _ in RESULTS_SCHEMA}
+    for path in paths:
+        with np.load(path) as run:
+            for name, dtype in RESULTS_SCHEMA:
+                if name in run.files:
+                    parts[name].append(run[name].astype(dtype, copy=False))
+                elif COLUMN_SOURCES.get(name) in run.files: # file predates this column, derive it
+                    parts[name].append(run[COLUMN_SOURCES[name]].astype(dtype))
+                else: # file predates this column
+                    parts[name].append(np.full(1, FILL_VALUES[np.dtype(dtype).kind], dtype=dtype))
+    return {name: np.concatenate(parts[name]) for name, _ in RESULTS_SCHEMA}
+
+def load_results_csv(csv_path):
+    """
+    Loads a results CSV written by write_results_to_csv() into the same column layout
+    as load_results(). Rows whose field count doesn't match the header are skipped.
+
+    Args:
+        csv_path (str): Path to the CSV file.
+    Returns:
+        dict: Column name -> NumPy array with one entry per valid CSV row.
+    """
+    rows = []
+    with open(csv_path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return _empty_columns()
+        for line_number, row in enumerate(reader, start=2):
+            if len(row) != len(header):
+                print(f"Results store: Skipping malformed CSV line {line_number} ({len(row)} fields, expected {len(header)})")
+                continue
+            rows.append(dict(zip(header, row)))
+
+    return {
+        name: np.array([_to_column_value(_row_value(row, name), dtype) for row in rows], dtype=dtype)
+        for name, dtype in RESULTS_SCHEMA
+    }
@@ -0,0 +1,82 @@
+import os
+import json
+import hashlib
+import datetime
+
+############################# Configurations ##################################
+
+RUN_LEDGER_FILE = "mqtt_sweep_ledger.jsonl" # one JSON line per completed test run
+
+###############################################################################
+
+def params_key(test_params):
+    """
+    Canonical string for a test params dict, independent of key order, used as the
+    ledger key for one combination.
+    """
+    return json.dumps(sorted(test_params.items()))
+
+def sweep_id_for(test_combinations, test_duration_seconds):
+    """
+    Derives a stable sweep ID from the set of combinations and the test duration, so
+    rerunning the same sweep (same spec, same grid) resumes it, while a different sweep
+    gets a fresh ID and is measured from scratch.
+
+    Args:
+        test_combinations (list): Test params dicts of the whole sweep.
+        test_duration_seconds (int): Collection window length of each test.
+    Returns:
+        str: A 12 hex digit sweep ID.
+    """
+    keys = sorted(params_key(test_params) for test_params in test_combinations)
+    return hashlib.sha1(json.dumps([keys, test_duration_seconds]).encode()).hexdigest()[:12]
+
+class RunLedger:
+    """
+    Append-only record of which combinations of a sweep have finished. A combination is
+    marked done only after its results row has been written, and each entry is flushed
+    and fsynced, so after a crash the ledger lists exactly the runs that have a results
+    row. Several sweep worker processes may append to the same ledger file (each entry
+    is one short write to a file opened in append mode).
+    """
+    def __init__(self, sweep_id, path=None):
+        self.sweep_id = sweep_id
+        self.path = path or RUN_LEDGER_FILE
+        self.completed = set()
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError: # line cut short by a crash mid-write
+                        continue
+                    if entry.get("sweep_id") == sweep_id:
+                        self.completed.add(entry["params_key"])
+
+    def is_done(self, test_params):
+        """True if this combination already has a results row for this sweep."""
+        return params_key(test_params) in self.completed
+
+    def pending(self, test_combinations):
+        """The combinations that still have to be run, in their original order."""
+        return [test_params for test_params in test_combinations if not self.is_done(test_params)]
+
+    def mark_done(self, test_params, run_timestamp=None):
+        """
+        Records a finished combination.
+
+        Args:
+            test_params (dict): The combination that was run.
+            run_timestamp (str): Test_Run_Timestamp of its results row.
+        """
+        key = params_key(test_params)
+        entry = {
+            "sweep_id": self.sweep_id,
+            "params_key": key,
+            "run_timestamp": run_timestamp or datetime.datetime.now().isoformat(),
+        }
+        with open(self.path, mode='a') as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.completed.add(key)
@@ -1,8 +1,13 @@
 #!/bin/bash 
-echo "Starting 10 MQTT publishers ..."
-for i in $(seq -f "%02g" 1 10); do 
+# Usage: ./start_publishers.sh [broker_port] [count]   (defaults 1883, 10)
+# One process per publisher; for large fleets use publisher_fleet.py, which hosts
+# many publishers per process on pinned worker processes.
+BROKER_PORT=${1:-1883}
+PUBLISHER_COUNT=${2:-10}
+echo "Starting ${PUBLISHER_COUNT} MQTT publishers against broker port ${BROKER_PORT} ..."
+for i in $(seq -f "%02g" 1 "${PUBLISHER_COUNT}"); do 
   echo "Launching pub-${i}"
-  python publisher.py "pub-${i}" & # '&' runs it in background 
+  python publisher.py "pub-${i}" "${BROKER_PORT}" & # '&' runs it in background 
   sleep 0.2 
 done 
 echo "All publisher processes launched in the background."
@@ -0,0 +1,121 @@
+import numpy as np
+
+###############################################################################
+# Vectorized per-publisher statistics over CaptureBuffer columns. Every metric
+# reproduces the original dict-based calculate_stats() loop exactly, including
+# its summation order, so results are bit-for-bit identical.
+###############################################################################
+
+def split_by_publisher(instance_ids, ctrs, received_ts):
+    """
+    Groups captured columns by publisher instance id, keeping arrival order within
+    each publisher. Publishers are returned in order of their first message, which
+    is the order the original dict-based grouping iterated them in.
+
+    Args:
+        instance_ids, ctrs, received_ts (np.ndarray): Captured columns in arrival order.
+    Returns:
+        list: (instance_id, ctrs, received_ts) tuples, one per publisher.
+    """
+    if len(instance_ids) == 0:
+        return []
+    order = np.argsort(instance_ids, kind='stable')
+    unique_ids, first_idx, counts = np.unique(instance_ids, return_index=True, return_counts=True)
+    per_publisher_idx = np.split(order, np.cumsum(counts)[:-1])
+    return [
+        (int(unique_ids[i]), ctrs[per_publisher_idx[i]], received_ts[per_publisher_idx[i]])
+        for i in np.argsort(first_idx)
+    ]
+
+def publisher_metrics(ctrs, received_ts):
+    """
+    Computes loss, out-of-order, duplicate and inter-message gap metrics for one
+    publisher's messages.
+
+    Args:
+        ctrs (np.ndarray): Payload counters, in arrival order.
+        received_ts (np.ndarray): Analyzer receive timestamps, in arrival order.
+    Returns:
+        dict: loss_pct, outoforder_pct, dup_pct, avg_gap, stddev_gap (gap in the
+              units of received_ts), plus received/unique/outoforder/dup counts.
+    """
+    received_count = len(ctrs)
+    if received_count == 0:
+        return {"loss_pct": 0.0, "outoforder_pct": 0, "dup_pct": 0, "avg_gap": 0, "stddev_gap": 0,
+                "received": 0, "unique": 0, "outoforder": 0, "dup": 0}
+
+    # Loss and duplicates: unique ctrs vs the highest ctr seen (ctrs start at 0).
+    # lexsort by (ctr, received_ts) puts each ctr's earliest arrival first, which
+    # np.unique's return_index then picks out for the gap calculation below.
+    by_ctr = np.lexsort((received_ts, ctrs))
+    unique_ctrs, first_idx = np.unique(ctrs[by_ctr], return_index=True)
+    unique_count = len(unique_ctrs)
+    expected_based_on_max_ctr = int(unique_ctrs[-1]) + 1
+    loss_pct = ((expected_based_on_max_ctr - unique_count) / expected_based_on_max_ctr) * 100 if expected_based_on_max_ctr > 0 else 0
+    dup_count = received_count - unique_count
+
+    # Out of order: a ctr smaller than the running max of everything that arrived before it
+    arrival_ctrs = ctrs[np.argsort(received_ts, kind='stable')]
+    previous_max = np.empty_like(arrival_ctrs)
+    previous_max[0] = -1
+    np.maximum.accumulate(arrival_ctrs[:-1], out=previous_max[1:])
+    outoforder_count = int(np.count_nonzero(arrival_ctrs < previous_max)) if received_count > 1 else 0
+
+    # Inter-message gap between first arrivals of numerically consecutive ctrs
+    first_arrival_ts = received_ts[by_ctr][first_idx]
+    consecutive = np.diff(unique_ctrs) == 1
+    gaps = np.diff(first_arrival_ts)[consecutive]
+    avg_gap = 0
+    stddev_gap = 0
+    if len(gaps):
+        avg_gap = int(gaps.sum()) / len(gaps)
+        if len(gaps) > 1:
+            # cumsum adds strictly left to right, matching sum() over a list
+            variance = np.cumsum((gaps - avg_gap) ** 2)[-1] / len(gaps)
+            stddev_gap = float(variance) ** 0.5
+
+    return {
+        "loss_pct": loss_pct,
+        "outoforder_pct": (outoforder_count / received_count) * 100,
+        "dup_pct": (dup_count / received_count) * 100,
+        "avg_gap": avg_gap,
+        "stddev_gap": stddev_gap,
+        "received": received_count,
+        "unique": unique_count,
+        "outoforder": outoforder_count,
+        "dup": dup_count,
+    }
+
+def one_way_latency_ns(instance_ids, sent_ts, received_ts, clock_offsets_ns):
+    """
+    Per-message one-way latency, corrected for each publisher's clock offset.
+
+    Args:
+        instance_ids, sent_ts, received_ts (np.ndarray): Captured columns (timestamps in ns).
+        clock_offsets_ns (dict): Instance id -> publisher clock minus analyzer clock, in ns.
+                                 Publishers without an entry are assumed to share the clock.
+    Returns:
+        np.ndarray: int64 latencies in ns, one per message.
+    """
+    latency_ns = received_ts - sent_ts
+    if clock_offsets_ns and len(instance_ids):
+        unique_ids, inverse = np.unique(instance_ids, return_inverse=True)
+        offsets = np.array([clock_offsets_ns.get(int(instance_id), 0) for instance_id in unique_ids], dtype=np.int64)
+        latency_ns = latency_ns + offsets[inverse]
+    return latency_ns
+
+def latency_summary(latency_ns, quantiles=(0.5, 0.95, 0.99)):
+    """
+    Summarises a latency distribution.
+
+    Args:
+        latency_ns (np.ndarray): Latencies in ns.
+        quantiles (tuple): Quantiles to report, in [0, 1].
+    Returns:
+        dict: 'p50', 'p95', ... and 'max', in ms (None for an empty input).
+    """
+    names = [f"p{int(q * 100)}" for q in quantiles] + ["max"]
+    if len(latency_ns) == 0:
+        return dict.fromkeys(names)
+    values = list(np.percentile(latency_ns, [q * 100 for q in quantiles])) + [latency_ns.max()]
+    return {name: float(value) / 1e6 for name, value in zip(names, values)}
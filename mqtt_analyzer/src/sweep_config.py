@@ -0,0 +1,154 @@
+import os
+import json
+import random
+import itertools
+
+try:
+    import tomllib # Python 3.11+
+except ImportError:
+    tomllib = None
+
+############################# Configurations ##################################
+
+# Axis name -> levels. Key order is the loop nesting order (first = outermost).
+DEFAULT_SWEEP_AXES = {
+    "analyzer_qos": [0, 1, 2],
+    "pub_qos": [0, 1, 2],
+    "pub_delay": [0, 100],
+    "pub_msg_size": [0, 1000, 4000],
+    "pub_instance_count": [1, 5, 10],
+}
+OPTIONAL_AXES = {
+    "pub_payload_random": [0], # 1 = random alphanumeric payload instead of 'x' * size
+    "pub_payload_binary": [0], # 1 = binary header framing (payload_format.py) instead of text
+    "pub_max_inflight": [20], # publishers' QoS 1/2 in-flight window (0 = unlimited; changing it reconnects the publishers)
+    "pub_max_queued": [0], # publishers' outgoing queue limit beyond the window (0 = unbounded)
+}
+DESIGNS = ("full_factorial", "subset", "latin_hypercube", "random")
+
+###############################################################################
+
+def load_sweep_spec(path):
+    """
+    Loads a sweep spec from a .json or .toml file. A spec looks like:
+
+        {
+            "design": "latin_hypercube",      # full_factorial | subset | latin_hypercube | random
+            "axes": {"pub_qos": [0, 1, 2], "pub_delay": [0, 10, 100], ...},
+            "samples": 40,                    # latin_hypercube / random only
+            "seed": 1,                        # latin_hypercube / random only
+            "combinations": [{...}, ...],     # subset only: explicit axis values per test
+            "duration_seconds": 30            # optional, overrides TEST_DURATION_SECONDS
+        }
+
+    Axes left out of "axes" use DEFAULT_SWEEP_AXES (or OPTIONAL_AXES) levels. Each subset
+    combination must give every DEFAULT_SWEEP_AXES axis; optional axes it leaves out take
+    their first level. A "duration_seconds" shorter than the publishers' burst is fine: the
+    analyzer stops the bursts when each window closes.
+
+    Args:
+        path (str): Path to the spec file.
+    Returns:
+        dict: The parsed spec.
+    Raises:
+        ValueError: If the spec is malformed (unknown design or axes, bad subset combinations).
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".toml":
+        if tomllib is None:
+            raise ValueError("TOML sweep specs need Python 3.11+ (tomllib); use a .json spec instead")
+        with open(path, "rb") as f:
+            spec = tomllib.load(f)
+    elif extension == ".json":
+        with open(path) as f:
+            spec = json.load(f)
+    else:
+        raise ValueError(f"Unsupported sweep spec format '{extension}' (expected .json or .toml)")
+
+    design = spec.get("design", "full_factorial")
+    if design not in DESIGNS:
+        raise ValueError(f"Unknown sweep design '{design}' (expected one of {', '.join(DESIGNS)})")
+    if design in ("latin_hypercube", "random") and int(spec.get("samples", 0)) <= 0:
+        raise ValueError(f"Sweep design '{design}' needs a positive 'samples' count")
+    unknown_axes = set(spec.get("axes", {})) - set(DEFAULT_SWEEP_AXES) - set(OPTIONAL_AXES)
+    if unknown_axes:
+        raise ValueError(f"Unknown sweep axes: {', '.join(sorted(unknown_axes))}")
+    if design == "subset":
+        combinations = spec.get("combinations")
+        if not combinations or not all(isinstance(combination, dict) for combination in combinations):
+            raise ValueError("Sweep design 'subset' needs a non-empty 'combinations' list of axis -> value tables")
+        for index, combination in enumerate(combinations, start=1):
+            unknown_axes = set(combination) - set(DEFAULT_SWEEP_AXES) - set(OPTIONAL_AXES)
+            missing_axes = set(DEFAULT_SWEEP_AXES) - set(combination)
+            if unknown_axes or missing_axes:
+                raise ValueError(f"Subset combination {index}: " + "; ".join(
+                    problem for problem in (f"unknown axes {', '.join(sorted(unknown_axes))}" if unknown_axes else "",
+                                            f"missing axes {', '.join(sorted(missing_axes))}" if missing_axes else "") if problem))
+    return spec
+
+def _resolve_axes(spec_axes):
+    axes = {name: list(spec_axes.get(name, levels)) for name, levels in DEFAULT_SWEEP_AXES.items()}
+    for name, levels in OPTIONAL_AXES.items():
+        if name in spec_axes:
+            axes[name] = list(spec_axes[name])
+    return axes
+
+def full_factorial(axes):
+    """Every combination of the axis levels, in nested-loop order."""
+    return [dict(zip(axes, values)) for values in itertools.product(*axes.values())]
+
+def latin_hypercube(axes, samples, rng):
+    """
+    Latin hypercube over discrete levels: each axis's [0, 1) range is cut into `samples`
+    strata, each stratum is used once per axis (in a random pairing across axes), and the
+    point in a stratum maps to a level. Every level of every axis is therefore covered as
+    evenly as `samples` allows. Repeated combinations are dropped.
+    """
+    columns = {}
+    for name, levels in axes.items():
+        strata = [(i + rng.random()) / samples for i in range(samples)]
+        rng.shuffle(strata)
+        columns[name] = [levels[int(u * len(levels))] for u in strata]
+
+    combinations = []
+    seen = set()
+    for i in range(samples):
+        combination = {name: columns[name][i] for name in axes}
+        key = tuple(combination.values())
+        if key not in seen:
+            seen.add(key)
+            combinations.append(combination)
+    return combinations
+
+def random_design(axes, samples, rng):
+    """`samples` distinct combinations drawn uniformly from the full factorial."""
+    grid = full_factorial(axes)
+    return rng.sample(grid, min(samples, len(grid)))
+
+def build_combinations_from_spec(spec):
+    """
+    Expands a sweep spec into the ordered list of test params dicts that main_analyzer()
+    runs. Results are ordered by analyzer QoS (stable), so subscriptions change as
+    rarely as possible.
+
+    Args:
+        spec (dict): A spec as returned by load_sweep_spec().
+    Returns:
+        list: Test params dicts.
+    """
+    axes = _resolve_axes(spec.get("axes", {}))
+    design = spec.get("design", "full_factorial")
+    rng = random.Random(spec.get("seed"))
+    samples = int(spec.get("samples", 0))
+
+    if design == "full_factorial":
+        combinations = full_factorial(axes)
+    elif design == "subset":
+        defaults = {name: levels[0] for name, levels in axes.items()}
+        combinations = [{**defaults, **combination} for combination in spec.get("combinations", [])]
+    elif design == "latin_hypercube":
+        combinations = latin_hypercube(axes, samples, rng)
+    else:
+        combinations = random_design(axes, samples, rng)
+
+    return sorted(combinations, key=lambda combination: combination["analyzer_qos"])
@@ -0,0 +1,200 @@
+import os
+import sys
+import csv
+import glob
+import time
+import shutil
+import argparse
+import subprocess
+import multiprocessing
+
+import analyzer
+import results_store
+import live_monitor
+import run_ledger
+
+############################# Configurations ##################################
+
+SHARD_OUTPUT_DIR = "sweep_shards"
+PUBLISHERS_PER_BROKER = 10
+PUBLISHER_ENGINE = False # host each broker's publishers in one publisher_engine.py process 
+BROKER_STARTUP_WAIT_SECONDS = 1
+PUBLISHER_STARTUP_WAIT_SECONDS = 3
+
+###############################################################################
+
+def shard_combinations(test_combinations, num_shards):
+    """
+    Splits the ordered test combinations round-robin into num_shards lists. Each shard
+    keeps the original relative order, so analyzer QoS still only changes a few times
+    per shard.
+
+    Args:
+        test_combinations (list): Test params dicts, in run order.
+        num_shards (int): Number of broker instances to spread the tests over.
+    Returns:
+        list: num_shards lists of test params dicts.
+    """
+    return [test_combinations[i::num_shards] for i in range(num_shards)]
+
+def _shard_paths(broker_port):
+    shard_dir = os.path.join(SHARD_OUTPUT_DIR, f"broker_{broker_port}")
+    return (os.path.join(shard_dir, os.path.basename(analyzer.OUTPUT_CSV_FILE)),
+            os.path.join(shard_dir, os.path.basename(results_store.OUTPUT_NPZ_DIR)))
+
+def _run_shard(shard_index, broker_port, shard, test_duration_seconds, sweep_id):
+    """
+    Worker process entry point: runs one shard of the sweep against one broker, with
+    its own analyzer client and its own shard output files.
+    """
+    shard_csv, shard_npz_dir = _shard_paths(broker_port)
+    os.makedirs(os.path.dirname(shard_csv), exist_ok=True)
+    analyzer.BROKER_PORT = broker_port
+    analyzer.TEST_DURATION_SECONDS = test_duration_seconds # a sweep spec may have overridden it
+    analyzer.OUTPUT_CSV_FILE = shard_csv
+    results_store.OUTPUT_NPZ_DIR = shard_npz_dir
+    if live_monitor.LIVE_HTTP_PORT: # one live metrics endpoint per worker
+        live_monitor.LIVE_HTTP_PORT += shard_index
+    print(f"Sweep: Worker for broker port {broker_port} running {len(shard)} tests")
+    unfinished = len(shard) - analyzer.main_analyzer(shard, sweep_id) # it returns early without raising, e.g. if it can't connect 
+    if unfinished:
+        print(f"Sweep: Worker for broker port {broker_port} left {unfinished} of {len(shard)} tests unfinished")
+        sys.exit(1)
+
+def merge_shard_results(broker_ports):
+    """
+    Merges every shard's CSV rows (ordered by run timestamp) into analyzer.OUTPUT_CSV_FILE
+    and moves the shards' per-run .npz files into results_store.OUTPUT_NPZ_DIR. Shards left
+    over from an interrupted sweep on other ports are merged too. Shards may have different
+    columns (e.g. one left over from an older version): rows are written with the union
+    of their headers, or in the existing output file's columns (see analyzer.append_rows_to_csv).
+
+    Args:
+        broker_ports (list): Ports whose shard outputs should be merged.
+    Returns:
+        int: Number of result rows merged.
+    """
+    fieldnames = []
+    rows = []
+    leftover_ports = {int(os.path.basename(path).split("_", 1)[1])
+                      for path in glob.glob(os.path.join(SHARD_OUTPUT_DIR, "broker_*"))}
+    for broker_port in sorted(set(broker_ports) | leftover_ports):
+        shard_csv, shard_npz_dir = _shard_paths(broker_port)
+        if os.path.exists(shard_csv):
+            with open(shard_csv, newline='') as f:
+                reader = csv.DictReader(f)
+                fieldnames += [name for name in reader.fieldnames or [] if name not in fieldnames]
+                rows.extend(reader)
+            os.remove(shard_csv) # merged rows must not be merged again by a later sweep
+        os.makedirs(results_store.OUTPUT_NPZ_DIR, exist_ok=True)
+        for npz_path in glob.glob(os.path.join(shard_npz_dir, "run_*.npz")):
+            shutil.move(npz_path, os.path.join(results_store.OUTPUT_NPZ_DIR, os.path.basename(npz_path)))
+
+    if rows:
+        rows.sort(key=lambda row: row["Test_Run_Timestamp"])
+        analyzer.append_rows_to_csv(rows, fieldnames)
+    return len(rows)
+
+def launch_brokers(broker_ports, local_broker=False):
+    """
+    Starts one broker process per port: mosquitto, or the in-repo local_broker.py stand-in
+    with local_broker or when mosquitto isn't installed. Returns the Popen handles.
+    """
+    mosquitto = None if local_broker else shutil.which("mosquitto")
+    if mosquitto is None:
+        if not local_broker:
+            print("Sweep: mosquitto not found on PATH; using local_broker.py instead")
+        local_broker_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "local_broker.py")
+        processes = [subprocess.Popen([sys.executable, local_broker_script, str(port)]) for port in broker_ports]
+    else:
+        processes = [subprocess.Popen([mosquitto, "-p", str(port)]) for port in broker_ports]
+    time.sleep(BROKER_STARTUP_WAIT_SECONDS)
+    return processes
+
+def launch_publishers(broker_ports):
+    """
+    Starts PUBLISHERS_PER_BROKER publishers per broker: one publisher.py process each, or
+    one publisher_engine.py process per broker with PUBLISHER_ENGINE. Returns the Popen handles.
+    """
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    if PUBLISHER_ENGINE:
+        processes = [subprocess.Popen([sys.executable, os.path.join(src_dir, "publisher_engine.py"), "1", str(PUBLISHERS_PER_BROKER), str(port)],
+                                      stdout=subprocess.DEVNULL) for port in broker_ports]
+        time.sleep(PUBLISHER_STARTUP_WAIT_SECONDS)
+        return processes
+    publisher_script = os.path.join(src_dir, "publisher.py")
+    processes = []
+    for port in broker_ports:
+        for instance in range(1, PUBLISHERS_PER_BROKER + 1):
+            processes.append(subprocess.Popen([sys.executable, publisher_script, f"pub-{instance:02d}", str(port)],
+                                              stdout=subprocess.DEVNULL))
+    time.sleep(PUBLISHER_STARTUP_WAIT_SECONDS)
+    return processes
+
+def run_parallel_sweep(broker_ports, test_combinations=None, sweep_id=None):
+    """
+    Runs the sweep concurrently against several local brokers, one analyzer worker process
+    per broker, each with its own shard of the combinations, then merges the results.
+    Brokers and publisher fleets on the same host share CPU, so check that per-run
+    results are comparable to a sequential sweep before trusting a high worker count.
+
+    Args:
+        broker_ports (list): One port per broker instance (each needs its own publishers).
+        test_combinations (list): Test params dicts. Defaults to the full analyzer grid.
+        sweep_id (str): Run ledger sweep ID. Defaults to one derived from the whole sweep.
+    Returns:
+        list: Ports whose worker crashed or left tests unfinished (empty if all succeeded).
+    """
+    if test_combinations is None:
+        test_combinations = analyzer.build_test_combinations()
+    # one sweep ID for the whole sweep, so --resume picks it up even with a different port count 
+    sweep_id = sweep_id or run_ledger.sweep_id_for(test_combinations, analyzer.TEST_DURATION_SECONDS)
+    test_combinations = analyzer.resume_pending(run_ledger.RunLedger(sweep_id), test_combinations, "Sweep")
+    shards = shard_combinations(test_combinations, len(broker_ports))
+
+    sweep_start_time = time.time()
+    workers = {port: multiprocessing.Process(target=_run_shard, args=(shard_index, port, shard, analyzer.TEST_DURATION_SECONDS, sweep_id))
+               for shard_index, (port, shard) in enumerate(zip(broker_ports, shards)) if shard}
+    for worker in workers.values():
+        worker.start()
+    for worker in workers.values():
+        worker.join()
+    failed_ports = [port for port, worker in workers.items() if worker.exitcode != 0]
+
+    merged_rows = merge_shard_results(broker_ports)
+    if failed_ports:
+        print(f"\nSweep: FAILED - workers for broker ports {', '.join(map(str, failed_ports))} crashed or left tests "
+              f"unfinished; merged {merged_rows} of {len(test_combinations)} rows into {analyzer.OUTPUT_CSV_FILE} "
+              f"(rerun with --resume to finish the sweep)")
+    else:
+        print(f"\nSweep: {len(test_combinations)} tests on {len(workers)} brokers finished in "
+              f"{(time.time() - sweep_start_time) / 60:.1f} min; merged {merged_rows} rows into {analyzer.OUTPUT_CSV_FILE}")
+    return failed_ports
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the analyzer sweep in parallel across several local brokers.")
+    parser.add_argument("ports", nargs="+", type=int, help="Broker ports, one analyzer worker per port")
+    parser.add_argument("--launch-brokers", action="store_true", help="Start a mosquitto instance on each port")
+    parser.add_argument("--local-brokers", action="store_true", help="With --launch-brokers, start local_broker.py instead of mosquitto")
+    parser.add_argument("--launch-publishers", action="store_true", help=f"Start {PUBLISHERS_PER_BROKER} publishers per port")
+    parser.add_argument("--publishers-per-broker", type=int, default=PUBLISHERS_PER_BROKER, help="Publishers to launch per port")
+    parser.add_argument("--publisher-engine", action="store_true", help="Launch each port's publishers as one engine process")
+    parser.add_argument("--sweep", help="Sweep spec (.json/.toml); defaults to the full grid")
+    analyzer.add_resume_arguments(parser)
+    args = parser.parse_args()
+    sweep_id = analyzer.apply_resume_arguments(args)
+    PUBLISHERS_PER_BROKER = args.publishers_per_broker
+    PUBLISHER_ENGINE = PUBLISHER_ENGINE or args.publisher_engine
+
+    child_processes = []
+    try:
+        if args.launch_brokers:
+            child_processes += launch_brokers(args.ports, args.local_brokers)
+        if args.launch_publishers:
+            child_processes += launch_publishers(args.ports)
+        failed_ports = run_parallel_sweep(args.ports, analyzer.build_test_combinations(args.sweep) if args.sweep else None, sweep_id)
+    finally:
+        for process in reversed(child_processes):
+            process.terminate()
+    if failed_ports:
+        sys.exit(1)
@@ -0,0 +1,65 @@
+# benchpublisher.py
+# Measures the maximum publish rate of one publisher's burst loop (publisher.publish_burst)
+# for the original loop and the PUBLISH_HOT_LOOP, text and binary payloads, 0/1000/4000 bytes.
+# Without arguments the client is a no-op stub, so only the loop itself is measured;
+# with a broker port (python benchpublisher.py 1883) a real paho client publishes QoS 0
+# to localhost and the result includes paho's own per-message cost.
+import os
+import io
+import re
+import sys
+import time
+import threading
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import publisher
+
+BENCH_SECONDS = 2
+MESSAGE_SIZES = [0, 1000, 4000]
+
+class NullClient:
+    """Stands in for the paho client so the loop overhead can be measured on its own."""
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        pass
+
+def measure_rate(client, hot_loop, binary, size):
+    """Runs one burst for BENCH_SECONDS and returns the achieved messages per second."""
+    publisher.PUBLISH_HOT_LOOP = hot_loop
+    publisher.CURRENT_PAYLOAD_BINARY = binary
+    publisher.CURRENT_MESSAGE_SIZE = size
+    publisher.CURRENT_QOS = 0
+    publisher.CURRENT_DELAY = 0
+    publisher.STOP_PUBLISHING_EVENT.clear()
+    threading.Timer(BENCH_SECONDS, publisher.STOP_PUBLISHING_EVENT.set).start()
+
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output): # the burst logs start/stop lines
+        publisher.publish_burst(client)
+    elapsed = time.perf_counter() - start
+    return int(re.search(r"Sent (\d+) messages", output.getvalue()).group(1)) / elapsed
+
+if __name__ == '__main__':
+    publisher.CLI_PUBLISHER_ID = "pub-01"
+    if len(sys.argv) > 1:
+        import paho.mqtt.client as mqtt
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id="benchpublisher")
+        client.connect("localhost", int(sys.argv[1]), 60)
+        client.loop_start()
+        time.sleep(0.5)
+        print(f"paho client -> localhost:{sys.argv[1]}, QoS 0, no delay")
+    else:
+        client = NullClient()
+        print("no-op client (loop overhead only), no delay")
+
+    for binary in (False, True):
+        for size in MESSAGE_SIZES:
+            before = measure_rate(client, False, binary, size)
+            after = measure_rate(client, True, binary, size)
+            print(f"{'binary' if binary else 'text  '} {size:>5} B: original loop {before:>11,.0f} msg/s, "
+                  f"hot loop {after:>11,.0f} msg/s ({after / before:.2f}x)")
+
+    if len(sys.argv) > 1:
+        client.loop_stop()
+        client.disconnect()
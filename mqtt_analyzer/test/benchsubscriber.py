@@ -0,0 +1,136 @@
+# benchsubscriber.py
+# Measures how many publisher messages per second the analyzer's data subscription can
+# take in: paho-mqtt (MQTTMessage per PUBLISH, on_message callback) against the
+# raw-socket subscriber (raw_subscriber.RawSubscriber, recv_into + memoryview parsing),
+# at QoS 0 and 1 and 100/1000-byte binary payloads. Both only count messages, so the
+# result is the client's own receive cost.
+# Without arguments a local replay server stands in for the broker: it answers CONNECT
+# and SUBSCRIBE, then streams pre-built PUBLISH frames as fast as the socket takes them,
+# so the subscriber is the only bottleneck. With a broker port (python benchsubscriber.py
+# 1883) a second process floods the broker with QoS 0 publishes instead; the broker then
+# limits the rate too, and the QoS column is the subscription QoS.
+import os
+import sys
+import time
+import socket
+import struct
+import threading
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import paho.mqtt.client as mqtt
+import payload_format
+import raw_subscriber
+from raw_subscriber import build_packet, encode_string
+
+BENCH_MESSAGES = 200_000
+MESSAGE_SIZES = [100, 1000]
+QOS_LEVELS = [0, 1]
+DATA_TOPIC = "counter/01/0/0/100"
+
+def build_publish_stream(count, size, qos):
+    """count PUBLISH frames of binary publisher payloads, as one bytes object."""
+    buffer = payload_format.build_binary_buffer(1, b"x" * max(size - payload_format.HEADER_STRUCT.size, 0))
+    frames = []
+    for ctr in range(count):
+        payload_format.pack_header(buffer, 1, ctr, time.time_ns())
+        packet_id = struct.pack("!H", ctr % 65535 + 1) if qos else b""
+        frames.append(build_packet((raw_subscriber.PUBLISH << 4) | (qos << 1), encode_string(DATA_TOPIC) + packet_id + bytes(buffer)))
+    return b"".join(frames)
+
+def read_packet(conn):
+    """Reads one MQTT packet from a blocking socket; returns (first byte, body)."""
+    def read_exactly(n):
+        data = b""
+        while len(data) < n:
+            chunk = conn.recv(n - len(data))
+            if not chunk:
+                raise EOFError
+            data += chunk
+        return data
+    header = read_exactly(1)[0]
+    length, shift = 0, 0
+    while True:
+        byte = read_exactly(1)[0]
+        length |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return header, read_exactly(length)
+
+def replay_server(listener, stream):
+    """Serves one subscriber: CONNACK, SUBACK, then the PUBLISH stream; acks are read and discarded."""
+    conn, _ = listener.accept()
+    with conn:
+        read_packet(conn) # CONNECT
+        conn.sendall(bytes([raw_subscriber.CONNACK << 4, 2, 0, 0]))
+        header, body = read_packet(conn)
+        while header >> 4 != raw_subscriber.SUBSCRIBE:
+            header, body = read_packet(conn)
+        conn.sendall(build_packet(raw_subscriber.SUBACK << 4, body[:2] + bytes([body[-1]])))
+        threading.Thread(target=lambda: [None for _ in iter(lambda: conn.recv(1 << 16), b"")], daemon=True).start()
+        try:
+            conn.sendall(stream)
+            time.sleep(30) # keep the connection up until the subscriber has read everything
+        except OSError:
+            pass
+
+def flood_broker(broker_port, stream):
+    """Child process: one raw connection that writes the whole QoS 0 stream to the broker."""
+    with socket.create_connection(("localhost", broker_port)) as conn:
+        conn.sendall(build_packet(raw_subscriber.CONNECT << 4, encode_string("MQTT") + bytes([4, 0x02, 0, 60]) + encode_string("benchsubscriber_flood")))
+        read_packet(conn)
+        conn.sendall(stream)
+        time.sleep(1)
+
+def measure_rate(client_kind, qos, size, broker_port=None):
+    """Receives BENCH_MESSAGES messages and returns messages per second (first to last message)."""
+    received = [0, 0.0]
+    done = threading.Event()
+
+    def count(*_):
+        if not received[0]:
+            received[1] = time.perf_counter()
+        received[0] += 1
+        if received[0] == BENCH_MESSAGES:
+            done.set()
+
+    if broker_port is None:
+        listener = socket.create_server(("127.0.0.1", 0))
+        port = listener.getsockname()[1]
+        threading.Thread(target=replay_server, args=(listener, build_publish_stream(BENCH_MESSAGES, size, qos)), daemon=True).start()
+    else:
+        port = broker_port
+
+    if client_kind == "paho":
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=f"benchsubscriber_{os.getpid()}")
+        client.on_message = lambda client, userdata, msg: count()
+        client.connect("127.0.0.1", port, 60)
+        client.loop_start()
+        client.subscribe(DATA_TOPIC, qos=qos)
+    else:
+        client = raw_subscriber.RawSubscriber(count, f"benchsubscriber_{os.getpid()}")
+        client.connect("127.0.0.1", port)
+        client.subscribe([(DATA_TOPIC, qos)])
+
+    if broker_port is not None:
+        time.sleep(0.5) # subscription in place before the flood starts
+        multiprocessing.Process(target=flood_broker, args=(broker_port, build_publish_stream(BENCH_MESSAGES, size, 0)), daemon=True).start()
+    finished = done.wait(60)
+    elapsed = time.perf_counter() - received[1]
+
+    if client_kind == "paho":
+        client.loop_stop()
+    client.disconnect()
+    if broker_port is None:
+        listener.close()
+    return received[0] / elapsed if finished else received[0] / 60
+
+if __name__ == '__main__':
+    broker_port = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    print(f"{BENCH_MESSAGES:,} messages per run from "
+          f"{f'a flood publisher via localhost:{broker_port}' if broker_port else 'a local replay server'}")
+    for qos in QOS_LEVELS:
+        for size in MESSAGE_SIZES:
+            paho_rate = measure_rate("paho", qos, size, broker_port)
+            raw_rate = measure_rate("raw", qos, size, broker_port)
+            print(f"QoS {qos} {size:>5} B: paho {paho_rate:>11,.0f} msg/s, raw socket {raw_rate:>11,.0f} msg/s ({raw_rate / paho_rate:.2f}x)")
@@ -0,0 +1,183 @@
+# benchsweep.py
+# Benchmarks the whole toolchain: runs the reduced sweep in sweeps/benchmark.json (3 s
+# windows) through analyzer.main_analyzer against a local broker (local_broker.py, or
+# mosquitto with --mosquitto) and one publisher_engine.py process, then records
+#   max_sustained_mps        highest analyzer receive rate of a test with <= BENCH_MAX_LOSS_PCT loss
+#   analyzer_cpu_us_per_msg  analyzer process CPU time (all threads) per message received
+#   publisher_achieved_mps   mean per-publisher achieved rate over the unthrottled (delay 0) tests
+#   sweep_wall_seconds       wall time of the whole sweep, sync and stats included
+# and compares them with the stored baseline (bench_baseline.json next to this file).
+# Publishers burst for their normal BURST_SECONDS; the analyzer stops each burst when its
+# window closes, as in a real sweep.
+# The sweep runs BENCH_REPEATS times (--repeats) and each metric keeps its best value, so
+# one run disturbed by other load on the machine doesn't read as a regression.
+# Any metric worse than its baseline by more than its tolerance is a regression: they are
+# printed and the exit status is 1. --update-baseline stores this run as the new baseline.
+# Baselines are per machine class: the file keeps one per CPU count and broker
+# (baseline_key()), and a run only compares against its own class's entry. Without one
+# the exit status is 1 too, so a CI job can't pass by never comparing; record it with
+# --update-baseline on the machine that runs the comparison.
+import os
+import sys
+import csv
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import multiprocessing
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import analyzer
+import run_ledger
+import results_store
+import local_broker
+import sweep_scheduler
+import publisher_engine
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCH_SWEEP_SPEC = os.path.join(TEST_DIR, "..", "sweeps", "benchmark.json")
+BASELINE_FILE = os.path.join(TEST_DIR, "bench_baseline.json")
+BENCH_MAX_LOSS_PCT = 1.0
+BENCH_REPEATS = 3
+PUBLISHER_STARTUP_WAIT_SECONDS = 3
+# metric -> (True if higher is better, default relative tolerance)
+METRICS = {
+    "max_sustained_mps": (True, 0.20),
+    "analyzer_cpu_us_per_msg": (False, 0.20),
+    "publisher_achieved_mps": (True, 0.20),
+    "sweep_wall_seconds": (False, 0.15),
+}
+
+def run_publisher_engine(count, broker_port):
+    """Child process: publishers pub-01 .. pub-<count>."""
+    engine = publisher_engine.PublisherEngine(list(range(1, count + 1)), broker_port=broker_port)
+    try:
+        engine.connect()
+        while True:
+            time.sleep(1)
+    finally:
+        engine.shutdown()
+
+def run_benchmark(use_mosquitto=False):
+    """
+    Runs the benchmark sweep in a scratch directory.
+
+    Returns:
+        tuple: (metrics dict, list of result rows as dicts)
+    """
+    test_combinations = analyzer.build_test_combinations(BENCH_SWEEP_SPEC)
+    broker_port = local_broker.free_port()
+    scratch_dir = tempfile.mkdtemp(prefix="benchsweep_")
+    analyzer.BROKER_PORT = broker_port
+    analyzer.RESUME_SWEEPS = False
+    analyzer.OUTPUT_CSV_FILE = os.path.join(scratch_dir, "bench_results.csv")
+    results_store.OUTPUT_NPZ_DIR = os.path.join(scratch_dir, "bench_results_npz")
+    run_ledger.RUN_LEDGER_FILE = os.path.join(scratch_dir, "bench_ledger.jsonl")
+
+    broker_processes = sweep_scheduler.launch_brokers([broker_port], local_broker=not use_mosquitto)
+    engine = multiprocessing.Process(target=run_publisher_engine, daemon=True,
+                                     args=(max(test["pub_instance_count"] for test in test_combinations), broker_port))
+    try:
+        if not local_broker.wait_for_port(broker_port):
+            sys.exit(f"Bench: No broker listening on port {broker_port}")
+        engine.start()
+        time.sleep(PUBLISHER_STARTUP_WAIT_SECONDS)
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        analyzer.main_analyzer(test_combinations)
+        cpu_seconds, wall_seconds = time.process_time() - cpu_start, time.perf_counter() - wall_start
+        with open(analyzer.OUTPUT_CSV_FILE, newline='') as csvfile:
+            rows = list(csv.DictReader(csvfile))
+    finally:
+        engine.terminate()
+        for process in broker_processes:
+            process.terminate()
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    if len(rows) != len(test_combinations):
+        sys.exit(f"Bench: Only {len(rows)} of {len(test_combinations)} tests produced results")
+    total_msgs = sum(int(row["Total_msgs_received_by_analyzer"]) for row in rows)
+    sustained = [float(row["Mean_total_rate_mps_analyzer"]) for row in rows
+                 if float(row["Avg_loss_pct_per_active_pub"]) <= BENCH_MAX_LOSS_PCT]
+    achieved = [float(row["Publisher_achieved_rate_mps"]) for row in rows
+                if row["Publisher_delay_ms"] == "0" and row["Publisher_achieved_rate_mps"] != "N/A"]
+    metrics = {
+        "max_sustained_mps": round(max(sustained, default=0.0), 1),
+        "analyzer_cpu_us_per_msg": round(cpu_seconds / total_msgs * 1e6, 2) if total_msgs else float("inf"),
+        "publisher_achieved_mps": round(sum(achieved) / len(achieved), 1) if achieved else 0.0,
+        "sweep_wall_seconds": round(wall_seconds, 2),
+    }
+    return metrics, rows
+
+def baseline_key(use_mosquitto=False):
+    """Key of this machine's entry in BASELINE_FILE: CPU count and broker (host names differ between CI runners)."""
+    return f"{os.cpu_count()}cpu-{'mosquitto' if use_mosquitto else 'local_broker'}"
+
+def best_metrics(runs):
+    """Each metric's best value over several runs' metrics dicts."""
+    return {name: (max if higher_is_better else min)(run[name] for run in runs) for name, (higher_is_better, _) in METRICS.items()}
+
+def compare_with_baseline(metrics, baseline):
+    """
+    Returns:
+        list: One message per metric that regressed beyond its tolerance.
+    """
+    regressions = []
+    tolerances = baseline.get("tolerances", {})
+    for name, (higher_is_better, default_tolerance) in METRICS.items():
+        if name not in baseline["metrics"]:
+            continue
+        expected, tolerance = baseline["metrics"][name], tolerances.get(name, default_tolerance)
+        change = (metrics[name] - expected) / expected if expected else 0.0
+        if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+            regressions.append(f"{name}: {metrics[name]:,} vs baseline {expected:,} ({change:+.1%}, tolerance {tolerance:.0%})")
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark a reduced analyzer sweep against a stored baseline.")
+    parser.add_argument("--update-baseline", action="store_true", help=f"Store this run as the baseline ({os.path.basename(BASELINE_FILE)})")
+    parser.add_argument("--mosquitto", action="store_true", help="Run against mosquitto instead of local_broker.py")
+    parser.add_argument("--repeats", type=int, default=BENCH_REPEATS, help="Sweeps to run; each metric keeps its best value")
+    args = parser.parse_args()
+    if args.repeats < 1:
+        parser.error("--repeats must be at least 1")
+    if args.mosquitto and shutil.which("mosquitto") is None: # launch_brokers would fall back to local_broker.py
+        parser.error("mosquitto not found on PATH")
+
+    runs = [run_benchmark(args.mosquitto) for _ in range(args.repeats)]
+    metrics = best_metrics([run_metrics for run_metrics, _ in runs])
+    print(f"\n==== Sweep benchmark (best of {args.repeats}) ====")
+    for row in runs[-1][1]:
+        print(f"QoS {row['Analyzer_sub_QoS']}/{row['Publisher_pub_QoS']} delay {row['Publisher_delay_ms']:>3} ms "
+              f"{row['Publisher_msg_size_bytes']:>5} B x{row['Publisher_instance_count_cfg']}: "
+              f"{float(row['Mean_total_rate_mps_analyzer']):>10,.1f} msg/s, loss {row['Avg_loss_pct_per_active_pub']}%")
+    baselines = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as f:
+            baselines = json.load(f)
+    key = baseline_key(args.mosquitto)
+    baseline = baselines.get(key)
+    for name, value in metrics.items():
+        print(f"{name:>24}: {value:>12,}" + (f"   (baseline {baseline['metrics'][name]:,})" if baseline and name in baseline["metrics"] else ""))
+
+    if args.update_baseline:
+        baselines[key] = {"metrics": metrics, "tolerances": {name: tolerance for name, (_, tolerance) in METRICS.items()},
+                          "recorded": {"date": datetime.now().isoformat(timespec="seconds"), "host": platform.node(),
+                                       "python": platform.python_version(), "repeats": args.repeats}}
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(baselines, f, indent=4, sort_keys=True)
+            f.write("\n")
+        print(f"Bench: Baseline '{key}' written to {BASELINE_FILE}")
+    elif baseline is None:
+        print(f"Bench: No baseline for '{key}' in {BASELINE_FILE}; run with --update-baseline on this machine to record one")
+        sys.exit(1)
+    else:
+        regressions = compare_with_baseline(metrics, baseline)
+        if regressions:
+            print("\n!!!! PERFORMANCE REGRESSION !!!!")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("Bench: No regressions against the baseline.")
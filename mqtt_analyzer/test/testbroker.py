@@ -0,0 +1,128 @@
+# testbroker.py
+# Checks local_broker.LocalBroker with paho-mqtt clients: delivery at every
+# publish/subscribe QoS combination (granted QoS = min of the two), wildcards,
+# retained messages (stored, replaced, cleared), the synthetic $SYS/broker/...
+# topics the analyzer monitors, and round-robin shared subscriptions.
+# With a port (python testbroker.py 1883) it runs against that broker instead,
+# e.g. mosquitto, to confirm both behave the same.
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import paho.mqtt.client as mqtt
+import local_broker
+
+WAIT_SECONDS = 5
+SYS_TOPICS = ["$SYS/broker/load/messages/received/1min", "$SYS/broker/load/messages/sent/1min",
+              "$SYS/broker/clients/active", "$SYS/broker/messages/stored", "$SYS/broker/subscriptions/count"]
+
+class Client:
+    """A connected paho client that records (topic, payload, qos, retain) of everything it receives."""
+    def __init__(self, port, name):
+        self.messages = []
+        self.condition = threading.Condition()
+        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=f"testbroker_{name}_{os.getpid()}")
+        self.client.on_message = self.on_message
+        self.client.connect("127.0.0.1", port, 60)
+        self.client.loop_start()
+
+    def on_message(self, client, userdata, msg):
+        with self.condition:
+            self.messages.append((msg.topic, msg.payload, msg.qos, msg.retain))
+            self.condition.notify_all()
+
+    def subscribe(self, topic_filter, qos):
+        self.client.subscribe(topic_filter, qos)
+        time.sleep(0.2) # SUBACK
+
+    def wait_for(self, count):
+        with self.condition:
+            self.condition.wait_for(lambda: len(self.messages) >= count, timeout=WAIT_SECONDS)
+            return list(self.messages)
+
+    def close(self):
+        self.client.disconnect()
+        self.client.loop_stop()
+
+def check(name, ok, detail=""):
+    print(f"{name}: {'OK' if ok else 'FAILED'} {detail}")
+    return ok
+
+def check_qos(port):
+    results = []
+    publisher = Client(port, "pub")
+    for sub_qos in range(3):
+        subscriber = Client(port, f"sub{sub_qos}")
+        subscriber.subscribe("qos/+/#", sub_qos)
+        for pub_qos in range(3):
+            publisher.client.publish(f"qos/{pub_qos}/x", f"m{pub_qos}".encode(), qos=pub_qos).wait_for_publish(WAIT_SECONDS)
+        received = subscriber.wait_for(3)
+        expected = [(f"qos/{pub_qos}/x", f"m{pub_qos}".encode(), min(pub_qos, sub_qos), False) for pub_qos in range(3)]
+        results.append(check(f"subscribe QoS {sub_qos}", sorted(received) == sorted(expected), "" if sorted(received) == sorted(expected) else received))
+        subscriber.close()
+    publisher.close()
+    return all(results)
+
+def check_retained(port):
+    publisher = Client(port, "retain_pub")
+    publisher.client.publish("retained/a", b"old", qos=1, retain=True).wait_for_publish(WAIT_SECONDS)
+    publisher.client.publish("retained/a", b"new", qos=1, retain=True).wait_for_publish(WAIT_SECONDS)
+    publisher.client.publish("retained/b", b"gone", qos=0, retain=True).wait_for_publish(WAIT_SECONDS)
+    publisher.client.publish("retained/b", b"", qos=0, retain=True).wait_for_publish(WAIT_SECONDS)
+    time.sleep(0.2)
+    subscriber = Client(port, "retain_sub")
+    subscriber.subscribe("retained/#", 1)
+    received = subscriber.wait_for(2)
+    publisher.client.publish("retained/a", b"live", qos=1).wait_for_publish(WAIT_SECONDS)
+    received = subscriber.wait_for(2)
+    subscriber.close()
+    publisher.close()
+    expected = [("retained/a", b"new", 1, True), ("retained/a", b"live", 1, False)]
+    return check("retained", received == expected, "" if received == expected else received)
+
+def check_sys(port):
+    subscriber = Client(port, "sys")
+    subscriber.subscribe("$SYS/broker/#", 0)
+    deadline = time.time() + WAIT_SECONDS
+    while time.time() < deadline and not set(SYS_TOPICS) <= {topic for topic, *_ in subscriber.messages}:
+        time.sleep(0.1)
+    received = {topic for topic, *_ in subscriber.messages}
+    wildcard = Client(port, "wildcard")
+    wildcard.subscribe("#", 0)
+    time.sleep(0.5)
+    leaked = [topic for topic, *_ in wildcard.messages if topic.startswith("$")]
+    subscriber.close()
+    wildcard.close()
+    return check("$SYS topics", set(SYS_TOPICS) <= received and not leaked, sorted(set(SYS_TOPICS) - received) or leaked or "")
+
+def check_shared(port):
+    subscribers = [Client(port, f"shared{index}") for index in range(2)]
+    for subscriber in subscribers:
+        subscriber.subscribe("$share/group/shared/#", 1)
+    publisher = Client(port, "shared_pub")
+    for ctr in range(10):
+        publisher.client.publish("shared/x", str(ctr).encode(), qos=1).wait_for_publish(WAIT_SECONDS)
+    time.sleep(0.5)
+    counts = [len(subscriber.messages) for subscriber in subscribers]
+    for client in subscribers + [publisher]:
+        client.close()
+    return check("shared subscription", counts == [5, 5], counts)
+
+if __name__ == '__main__':
+    stop = None
+    if len(sys.argv) > 1:
+        port = int(sys.argv[1])
+    else:
+        broker = local_broker.LocalBroker()
+        port = broker.start_in_thread()
+        stop = broker.stop_in_thread
+    try:
+        results = [check_qos(port), check_retained(port), check_sys(port), check_shared(port)]
+    finally:
+        if stop:
+            stop()
+    if not all(results):
+        sys.exit(1)
+    print("Broker passes all checks.")
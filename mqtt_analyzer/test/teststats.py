@@ -0,0 +1,194 @@
+# teststats.py
+# Checks that stats_engine.publisher_metrics() reproduces the original dict-based
+# per-publisher loop from calculate_stats() exactly, and that the online_stats
+# accumulators agree with it, on synthetic captures with loss, duplicates and
+# reordering, and optionally on a recorded capture. Also checks the online latency
+# histogram against exact latency percentiles
+# (a .npy of CaptureBuffer rows, e.g. np.save(path, RECEIVED_PUBLISHER_MSGS.rows())).
+import os
+import sys
+import time
+import random
+from collections import defaultdict
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import stats_engine
+import payload_format
+from online_stats import OnlineStats
+from capture_buffer import COL_INSTANCE_ID, COL_CTR, COL_RECEIVED_TS
+
+def reference_publisher_metrics(pub_msgs):
+    """The per-publisher body of the original calculate_stats(), unchanged."""
+    sorted_pub_msgs_by_ctr = sorted(pub_msgs, key=lambda x: x["payload_ctr"])
+    actual_msgs_from_pub = len(sorted_pub_msgs_by_ctr)
+
+    unique_ctrs_from_pub = sorted(list(set(m["payload_ctr"] for m in sorted_pub_msgs_by_ctr)))
+    max_ctr_seen_this_pub = unique_ctrs_from_pub[-1]
+    expected_based_on_max_ctr = max_ctr_seen_this_pub + 1
+    num_unique_received = len(unique_ctrs_from_pub)
+    loss_count_for_this_pub = expected_based_on_max_ctr - num_unique_received
+    loss_pct_this_pub = (loss_count_for_this_pub / expected_based_on_max_ctr) * 100 if expected_based_on_max_ctr > 0 else 0
+
+    sorted_pub_msgs_by_arrival = sorted(pub_msgs, key=lambda x: x["analyzer_timestamp_received"])
+    outoforder_count_this_pub = 0
+    if len(sorted_pub_msgs_by_arrival) > 1:
+        max_payload_ctr_seen_in_arrival_stream = -1
+        for msg_in_arrival_order in sorted_pub_msgs_by_arrival:
+            if msg_in_arrival_order["payload_ctr"] < max_payload_ctr_seen_in_arrival_stream:
+                outoforder_count_this_pub += 1
+            if msg_in_arrival_order["payload_ctr"] > max_payload_ctr_seen_in_arrival_stream:
+                max_payload_ctr_seen_in_arrival_stream = msg_in_arrival_order["payload_ctr"]
+    outoforder_pct_this_pub = (outoforder_count_this_pub / actual_msgs_from_pub) * 100 if actual_msgs_from_pub > 0 else 0
+
+    ctr_occurrences = defaultdict(int)
+    for msg in sorted_pub_msgs_by_ctr:
+        ctr_occurrences[msg["payload_ctr"]] += 1
+    duplicate_count_this_pub = 0
+    for count_val in ctr_occurrences.values():
+        if count_val > 1:
+            duplicate_count_this_pub += (count_val - 1)
+    duplicate_pct_this_pub = (duplicate_count_this_pub / actual_msgs_from_pub) * 100 if actual_msgs_from_pub > 0 else 0
+
+    inter_message_gaps_this_pub = []
+    arrival_times_for_unique_ctrs = {}
+    for msg in sorted_pub_msgs_by_arrival:
+        if msg["payload_ctr"] not in arrival_times_for_unique_ctrs:
+            arrival_times_for_unique_ctrs[msg["payload_ctr"]] = msg["analyzer_timestamp_received"]
+    for i in range(len(unique_ctrs_from_pub) - 1):
+        current_ctr = unique_ctrs_from_pub[i]
+        next_ctr = unique_ctrs_from_pub[i+1]
+        if next_ctr == current_ctr + 1:
+            if current_ctr in arrival_times_for_unique_ctrs and next_ctr in arrival_times_for_unique_ctrs:
+                gap = arrival_times_for_unique_ctrs[next_ctr] - arrival_times_for_unique_ctrs[current_ctr]
+                inter_message_gaps_this_pub.append(gap)
+
+    avg_gap_ms_this_pub = 0
+    stddev_gap_ms_this_pub = 0
+    if inter_message_gaps_this_pub:
+        avg_gap_ms_this_pub = sum(inter_message_gaps_this_pub) / len(inter_message_gaps_this_pub)
+        if len(inter_message_gaps_this_pub) > 1:
+            variance = sum([(g - avg_gap_ms_this_pub) ** 2 for g in inter_message_gaps_this_pub]) / len(inter_message_gaps_this_pub)
+            stddev_gap_ms_this_pub = variance ** 0.5
+
+    return {"loss_pct": loss_pct_this_pub, "outoforder_pct": outoforder_pct_this_pub,
+            "dup_pct": duplicate_pct_this_pub, "avg_gap": avg_gap_ms_this_pub,
+            "stddev_gap": stddev_gap_ms_this_pub}
+
+def synthetic_capture(seed, num_publishers=10, msgs_per_publisher=5000):
+    """Builds (n, 4) capture rows with ~5% loss, ~2% duplicates and jittered arrival order."""
+    rng = random.Random(seed)
+    rows = []
+    for pub_id in range(1, num_publishers + 1):
+        ts = 1_700_000_000_000
+        for ctr in range(msgs_per_publisher):
+            ts += rng.randint(0, 3)
+            if rng.random() < 0.05:
+                continue
+            rows.append((pub_id, ctr, ts, ts + rng.randint(0, 4)))
+            if rng.random() < 0.02:
+                rows.append((pub_id, ctr, ts, ts + rng.randint(0, 10)))
+    rows.sort(key=lambda row: row[3] + rng.randint(-2, 2)) # capture order is roughly arrival order
+    return np.array(rows, dtype=np.int64)
+
+def check_capture(name, rows):
+    """Compares both implementations on every publisher in a capture. Returns True if identical."""
+    reference_groups = defaultdict(list)
+    for pub_id, ctr, _, received_ts in rows.tolist():
+        reference_groups[pub_id].append({"payload_ctr": ctr, "analyzer_timestamp_received": received_ts})
+
+    start = time.perf_counter()
+    vectorized_groups = stats_engine.split_by_publisher(rows[:, COL_INSTANCE_ID], rows[:, COL_CTR], rows[:, COL_RECEIVED_TS])
+    vectorized = [(pub_id, stats_engine.publisher_metrics(ctrs, received_ts)) for pub_id, ctrs, received_ts in vectorized_groups]
+    vectorized_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    reference = [(pub_id, reference_publisher_metrics(msgs)) for pub_id, msgs in reference_groups.items()]
+    reference_s = time.perf_counter() - start
+
+    all_match = [pub_id for pub_id, _ in vectorized] == [pub_id for pub_id, _ in reference]
+    for (pub_id, got), (_, expected) in zip(vectorized, reference):
+        for key, expected_value in expected.items():
+            if got[key] != expected_value:
+                print(f"  MISMATCH {name} pub {pub_id} {key}: vectorized={got[key]!r} reference={expected_value!r}")
+                all_match = False
+    print(f"{name}: {len(rows)} msgs, {len(vectorized)} publishers, "
+          f"vectorized {vectorized_s * 1000:.1f} ms vs reference {reference_s * 1000:.1f} ms -> {'OK' if all_match else 'FAILED'}")
+    return all_match
+
+def check_online(name, rows):
+    """Feeds a capture through OnlineStats in receive order and compares with the batch engine."""
+    rows = rows[np.argsort(rows[:, COL_RECEIVED_TS], kind='stable')]
+    online = OnlineStats()
+    start = time.perf_counter()
+    for pub_id, ctr, _, received_ts in rows.tolist():
+        online.update(pub_id, ctr, received_ts)
+    per_msg_us = (time.perf_counter() - start) / max(len(rows), 1) * 1e6
+
+    batch = {pub_id: stats_engine.publisher_metrics(ctrs, received_ts) for pub_id, ctrs, received_ts in
+             stats_engine.split_by_publisher(rows[:, COL_INSTANCE_ID], rows[:, COL_CTR], rows[:, COL_RECEIVED_TS])}
+    all_match = True
+    for pub_id, got in online.all_metrics():
+        for key, expected_value in batch[pub_id].items():
+            if not np.isclose(got[key], expected_value, rtol=1e-9, atol=1e-9):
+                print(f"  MISMATCH {name} (online) pub {pub_id} {key}: online={got[key]!r} batch={expected_value!r}")
+                all_match = False
+    print(f"{name} (online): {per_msg_us:.2f} us/msg -> {'OK' if all_match else 'FAILED'}")
+    return all_match
+
+def check_latency(seed, num_msgs=50000):
+    """
+    Compares OnlineStats' histogram latency percentiles with stats_engine's exact ones on
+    log-normal latencies (~0.1-10 ms). Histogram buckets are ~6% wide, so allow 1/8.
+    """
+    rng = np.random.default_rng(seed)
+    latency_ns = rng.lognormal(mean=np.log(1e6), sigma=0.8, size=num_msgs).astype(np.int64)
+    instance_ids = rng.integers(1, 11, size=num_msgs)
+    sent_ns = 1_700_000_000_000_000_000 + np.arange(num_msgs, dtype=np.int64) * 1000
+    clock_offsets_ns = {pub_id: int(rng.integers(-50_000, 50_000)) for pub_id in range(1, 11)}
+    received_ns = sent_ns + latency_ns - np.array([clock_offsets_ns[int(i)] for i in instance_ids])
+
+    exact = stats_engine.latency_summary(stats_engine.one_way_latency_ns(instance_ids, sent_ns, received_ns, clock_offsets_ns))
+    online = OnlineStats()
+    for pub_id, sent, received in zip(instance_ids.tolist(), sent_ns.tolist(), received_ns.tolist()):
+        online.update(pub_id, 0, received // 1_000_000, received - sent + clock_offsets_ns[pub_id])
+    approx = online.latency_summary()
+
+    all_match = exact["max"] == latency_ns.max() / 1e6 == approx["max"]
+    for key, expected_value in exact.items():
+        if abs(approx[key] - expected_value) > expected_value / 8:
+            print(f"  MISMATCH latency seed={seed} {key}: online={approx[key]!r} exact={expected_value!r}")
+            all_match = False
+    print(f"latency seed={seed}: exact {exact} vs online {approx} -> {'OK' if all_match else 'FAILED'}")
+    return all_match
+
+def check_ctr_bounds():
+    """Out-of-range ctrs (negative, or at/above payload_format.MAX_CTR) are rejected without touching the accumulator."""
+    online = OnlineStats()
+    rejected = 0
+    for ctr in (-1, payload_format.MAX_CTR, 10**12):
+        try:
+            online.update(1, ctr, 0)
+        except ValueError:
+            rejected += 1
+    try:
+        payload_format.parse_publisher_message(b"counter/01/0/0/0", f"{10**12}:1:x".encode())
+    except ValueError:
+        rejected += 1
+    ok = rejected == 4 and len(online) == 0
+    print(f"ctr bounds: {'OK' if ok else 'FAILED'}")
+    return ok
+
+if __name__ == '__main__':
+    captures = [(f"synthetic seed={seed}", synthetic_capture(seed)) for seed in range(5)]
+    captures.append(("single message", np.array([[1, 0, 10, 11]], dtype=np.int64)))
+    for path in sys.argv[1:]:
+        captures.append((path, np.load(path)))
+
+    results = [check_capture(name, rows) for name, rows in captures]
+    results += [check_online(name, rows) for name, rows in captures]
+    results += [check_latency(seed) for seed in range(3)]
+    results.append(check_ctr_bounds())
+    if not all(results):
+        sys.exit(1)
+    print("stats_engine and online_stats match the reference implementation on all captures.")